@@ -0,0 +1,17 @@
+from pudu.assembly import LoopAssembly
+from opentrons import protocol_api
+
+
+assembly_Odd_1 = {"promoter":["j23101", "j23100", "j23106", "j23119", "j23104"], "rbs":["B0034", "B0032", "B0030", "B0031", "B0029"], "cds":["GFP", "RFP", "BFP", "YFP"], "terminator":"B0015", "receiver":"Odd_1"}
+assemblies = [assembly_Odd_1]
+
+# metadata
+metadata = {
+'protocolName': 'PUDU Loop assembly multi-plate',
+'author': 'Gonzalo Vidal <g.a.vidal-pena2@ncl.ac.uk>',
+'description': 'Automated DNA assembly Loop protocol for libraries larger than one thermocycler plate',
+'apiLevel': '2.22'}
+
+def run(protocol= protocol_api.ProtocolContext):
+    pudu_loop_assembly = LoopAssembly(assemblies=assemblies, reagent_major=True, multi_plate=True)
+    pudu_loop_assembly.run(protocol)
@@ -0,0 +1,20 @@
+from pudu.assembly import LoopAssembly
+from opentrons import protocol_api
+
+
+assembly_Odd_1 = {"promoter":["j23100", "j23101", "j23102", "j23103"], "rbs":"B0034", "cds":["sfGFP", "mRFP1"], "terminator":"B0015", "receiver":"Odd_1"}
+assembly_Odd_2 = {"promoter":["j23104", "j23105", "j23106", "j23107"], "rbs":"B0032", "cds":["mTagBFP2", "YFP"], "terminator":"B0012", "receiver":"Odd_2"}
+assembly_Odd_3 = {"promoter":["j23108", "j23109", "j23110", "j23111"], "rbs":"B0030", "cds":["CFP", "amilCP"], "terminator":"B0010", "receiver":"Odd_3"}
+assemblies = [assembly_Odd_1, assembly_Odd_2, assembly_Odd_3]
+
+# metadata
+metadata = {
+'protocolName': 'PUDU Loop assembly with part overflow',
+'author': 'Gonzalo Vidal <g.a.vidal-pena2@ncl.ac.uk>',
+'description': 'Automated DNA assembly Loop protocol with more parts than fit on the temperature module',
+'apiLevel': '2.22'}
+
+def run(protocol= protocol_api.ProtocolContext):
+    pudu_loop_assembly = LoopAssembly(assemblies=assemblies, reagent_major=True,
+                                      overflow_labware='opentrons_24_tuberack_nest_1.5ml_snapcap')
+    pudu_loop_assembly.run(protocol)
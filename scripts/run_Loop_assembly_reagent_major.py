@@ -0,0 +1,18 @@
+from pudu.assembly import LoopAssembly
+from opentrons import protocol_api
+
+
+assembly_Odd_1 = {"promoter":["j23101", "j23100", "j23106", "j23119"], "rbs":["B0034", "B0032"], "cds":"GFP", "terminator":"B0015", "receiver":"Odd_1"}
+assembly_Even_2 = {"c4_receptor":"GD0001", "c4_buff_gfp":"GD0002", "spacer1":"20ins1", "spacer2":"Even_2", "receiver":"Even_2"}
+assemblies = [assembly_Odd_1, assembly_Even_2]
+
+# metadata
+metadata = {
+'protocolName': 'PUDU Loop assembly reagent-major',
+'author': 'Gonzalo Vidal <g.a.vidal-pena2@ncl.ac.uk>',
+'description': 'Automated DNA assembly Loop protocol dispensing shared reagents once per reagent',
+'apiLevel': '2.22'}
+
+def run(protocol= protocol_api.ProtocolContext):
+    pudu_loop_assembly = LoopAssembly(assemblies=assemblies, reagent_major=True)
+    pudu_loop_assembly.run(protocol)
@@ -0,0 +1,19 @@
+from pudu.assembly import LoopAssembly
+from pudu.pipeline import Pipeline
+from opentrons import protocol_api
+
+
+assembly_Odd_1 = {"promoter":["j23101", "j23100"], "rbs":"B0034", "cds":"GFP", "terminator":"B0015", "receiver":"Odd_1"}
+assemblies = [assembly_Odd_1]
+
+# metadata
+metadata = {
+'protocolName': 'PUDU Loop assembly and transformation',
+'author': 'Gonzalo Vidal <g.a.vidal-pena2@ncl.ac.uk>',
+'description': 'Automated DNA assembly Loop protocol followed by a heat shock transformation in the same plate',
+'apiLevel': '2.23'}
+
+def run(protocol= protocol_api.ProtocolContext):
+    pudu_pipeline = Pipeline(assembly=LoopAssembly(assemblies=assemblies, output_xlsx=False),
+                             transformation={'competent_cells': 'DH5alpha'})
+    pudu_pipeline.run(protocol)
@@ -0,0 +1,14 @@
+from pudu.sample_preparation import PlateSamples
+from opentrons import protocol_api
+
+# metadata
+metadata = {
+'protocolName': 'PUDU Plate Setup, multichannel',
+'author': 'Gonzalo Vidal <g.a.vidal-pena2@ncl.ac.uk>',
+'description': 'Automated 96 well plate setup protocol from a 96 well source plate with an 8-channel pipette',
+'apiLevel': '2.14'}
+
+def run(protocol= protocol_api.ProtocolContext):
+
+    pudu_plate_samples = PlateSamples(samples=[f's{i}' for i in range(1, 17)], replicates=4, multichannel=True)
+    pudu_plate_samples.run(protocol)
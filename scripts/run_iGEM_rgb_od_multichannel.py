@@ -0,0 +1,14 @@
+from pudu.calibration import RGBODCalibration
+from opentrons import protocol_api
+
+# metadata
+metadata = {
+'protocolName': 'iGEM RGB OD600 calibration, multichannel',
+'author': 'Gonzalo Vidal <g.a.vidal-pena2@ncl.ac.uk>',
+'description': 'Protocol to perform serial dilutions of fluorescein and nanoparticles for calibration',
+'apiLevel': '2.14'}
+
+def run(protocol= protocol_api.ProtocolContext):
+
+    pudu_calibration = RGBODCalibration(multichannel_pipette='p300_multi_gen2')
+    pudu_calibration.run(protocol)
\ No newline at end of file
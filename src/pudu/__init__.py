@@ -3,4 +3,8 @@ from .calibration import *
 from .sample_preparation import *
 from .transformation import *
 from .plating import *
-from .utils import *
\ No newline at end of file
+from .utils import *
+from .planning import *
+from .estimation import *
+from .simulation import *
+from .pipeline import *
@@ -1,18 +1,62 @@
+import copy
 import xlsxwriter
 from opentrons import protocol_api
-from typing import List, Dict
+from opentrons.protocols.labware import get_labware_definition
+from typing import List, Dict, Tuple, Union
 from fnmatch import fnmatch
-from itertools import product
+from itertools import product, groupby, chain
 import json
+import math
+import re
 from abc import ABC, abstractmethod
-from pudu.utils import Camera, colors
+from pudu.utils import Camera, TipManager, colors, is_dry_run
+from pudu.planning import (well_name_from_index, summarize_plan, tip_demand, optimize_route, place_wells,
+                           RunJournal, WELLS_PER_PLATE)
+from pudu.estimation import estimate_deck_time
+
+# How each assembly well is mixed once its parts are in.
+# source_mix: mix every part at its source before aspirating it
+# well_mix: 'cycles' of aspirate/dispense in the well after the last part, 'mix_after' the last part,
+#           'plate' to mix the whole plate by hand after its last well, or None
+# volume_fraction: fraction of the reaction volume moved per mixing cycle, capped by the pipette volume
+# repetitions: mixing cycles, None for one per 10 µL of reaction
+# touch_tip: touch the tip after every mixing cycle
+MIXING_STRATEGIES = {
+    'bubble_removal': {'source_mix': True, 'well_mix': 'cycles', 'volume_fraction': 1.0,
+                       'repetitions': None, 'touch_tip': True},
+    'reduced_volume': {'source_mix': True, 'well_mix': 'cycles', 'volume_fraction': 0.5,
+                       'repetitions': 3, 'touch_tip': False},
+    'mix_after_last_part': {'source_mix': True, 'well_mix': 'mix_after', 'volume_fraction': 0.5,
+                            'repetitions': 3, 'touch_tip': False},
+    'plate': {'source_mix': True, 'well_mix': 'plate', 'volume_fraction': 0.0,
+              'repetitions': 0, 'touch_tip': False},
+    'none': {'source_mix': False, 'well_mix': None, 'volume_fraction': 0.0,
+             'repetitions': 0, 'touch_tip': False}
+}
 
 class BaseAssembly(ABC):
     """
     Abstract base class for Loop Assembly protocols.
     Contains shared hardware setup, liquid handling, and tip management functionality.
+    With a tip_state_file, tip racks left partly used by the previous run are resumed.
+    With a journal_file, every operation is journaled as it runs; resume=True skips the operations
+    an interrupted run already finished.
+    mixing_strategy names an entry of MIXING_STRATEGIES, or is a dict overriding the default strategy.
+    Parts drawn from more than a tube of part_tube_volume holds are split over several tubes, and when
+    parts spill over onto the overflow labware the least used ones go there.
+    With optimize_route, the wells of every multi-dispense sweep are reordered to shorten head travel.
+    Every multi-dispense aspirates disposal_volume on top of its wells, so the last well gets its full
+    volume, and blows it back into the source.
+    With multi_plate, reactions that do not fit one thermocycler plate are filled into further plates, up to
+    max_plates. Every finished plate is held off deck at 4 °C while the next one is filled, so the reagents are
+    only kept cold for the filling, and the plates are thermocycled one after the other once the last one is filled.
+    well_placement picks the thermocycler wells of the reactions, see planning.place_wells; after plan(),
+    thermocycler_well_map maps every well to the construct it holds, in well order.
     """
 
+    # Most thermocycler plates a multi_plate run fills, checked before any reaction is planned
+    max_plates = 10
+
     def __init__(self,
                  volume_total_reaction: float = 20,
                  volume_part: float = 2,
@@ -34,7 +78,20 @@ class BaseAssembly(ABC):
                  take_video: bool = False,
                  water_testing: bool = False,
                  output_xlsx: bool = True,
-                 protocol_name: str = ''):
+                 protocol_name: str = '',
+                 reagent_major: bool = False,
+                 multi_plate: bool = False,
+                 overflow_labware: str = None,
+                 overflow_labware_position: str = '3',
+                 tip_state_file: str = None,
+                 journal_file: str = None,
+                 resume: bool = False,
+                 mixing_strategy: Union[str, Dict] = 'bubble_removal',
+                 part_tube_volume: float = 1000,
+                 part_dead_volume: float = 5,
+                 optimize_route: bool = False,
+                 well_placement: str = 'column_major',
+                 disposal_volume: float = 1):
 
         self.volume_total_reaction = volume_total_reaction
         self.volume_part = volume_part
@@ -51,6 +108,12 @@ class BaseAssembly(ABC):
             self.tiprack_positions = ['2', '3', '4', '5', '6', '9']
         else:
             self.tiprack_positions = tiprack_positions
+        self.overflow_labware = overflow_labware
+        self.overflow_labware_position = overflow_labware_position
+        if self.overflow_labware:
+            # The overflow source labware takes the place of one tip rack
+            self.tiprack_positions = [position for position in self.tiprack_positions
+                                      if position != self.overflow_labware_position]
         self.pipette = pipette
         self.pipette_position = pipette_position
         self.aspiration_rate = aspiration_rate
@@ -60,26 +123,44 @@ class BaseAssembly(ABC):
         self.water_testing = water_testing
         self.output_xlsx = output_xlsx
         self.protocol_name = protocol_name
+        self.reagent_major = reagent_major
+        self.multi_plate = multi_plate
+        self.tip_state_file = tip_state_file
+        self.journal_file = journal_file
+        self.resume = resume
+        if resume and not journal_file:
+            raise ValueError("Resuming a run requires a journal_file")
+        self.mixing_strategy = mixing_strategy
+        self._get_mixing_strategy()
+        self.part_tube_volume = part_tube_volume
+        self.part_dead_volume = part_dead_volume
+        self.optimize_route = optimize_route
+        self.route_report = None
+        self.well_placement = well_placement
+        self.disposal_volume = disposal_volume
+        if part_tube_volume <= part_dead_volume:
+            raise ValueError(f"part_tube_volume ({part_tube_volume}) must be larger than "
+                             f"part_dead_volume ({part_dead_volume})")
 
         # Shared tracking dictionaries
         self.dict_of_parts_in_temp_mod_position = {}
         self.dict_of_parts_in_thermocycler = {}
+        self.dict_of_parts_in_overflow_labware = {}
         self.dna_list_for_transformation_protocol = []
+        self.thermocycler_well_map = {}
+        self.thermocycler_module = None
         self.xlsx_output = None
+        self.transfer_plan = []
+        self.part_aliquots = {}
+        self.part_tubes = {}
+        self.reagent_wells = {}
+        self.overflow_source = None
 
         #Initialize Camera
         self.camera = Camera()
         # Tip management
-        self.tip_management = {
-            'all_racks': [],
-            'on_deck_racks': [],
-            'off_deck_racks': [],
-            'available_slots': [],
-            'tips_used': 0,
-            'tips_per_batch': 0,
-            'current_batch': 1,
-            'total_batches': 1
-        }
+        self.tip_manager = None
+        self.journal = None
 
     @abstractmethod
     def process_assemblies(self):
@@ -92,55 +173,491 @@ class BaseAssembly(ABC):
         pass
 
     @abstractmethod
-    def _process_assembly_combinations(self, protocol, pipette, thermo_plate, alum_block,
-                                       dd_h2o, t4_dna_ligase_buffer, t4_dna_ligase,
-                                       volume_reagents, thermocycler_well_counter) -> int:
-        """Process all assembly combinations - format-specific"""
+    def _plan_reactions(self, thermocycler_well_counter) -> List[Dict]:
+        """Plan one reaction per destination well - format-specific"""
         pass
 
-    @abstractmethod
-    def _calculate_total_tips_needed(self) -> int:
-        """Calculate total tips needed - format-specific implementation"""
-        pass
+    def _check_plate_count(self, wells_needed: int):
+        """Check that the reactions of a multi_plate run fit in max_plates thermocycler plates"""
+        available_wells = self.max_plates * WELLS_PER_PLATE - self.thermocycler_starting_well
+        if self.multi_plate and wells_needed > available_wells:
+            raise ValueError(f'This protocol fills up to {self.max_plates} thermocycler plates, {available_wells} '
+                             f'wells. Number of wells needed is {wells_needed}.')
+
+    def _calculate_total_tips_needed(self, operations: List[Dict] = None) -> int:
+        """Tip pickups of the planned operations, so the racks always match what run() replays"""
+        if operations is None:
+            operations = self.transfer_plan
+        demand = tip_demand(operations, self.pipette, self.tiprack_labware)
+        return demand.get(self.pipette, {}).get(self.tiprack_labware, 0)
+
+    def plan(self) -> List[Dict]:
+        """
+        Plan every liquid handling operation of the protocol without a protocol context.
+
+        Returns:
+            List of JSON-serializable operation dictionaries, replayed by run()
+        """
+        self.process_assemblies()
+        self.dict_of_parts_in_thermocycler = {}
+        self.dna_list_for_transformation_protocol = []
+
+        reactions = self._plan_reactions(self.thermocycler_starting_well)
+        self._place_reactions(reactions)
+        operations = self._plan_operations(reactions)
+        self._assign_part_aliquots(reactions, operations)
+        self.transfer_plan = operations
+        return self.transfer_plan
+
+    def _place_reactions(self, reactions: List[Dict]):
+        """
+        Move the reactions, planned on consecutive wells, to the wells of the well_placement policy.
+        Replicates of a construct are planned next to each other, so they are placed as one group.
+        """
+        wells = place_wells(len(reactions), self.well_placement, self.thermocycler_starting_well, self.replicates)
+        if wells and wells[-1] >= WELLS_PER_PLATE and not self.multi_plate:
+            raise ValueError(f"The '{self.well_placement}' well placement needs {wells[-1] + 1} thermocycler "
+                             f"wells for {len(reactions)} reactions. Use multi_plate or another placement.")
+
+        renamed = {}
+        for reaction, well in zip(reactions, wells):
+            renamed[well_name_from_index(reaction['well'])] = well_name_from_index(well)
+            reaction['well'] = well
+        self.dict_of_parts_in_thermocycler = {name: renamed.get(well, well)
+                                              for name, well in self.dict_of_parts_in_thermocycler.items()}
+        self.thermocycler_well_map = {well_name_from_index(reaction['well']): construct for reaction, construct
+                                      in zip(reactions, self.dna_list_for_transformation_protocol)}
+
+    def _assign_part_aliquots(self, reactions: List[Dict], operations: List[Dict]):
+        """
+        Split the parts drawn from more than one tube holds over several tubes, and point every part
+        transfer at the tube with the most volume left so the tubes of a part empty evenly.
+        Extra tubes are named after the part, 'B0015 (2)' for the second tube of B0015.
+        The parts drawn from most take the temperature module positions first, the rest spill over onto
+        the overflow labware, and every tube holds what the well it is placed in can take.
+        """
+        demand = summarize_plan(operations)['volume_per_source']
+        parts = {part for reaction in reactions for part in reaction['parts']}
+        reagent_positions = 3 + len({reaction['enzyme'] for reaction in reactions})
+        capacities = self._get_part_position_capacities(reagent_positions)
+
+        self.part_tubes = {}
+        self.part_aliquots = {}
+        for part in sorted(parts, key=lambda part: (-demand.get(part, 0), part)):
+            tubes, volume = 0, 0.0
+            while tubes == 0 or volume < demand.get(part, 0):
+                if len(self.part_tubes) == len(capacities):
+                    raise ValueError(f"Reagents and part tubes need more than the {reagent_positions + len(capacities)} "
+                                     f"positions available. Use larger part tubes or an overflow_labware.")
+                capacity = capacities[len(self.part_tubes)]
+                tubes += 1
+                self.part_tubes[self._part_tube_names(part, tubes)[-1]] = capacity
+                volume += capacity
+            self.part_aliquots[part] = tubes
+        self.part_aliquots = dict(sorted(self.part_aliquots.items()))
+
+        remaining = {part: [self.part_tubes[tube] for tube in self._part_tube_names(part, tubes)]
+                     for part, tubes in self.part_aliquots.items() if tubes > 1}
+        for operation in operations:
+            if operation['op'] != 'transfer' or operation['source'] not in remaining:
+                continue
+            tubes = remaining[operation['source']]
+            tube = tubes.index(max(tubes))
+            tubes[tube] -= operation['volume']
+            if tube:
+                operation['source'] = f"{operation['source']} ({tube + 1})"
+
+    @staticmethod
+    def _part_tube_names(part: str, tubes: int) -> List[str]:
+        """Names of the first tubes of a part"""
+        return [part if i == 0 else f"{part} ({i + 1})" for i in range(tubes)]
+
+    def _get_part_position_capacities(self, reagent_positions: int) -> List[float]:
+        """
+        Usable volume of every part position, the temperature module positions left after the reagents
+        first and then the overflow labware positions
+        """
+        capacities = []
+        labware = [(self.temperature_module_labware, reagent_positions)]
+        if self.overflow_labware:
+            labware.append((self.overflow_labware, 0))
+        for load_name, taken in labware:
+            wells = list(get_labware_definition(load_name)['wells'].values())[taken:]
+            capacities.extend(min(self.part_tube_volume, well['totalLiquidVolume']) - self.part_dead_volume
+                              for well in wells)
+        return [capacity for capacity in capacities if capacity > 0]
+
+    def _plan_operations(self, reactions: List[Dict]) -> List[Dict]:
+        """
+        Turn planned reactions into an ordered list of transfer operations.
+        Reactions beyond the first thermocycler plate are planned as sequential plate batches,
+        separated by a plate swap operation.
+        """
+        operations = []
+        for plate, plate_reactions in groupby(reactions, key=lambda reaction: reaction['well'] // WELLS_PER_PLATE):
+            if operations:
+                operations.append({'op': 'swap_plate', 'plate': plate + 1})
+            operations.extend(self._plan_plate_operations(list(plate_reactions)))
+            if self._get_mixing_strategy()['well_mix'] == 'plate':
+                operations.append({'op': 'mix_plate', 'plate': plate + 1})
+        return operations
+
+    def _get_mixing_strategy(self) -> Dict:
+        """Resolve the mixing strategy to its settings"""
+        if isinstance(self.mixing_strategy, dict):
+            return {**MIXING_STRATEGIES['bubble_removal'], **self.mixing_strategy}
+        if self.mixing_strategy not in MIXING_STRATEGIES:
+            raise ValueError(f"Unknown mixing strategy '{self.mixing_strategy}', "
+                             f"choose one of {list(MIXING_STRATEGIES)}")
+        return MIXING_STRATEGIES[self.mixing_strategy]
+
+    def _plan_plate_operations(self, reactions: List[Dict]) -> List[Dict]:
+        """
+        Plan the operations of the reactions sharing one thermocycler plate.
+
+        Well-major (default): every well receives all reagents and parts before the next well starts.
+        Reagent-major: water, ligase buffer and ligase are dispensed to every well of the plate in one
+        pass each, whatever the enzyme, and each enzyme in one pass over the wells that use it,
+        followed by the per-well part additions and mixing.
+        """
+        operations = []
+        if self.reagent_major:
+            operations.extend(self._plan_shared_reagents(reactions))
+            for reaction in reactions:
+                operations.extend(self._plan_part_additions(reaction))
+        else:
+            for reaction in reactions:
+                operations.extend(self._plan_reagent_additions(reaction))
+                operations.extend(self._plan_part_additions(reaction))
+        return operations
+
+    def _water_volume(self, reaction: Dict) -> float:
+        """Water needed to bring a reaction to the total volume."""
+        volume_reagents = self.volume_restriction_enzyme + self.volume_t4_dna_ligase + self.volume_t4_dna_ligase_buffer
+        return self.volume_total_reaction - (volume_reagents + self.volume_part * len(reaction['parts']))
+
+    def _plan_reagent_additions(self, reaction: Dict) -> List[Dict]:
+        """Plan water, ligase buffer, ligase and enzyme for a single well, one tip each."""
+        well = reaction['well']
+        return [
+            self._plan_transfer('Deionized Water', well, self._water_volume(reaction)),
+            self._plan_transfer('T4 DNA Ligase Buffer', well, self.volume_t4_dna_ligase_buffer,
+                                mix_before=self.volume_t4_dna_ligase_buffer),
+            self._plan_transfer('T4 DNA Ligase', well, self.volume_t4_dna_ligase,
+                                mix_before=self.volume_t4_dna_ligase),
+            self._plan_transfer(reaction['enzyme'], well, self.volume_restriction_enzyme,
+                                mix_before=self.volume_restriction_enzyme)
+        ]
+
+    def _plan_shared_reagents(self, reactions: List[Dict]) -> List[Dict]:
+        """
+        Plan water, ligase buffer, ligase and enzymes for several wells, one tip per reagent.
+        The enzyme is treated as a per-well reagent, so wells with different enzymes share
+        the water, buffer and ligase sweeps.
+        """
+        operations = []
+
+        # Water goes first into empty wells, so a single tip can serve all of them
+        for i, reaction in enumerate(reactions):
+            operations.append(self._plan_transfer('Deionized Water', reaction['well'], self._water_volume(reaction),
+                                                  new_tip=i == 0, drop_tip=i == len(reactions) - 1))
+
+        wells = [reaction['well'] for reaction in reactions]
+        operations.extend(self._plan_distribute('T4 DNA Ligase Buffer', wells, self.volume_t4_dna_ligase_buffer,
+                                                mix_before=self.volume_t4_dna_ligase_buffer))
+        operations.extend(self._plan_distribute('T4 DNA Ligase', wells, self.volume_t4_dna_ligase,
+                                                mix_before=self.volume_t4_dna_ligase))
+
+        wells_per_enzyme = {}
+        for reaction in reactions:
+            wells_per_enzyme.setdefault(reaction['enzyme'], []).append(reaction['well'])
+        for enzyme, enzyme_wells in wells_per_enzyme.items():
+            operations.extend(self._plan_distribute(enzyme, enzyme_wells, self.volume_restriction_enzyme,
+                                                    mix_before=self.volume_restriction_enzyme))
+        return operations
+
+    def _plan_part_additions(self, reaction: Dict) -> List[Dict]:
+        """Plan the parts of a single well and its mixing, following the mixing strategy."""
+        well = reaction['well']
+        strategy = self._get_mixing_strategy()
+        mix_before = self.volume_part if strategy['source_mix'] else 0.0
+        mix_volume = min(self.volume_total_reaction * strategy['volume_fraction'], self._max_pipette_volume())
+        repetitions = strategy['repetitions']
+        if repetitions is None:
+            repetitions = int(self.volume_total_reaction / 10)
+        operations = []
+
+        # Add parts, keeping the tip of the last part for the mixing cycles
+        for i, part in enumerate(reaction['parts']):
+            last_part = i == len(reaction['parts']) - 1
+            mix_after = mix_volume if last_part and strategy['well_mix'] == 'mix_after' else 0.0
+            operations.append(self._plan_transfer(part, well, self.volume_part, mix_before=mix_before,
+                                                  mix_after=mix_after, mix_reps=repetitions,
+                                                  drop_tip=not last_part or strategy['well_mix'] != 'cycles'))
+
+        # Mix and remove air bubbles
+        if strategy['well_mix'] == 'cycles':
+            operations.append({
+                'op': 'remove_bubbles',
+                'dest': well,
+                'volume': mix_volume,
+                'repetitions': repetitions,
+                'touch_tip': strategy['touch_tip'],
+                'drop_tip': True
+            })
+        return operations
+
+    def _plan_distribute(self, source: str, wells: List[int], volume: float,
+                         mix_before: float = 0.0) -> List[Dict]:
+        """
+        Plan a multi-dispense of one reagent into several wells with a single tip.
+        Each operation is one aspiration, split over as many wells as the tip holds besides the disposal volume.
+        """
+        max_volume = self._max_pipette_volume()
+        wells_per_aspiration = max(1, int((max_volume - self.disposal_volume) // volume))
+        chunks = [wells[i:i + wells_per_aspiration] for i in range(0, len(wells), wells_per_aspiration)]
+
+        operations = []
+        for i, chunk in enumerate(chunks):
+            operations.append({
+                'op': 'distribute',
+                'source': source,
+                'dests': chunk,
+                'volume': volume,
+                'asp_rate': self.aspiration_rate,
+                'disp_rate': self.dispense_rate,
+                'mix_before': mix_before,
+                'disposal_volume': max(0.0, min(self.disposal_volume, max_volume - volume * len(chunk))),
+                'new_tip': i == 0,
+                'drop_tip': i == len(chunks) - 1
+            })
+        return operations
+
+    def _max_pipette_volume(self) -> float:
+        """Largest volume a single aspiration can hold, from the pipette and tip rack names."""
+        volumes = [float(match.group(1)) for match in
+                   (re.search(r'p(\d+)_', self.pipette), re.search(r'(\d+)ul', self.tiprack_labware))
+                   if match]
+        return min(volumes) if volumes else 20.0
+
+    def _plan_transfer(self, source: str, dest: int, volume: float, mix_before: float = 0.0,
+                       mix_after: float = 0.0, mix_reps: int = 3, new_tip: bool = True,
+                       drop_tip: bool = True) -> Dict:
+        """Plan a single transfer from a named reagent to a thermocycler well index."""
+        operation = {
+            'op': 'transfer',
+            'source': source,
+            'dest': dest,
+            'volume': volume,
+            'asp_rate': self.aspiration_rate,
+            'disp_rate': self.dispense_rate,
+            'mix_before': mix_before,
+            'touch_tip': True,
+            'new_tip': new_tip,
+            'drop_tip': drop_tip
+        }
+        if mix_after:
+            operation['mix_after'] = mix_after
+            operation['mix_reps'] = mix_reps
+        return operation
 
-    def setup_tip_management(self, protocol):
+    def _resume_operations(self, protocol, plan: List[Dict]) -> Tuple[List[Tuple[int, Dict]], int]:
+        """
+        Operations left to run after an interrupted run, restarting mid-well where it is safe.
+
+        Finished operations are skipped. An interrupted bubble removal or plate swap is repeated, but an
+        interrupted transfer may already have dispensed, so its wells get no further additions.
+
+        Returns:
+            The (plan index, operation) pairs still to run and the tips the interrupted run picked up
+        """
+        done, interrupted, tips_used = self.journal.load()
+        protocol.comment(f"Resuming from {self.journal_file}: {len(done)} of {len(plan)} operations already done")
+
+        failed_wells = set()
+        for index in sorted(interrupted):
+            if plan[index]['op'] == 'distribute':
+                failed_wells.update(plan[index]['dests'])
+            elif plan[index]['op'] == 'transfer':
+                failed_wells.add(plan[index]['dest'])
+        for well in sorted(failed_wells):
+            protocol.comment(f"Well {well_name_from_index(well)} was interrupted mid-transfer "
+                             f"and gets no further additions, repeat it by hand")
+
+        operations = []
+        for index, operation in enumerate(plan):
+            if index in done or (index in interrupted and operation['op'] in ('transfer', 'distribute')):
+                continue
+            if operation['op'] == 'distribute':
+                dests = [well for well in operation['dests'] if well not in failed_wells]
+                if not dests:
+                    continue
+                operation = dict(operation, dests=dests)
+            elif operation['op'] in ('transfer', 'remove_bubbles') and operation['dest'] in failed_wells:
+                continue
+            operations.append((index, operation))
+        return self._reconnect_tips(operations), tips_used
+
+    @staticmethod
+    def _reconnect_tips(operations: List[Tuple[int, Dict]]) -> List[Tuple[int, Dict]]:
+        """
+        Pick up a fresh tip where the operation that held the tip was skipped,
+        and drop the tip when the operation that would have reused it was skipped.
+        """
+        liquid_handling = [i for i, (_, operation) in enumerate(operations)
+                           if operation['op'] not in ('swap_plate', 'mix_plate')]
+        holding_tip = False
+        for position, i in enumerate(liquid_handling):
+            index, operation = operations[i]
+            if not holding_tip and not operation.get('new_tip'):
+                operation = dict(operation, new_tip=True)
+            following = operations[liquid_handling[position + 1]][1] if position + 1 < len(liquid_handling) else None
+            if not operation['drop_tip'] and (following is None or following.get('new_tip')):
+                operation = dict(operation, drop_tip=True)
+            holding_tip = not operation['drop_tip']
+            operations[i] = (index, operation)
+        return operations
+
+    def _optimize_route(self, protocol, thermo_plate, operations: List[Tuple[int, Dict]]) -> List[Tuple[int, Dict]]:
+        """Reorder the wells of the multi-dispense sweeps using the deck coordinates of the loaded labware"""
+        plan = [operation for _, operation in operations]
+        points = {name: tuple(well.top().point)[:2] for name, well in self.reagent_wells.items()}
+        for operation in plan:
+            for well in operation.get('dests', [operation.get('dest')]):
+                if well is not None:
+                    # Every plate batch sits in the thermocycler when it is filled
+                    points[well] = tuple(thermo_plate.wells()[well % WELLS_PER_PLATE].top().point)[:2]
+
+        optimized, self.route_report = optimize_route(plan, points)
+        protocol.comment(f"Route optimization: {self.route_report['distance_before_mm']:.0f} mm -> "
+                         f"{self.route_report['distance_after_mm']:.0f} mm of head travel, "
+                         f"{self.route_report['saved_seconds']:.1f} s saved")
+        return [(index, operation) for (index, _), operation in zip(operations, optimized)]
+
+    def _journal_operation(self, protocol, index: int, status: str, new_tip: bool = False):
+        """Journal an operation of a real run, dry runs leave the journal untouched"""
+        if self.journal and not is_dry_run(protocol):
+            self.journal.record(index, status, new_tip)
+
+    def _execute_plan(self, protocol, pipette, thermocycler_module, thermo_plates,
+                      operations: List[Tuple[int, Dict]]):
+        """Replay (plan index, operation) pairs against the protocol context, journaling each one."""
+        for index, operation in operations:
+            self._journal_operation(protocol, index, 'started', operation.get('new_tip', False))
+            if operation['op'] == 'transfer':
+                dest_well = self._get_plate_well(thermo_plates, operation['dest'])
+                source = self.reagent_wells[operation['source']]
+                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=operation['volume'],
+                                     source=source, dest=dest_well,
+                                     asp_rate=operation['asp_rate'], disp_rate=operation['disp_rate'],
+                                     mix_before=operation['mix_before'], touch_tip=operation['touch_tip'],
+                                     mix_after=operation.get('mix_after', 0.0), mix_reps=operation.get('mix_reps', 3),
+                                     new_tip=operation['new_tip'], drop_tip=operation['drop_tip'])
+            elif operation['op'] == 'distribute':
+                source = self.reagent_wells[operation['source']]
+                self.multi_dispense(protocol=protocol, pipette=pipette, volume=operation['volume'],
+                                    source=source, dests=[self._get_plate_well(thermo_plates, i)
+                                                          for i in operation['dests']],
+                                    asp_rate=operation['asp_rate'], disp_rate=operation['disp_rate'],
+                                    mix_before=operation['mix_before'],
+                                    disposal_volume=operation.get('disposal_volume', 0.0),
+                                    new_tip=operation['new_tip'], drop_tip=operation['drop_tip'])
+            elif operation['op'] == 'remove_bubbles':
+                dest_well = self._get_plate_well(thermo_plates, operation['dest'])
+                if operation.get('new_tip'):
+                    self.tip_manager.pick_up_tip(pipette)
+                for _ in range(operation['repetitions']):
+                    self.liquid_transfer(protocol=protocol, pipette=pipette, volume=operation['volume'],
+                                         source=dest_well.bottom(), dest=dest_well.bottom(8),
+                                         asp_rate=1.0, disp_rate=1.0, new_tip=False, drop_tip=False,
+                                         touch_tip=operation.get('touch_tip', True))
+                if operation['drop_tip']:
+                    pipette.drop_tip()
+            elif operation['op'] == 'swap_plate':
+                self._perform_plate_swap(protocol, thermocycler_module, thermo_plates, operation['plate'])
+            elif operation['op'] == 'mix_plate':
+                self._mix_plate(protocol, thermocycler_module, thermo_plates, operation['plate'])
+            else:
+                raise ValueError(f"Unknown planned operation '{operation['op']}'")
+            self._journal_operation(protocol, index, 'done')
+
+    def _get_plate_well(self, thermo_plates, well_counter: int):
+        """Resolve a planned well counter to a well of the matching thermocycler plate batch"""
+        return thermo_plates[well_counter // WELLS_PER_PLATE].wells()[well_counter % WELLS_PER_PLATE]
+
+    def _run_thermocycling(self, thermocycler_module):
+        """Run the assembly and denaturation profiles on the plate in the thermocycler"""
+        profile = [
+            {'temperature': 42, 'hold_time_minutes': 2},
+            {'temperature': 16, 'hold_time_minutes': 5}
+        ]
+        denaturation = [
+            {'temperature': 60, 'hold_time_minutes': 10},
+            {'temperature': 80, 'hold_time_minutes': 10}
+        ]
+        thermocycler_module.execute_profile(steps=profile, repetitions=75, block_max_volume=30)
+        thermocycler_module.execute_profile(steps=denaturation, repetitions=1, block_max_volume=30)
+        thermocycler_module.set_block_temperature(4)
+
+    def _perform_plate_swap(self, protocol, thermocycler_module, thermo_plates, plate_number):
+        """Hold the finished plate batch off deck and replace it with the next empty plate"""
+        protocol.move_labware(labware=thermo_plates[plate_number - 2], new_location=protocol_api.OFF_DECK)
+        protocol.comment(f"Seal thermocycler plate {plate_number - 1} and keep it at 4 °C, "
+                         f"it is thermocycled once every plate is filled")
+        protocol.move_labware(labware=thermo_plates[plate_number - 1], new_location=thermocycler_module)
+        protocol.comment(f"Thermocycler plate {plate_number} of {len(thermo_plates)} ready!")
+
+    def _thermocycle_held_plates(self, protocol, thermocycler_module, thermo_plates):
+        """Thermocycle the plate batches held off deck, one after the other, after the last one"""
+        in_thermocycler = thermo_plates[-1]
+        for plate_number, plate in enumerate(thermo_plates[:-1], start=1):
+            thermocycler_module.open_lid()
+            protocol.move_labware(labware=in_thermocycler, new_location=protocol_api.OFF_DECK)
+            protocol.move_labware(labware=plate, new_location=thermocycler_module)
+            protocol.comment(f"Thermocycling plate {plate_number} of {len(thermo_plates)}")
+            thermocycler_module.close_lid()
+            self._run_thermocycling(thermocycler_module)
+            in_thermocycler = plate
+
+    def _mix_plate(self, protocol, thermocycler_module, thermo_plates, plate_number):
+        """Have the finished plate mixed and spun down off deck, then put back in the thermocycler"""
+        plate = thermo_plates[plate_number - 1]
+        protocol.comment(f"Seal, mix and spin down thermocycler plate {plate_number}, then put it back")
+        protocol.move_labware(labware=plate, new_location=protocol_api.OFF_DECK)
+        protocol.move_labware(labware=plate, new_location=thermocycler_module)
+
+    def compare_mixing_strategies(self, strategies: List[str] = None, timings: Dict = None) -> Dict:
+        """
+        Estimate the deck time of this assembly with each mixing strategy.
+
+        Args:
+            strategies: Names of MIXING_STRATEGIES to compare, all of them by default
+            timings: Overrides for the default timing model
+
+        Returns:
+            dict of strategy name -> total seconds, seconds spent mixing and removing bubbles, and tip pickups
+        """
+        report = {}
+        for strategy in strategies or MIXING_STRATEGIES:
+            assembly = copy.deepcopy(self)
+            assembly.mixing_strategy = strategy
+            assembly.output_xlsx = False
+            assembly.take_picture = assembly.take_video = False
+            assembly.tip_state_file = assembly.journal_file = None
+            assembly.resume = False
+            estimate = estimate_deck_time(assembly, timings)
+            report[strategy] = {
+                'total_seconds': estimate['total_seconds'],
+                'mixing_seconds': estimate['phases']['mixing'] + estimate['phases']['air_bubble_removal'],
+                'tip_pickups': assembly._calculate_total_tips_needed()
+            }
+        return report
+
+    def setup_tip_management(self, protocol, pipette, operations: List[Dict] = None, tips_used: int = 0):
         """Setup batch tip management for high-throughput applications."""
-        total_tips_needed = self._calculate_total_tips_needed()
-        tip_racks_needed = (total_tips_needed + 95) // 96
-
-        available_deck_slots = self.tiprack_positions
-        max_racks_on_deck = len(available_deck_slots)
-
-        protocol.comment(f"Protocol requires {total_tips_needed} tips ({tip_racks_needed} racks)")
-
-        all_tip_racks = []
-        on_deck_racks = []
-        for i in range(min(tip_racks_needed, max_racks_on_deck)):
-            rack = protocol.load_labware(self.tiprack_labware, available_deck_slots[i])
-            all_tip_racks.append(rack)
-            on_deck_racks.append(rack)
-
-        off_deck_racks = []
-        for i in range(max_racks_on_deck, tip_racks_needed):
-            rack = protocol.load_labware(self.tiprack_labware, protocol_api.OFF_DECK)
-            all_tip_racks.append(rack)
-            off_deck_racks.append(rack)
-
-        self.tip_management.update({
-            'all_racks': all_tip_racks,
-            'on_deck_racks': on_deck_racks,
-            'off_deck_racks': off_deck_racks,
-            'available_slots': available_deck_slots,
-            'tips_used': 0,
-            'tips_per_batch': max_racks_on_deck * 96,
-            'current_batch': 1,
-            'total_batches': (tip_racks_needed + max_racks_on_deck - 1) // max_racks_on_deck
-        })
-
-        if len(off_deck_racks) > 0:
-            protocol.comment(f"Will perform {self.tip_management['total_batches'] - 1} tip rack batch swaps")
-
-        return all_tip_racks
+        self.tip_manager = TipManager(protocol, self.tip_state_file)
+        return self.tip_manager.setup_tip_racks(pipette, self.tiprack_labware, self.tiprack_positions,
+                                                self._calculate_total_tips_needed(operations), tips_used=tips_used)
 
     def liquid_transfer(self, protocol, pipette, volume, source, dest,
                         asp_rate: float = 0.5, disp_rate: float = 1.0,
@@ -149,14 +666,7 @@ class BaseAssembly(ABC):
                         mix_reps: int = 3, new_tip: bool = True,
                         drop_tip: bool = True):
         if new_tip:
-            if self._check_if_swap_needed():
-                self._perform_tip_rack_batch_swap(protocol)
-            try:
-                pipette.pick_up_tip()
-                self._increment_tip_counter()
-            except Exception as e:
-                protocol.comment(f"Tip pickup failed with error: {e}")
-                raise
+            self.tip_manager.pick_up_tip(pipette)
 
         if mix_before > 0:
             pipette.mix(mix_reps, mix_before, source)
@@ -176,6 +686,32 @@ class BaseAssembly(ABC):
         if drop_tip:
             pipette.drop_tip()
 
+    def multi_dispense(self, protocol, pipette, volume, source, dests,
+                       asp_rate: float = 0.5, disp_rate: float = 1.0,
+                       mix_before: float = 0.0, mix_reps: int = 3, disposal_volume: float = 0.0,
+                       new_tip: bool = True, drop_tip: bool = True):
+        """
+        Aspirate once and dispense the same volume into several wells from above the liquid,
+        so the tip can be reused without touching the well contents.
+        The disposal volume is aspirated on top of the wells and blown out back into the source.
+        """
+        if new_tip:
+            self.tip_manager.pick_up_tip(pipette)
+
+        if mix_before > 0:
+            pipette.mix(mix_reps, mix_before, source)
+
+        pipette.aspirate(volume * len(dests) + disposal_volume, source, rate=asp_rate)
+        for dest in dests:
+            pipette.dispense(volume, dest.top(-6), rate=disp_rate)
+            pipette.touch_tip(dest, radius=0.75, v_offset=-6, speed=20)
+        if disposal_volume > 0:
+            pipette.dispense(disposal_volume, source.top(), rate=disp_rate)
+        pipette.blow_out(source.top())
+
+        if drop_tip:
+            pipette.drop_tip()
+
     def get_xlsx_output(self, name: str):
         workbook = xlsxwriter.Workbook(f"{name}.xlsx")
         worksheet = workbook.add_worksheet()
@@ -189,6 +725,15 @@ class BaseAssembly(ABC):
             col_num += 1
         col_num = 0
         row_num += 4
+        if self.dict_of_parts_in_overflow_labware:
+            worksheet.write(row_num, col_num, "Parts in overflow_labware")
+            row_num += 2
+            for key, value in self.dict_of_parts_in_overflow_labware.items():
+                worksheet.write(row_num, col_num, key)
+                worksheet.write(row_num + 1, col_num, value)
+                col_num += 1
+            col_num = 0
+            row_num += 4
         worksheet.write(row_num, col_num, "Parts in thermocycler_module")
         row_num += 2
         for key, value in self.dict_of_parts_in_thermocycler.items():
@@ -202,8 +747,20 @@ class BaseAssembly(ABC):
 
     def run(self, protocol: protocol_api.ProtocolContext):
         """Main protocol execution - uses template method pattern"""
-        # Process assemblies (format-specific)
-        self.process_assemblies()
+        # Plan all liquid handling (format-specific reactions)
+        plan = self.plan()
+        operations = list(enumerate(plan))
+        tips_used = 0
+        if self.journal_file:
+            self.journal = RunJournal(self.journal_file, plan)
+            if self.resume and self.journal.exists():
+                operations, tips_used = self._resume_operations(protocol, plan)
+            elif not is_dry_run(protocol):
+                self.journal.start()
+        self.dict_of_parts_in_temp_mod_position = {}
+        self.dict_of_parts_in_overflow_labware = {}
+        self.reagent_wells = {}
+        self.overflow_source = None
 
         # Load hardware (shared)
         temperature_module = protocol.load_module(module_name='temperature module',
@@ -211,22 +768,38 @@ class BaseAssembly(ABC):
         alum_block = temperature_module.load_labware(self.temperature_module_labware)
 
         thermocycler_module = protocol.load_module('thermocycler module')
-        thermo_plate = thermocycler_module.load_labware(name=self.thermocycler_labware)
+        self.thermocycler_module = thermocycler_module
+
+        # Extra plate batches wait off deck until the previous batch is filled,
+        # a resumed run starts with the plate of the first unfinished batch in the thermocycler
+        plates_needed = sum(1 for operation in plan if operation['op'] == 'swap_plate') + 1
+        current_plate = plates_needed - 1 - sum(1 for _, operation in operations if operation['op'] == 'swap_plate')
+        thermo_plates = []
+        for plate in range(plates_needed):
+            if plate == current_plate:
+                thermo_plates.append(thermocycler_module.load_labware(name=self.thermocycler_labware))
+            else:
+                thermo_plates.append(protocol.load_labware(self.thermocycler_labware, protocol_api.OFF_DECK))
+        if plates_needed > 1:
+            protocol.comment(f"Protocol requires {plates_needed} thermocycler plates")
 
-        all_tip_racks = self.setup_tip_management(protocol)
-        pipette = protocol.load_instrument(self.pipette, self.pipette_position, tip_racks=all_tip_racks)
+        pipette = protocol.load_instrument(self.pipette, self.pipette_position)
+        self.setup_tip_management(protocol, pipette, [operation for _, operation in operations], tips_used)
 
         # Load common reagents (shared)
-        dd_h2o = self._load_reagent(protocol, module_labware=alum_block, well_position=0,
-                                    name='Deionized Water')
-        t4_dna_ligase_buffer = self._load_reagent(protocol, module_labware=alum_block, well_position=1,
-                                                  name='T4 DNA Ligase Buffer')
-        t4_dna_ligase = self._load_reagent(protocol, module_labware=alum_block, well_position=2,
-                                           name="T4 DNA Ligase")
+        self._load_reagent(protocol, module_labware=alum_block, well_position=0,
+                           name='Deionized Water')
+        self._load_reagent(protocol, module_labware=alum_block, well_position=1,
+                           name='T4 DNA Ligase Buffer')
+        self._load_reagent(protocol, module_labware=alum_block, well_position=2,
+                           name="T4 DNA Ligase")
 
         # Load parts and enzymes (format-specific)
         temp_module_well_counter = self._load_parts_and_enzymes(protocol, alum_block)
 
+        if self.optimize_route:
+            operations = self._optimize_route(protocol, thermo_plates[current_plate], operations)
+
         # Setup temperatures
         thermocycler_module.open_lid()
         if not self.water_testing:
@@ -239,13 +812,8 @@ class BaseAssembly(ABC):
         if self.take_video:
             self.camera.start_video(protocol)
 
-        # Process assemblies (format-specific)
-        volume_reagents = self.volume_restriction_enzyme + self.volume_t4_dna_ligase + self.volume_t4_dna_ligase_buffer
-        thermocycler_well_counter = self._process_assembly_combinations(
-            protocol, pipette, thermo_plate, alum_block, dd_h2o,
-            t4_dna_ligase_buffer, t4_dna_ligase, volume_reagents,
-            self.thermocycler_starting_well
-        )
+        # Replay the planned operations
+        self._execute_plan(protocol, pipette, thermocycler_module, thermo_plates, operations)
 
         protocol.comment('Take out the reagents since the temperature module will be turn off')
 
@@ -263,17 +831,9 @@ class BaseAssembly(ABC):
 
         # Execute thermocycling profiles
         if not self.water_testing:
-            profile = [
-                {'temperature': 42, 'hold_time_minutes': 2},
-                {'temperature': 16, 'hold_time_minutes': 5}
-            ]
-            denaturation = [
-                {'temperature': 60, 'hold_time_minutes': 10},
-                {'temperature': 80, 'hold_time_minutes': 10}
-            ]
-            thermocycler_module.execute_profile(steps=profile, repetitions=75, block_max_volume=30)
-            thermocycler_module.execute_profile(steps=denaturation, repetitions=1, block_max_volume=30)
-            thermocycler_module.set_block_temperature(4)
+            self._run_thermocycling(thermocycler_module)
+            self._thermocycle_held_plates(protocol, thermocycler_module, thermo_plates)
+        self.tip_manager.save_tip_state()
 
         if protocol.is_simulating():
             if self.output_xlsx:
@@ -287,6 +847,9 @@ class BaseAssembly(ABC):
         # Output results
         print('Parts and reagents in temp_module')
         print(self.dict_of_parts_in_temp_mod_position)
+        if self.dict_of_parts_in_overflow_labware:
+            print('Parts in overflow_labware')
+            print(self.dict_of_parts_in_overflow_labware)
         print('Assembled parts in thermocycler_module')
         print(self.dict_of_parts_in_thermocycler)
         print('DNA list for transformation protocol')
@@ -294,55 +857,69 @@ class BaseAssembly(ABC):
 
     # Helper methods (shared)
     def _load_reagent(self, protocol, module_labware, well_position, name, description=None,
-                      volume=1000, color_index=None):
-        """Load a reagent or DNA part onto the temperature module."""
+                      volume=1000, color_index=None, tracking_dict=None):
+        """Load a reagent or DNA part onto the temperature module (or the given source labware)."""
         well = module_labware.wells()[well_position]
         well_name = well.well_name
 
+        if tracking_dict is None:
+            tracking_dict = self.dict_of_parts_in_temp_mod_position
         if description is None:
             description = name
         if color_index is None:
-            color_index = len(self.dict_of_parts_in_temp_mod_position) % len(colors)
+            color_index = len(self.reagent_wells) % len(colors)
 
         liquid = protocol.define_liquid(name=name, description=description,
                                         display_color=colors[color_index])
-        well.load_liquid(liquid, volume=volume)
+        well.load_liquid(liquid, volume=min(volume, well.max_volume))
 
-        self.dict_of_parts_in_temp_mod_position[name] = well_name
+        tracking_dict[name] = well_name
+        self.reagent_wells[name] = well
         protocol.comment(f"Loaded {name} at position {well_name}")
 
         return well
 
-    def _increment_tip_counter(self):
-        """Increment tip usage counter"""
-        self.tip_management['tips_used'] += 1
-
-    def _check_if_swap_needed(self):
-        current_batch_tips = self.tip_management['tips_used'] % self.tip_management['tips_per_batch']
-        return (current_batch_tips == 0 and
-                self.tip_management['tips_used'] > 0 and
-                len(self.tip_management['off_deck_racks']) > 0)
-
-    def _perform_tip_rack_batch_swap(self, protocol):
-        """Perform tip rack batch swap when current batch is exhausted"""
-        available_slots = self.tip_management['available_slots']
-
-        for rack in self.tip_management['on_deck_racks']:
-            protocol.move_labware(labware=rack, new_location=protocol_api.OFF_DECK)
-
-        remaining_racks = len(self.tip_management['off_deck_racks'])
-        racks_to_move = min(len(available_slots), remaining_racks)
-
-        new_on_deck_racks = []
-        for i in range(racks_to_move):
-            rack = self.tip_management['off_deck_racks'].pop(0)
-            protocol.move_labware(labware=rack, new_location=available_slots[i])
-            new_on_deck_racks.append(rack)
-
-        self.tip_management['on_deck_racks'] = new_on_deck_racks
-        self.tip_management['current_batch'] += 1
+    def _load_parts(self, protocol, alum_block, temp_module_well_counter, names: List[str]) -> int:
+        """
+        Load every tube of the given parts. When they do not all fit on the temperature module,
+        the tubes drawn from most stay cold and the least used ones are packed on the overflow labware.
+        """
+        tubes = [tube for name in names for tube in self._part_tube_names(name, self.part_aliquots.get(name, 1))]
+        if temp_module_well_counter + len(tubes) > len(alum_block.wells()):
+            # Same positions the tubes were sized for when planning
+            planned = list(self.part_tubes)
+            tubes.sort(key=lambda tube: planned.index(tube) if tube in planned else len(planned))
+        for tube in tubes:
+            temp_module_well_counter = self._load_part(protocol, alum_block, temp_module_well_counter, name=tube)
+        return temp_module_well_counter
 
-        protocol.comment(f"Tip rack batch {self.tip_management['current_batch']} ready!")
+    def _load_part(self, protocol, alum_block, temp_module_well_counter, name) -> int:
+        """
+        Load a DNA part on the temperature module, spilling over onto the overflow labware
+        once the block is full. Enzymes are loaded before parts so they always stay cold.
+        """
+        block_positions = len(alum_block.wells())
+        if temp_module_well_counter < block_positions:
+            self._load_reagent(protocol, module_labware=alum_block,
+                               well_position=temp_module_well_counter, name=name, volume=self.part_tube_volume)
+        else:
+            if not self.overflow_labware:
+                raise ValueError(f"No position left for {name} on the temperature module "
+                                 f"and no overflow_labware was given")
+            if self.overflow_source is None:
+                self.overflow_source = protocol.load_labware(self.overflow_labware, self.overflow_labware_position)
+                protocol.comment(f"Loading remaining parts on {self.overflow_labware} "
+                                 f"at position {self.overflow_labware_position}")
+            self._load_reagent(protocol, module_labware=self.overflow_source,
+                               well_position=temp_module_well_counter - block_positions, name=name,
+                               volume=self.part_tube_volume, tracking_dict=self.dict_of_parts_in_overflow_labware)
+        return temp_module_well_counter + 1
+
+    def _get_overflow_capacity(self) -> int:
+        """Number of part positions on the overflow labware, 0 without one"""
+        if not self.overflow_labware:
+            return 0
+        return len(get_labware_definition(self.overflow_labware)['wells'])
 
 class Domestication(BaseAssembly):
     """
@@ -411,101 +988,29 @@ class Domestication(BaseAssembly):
                            name=f"Restriction Enzyme {self.restriction_enzyme}")
         temp_module_well_counter += 1
 
-        # Load backbone
-        self._load_reagent(protocol, module_labware=alum_block,
-                           well_position=temp_module_well_counter,
-                           name=f"Backbone {self.backbone}")
-        temp_module_well_counter += 1
+        # Load backbone and individual parts
+        names = [f"Backbone {self.backbone}"] + [f"Part {part}" for part in self.parts_list]
+        return self._load_parts(protocol, alum_block, temp_module_well_counter, names)
 
-        # Load individual parts
+    def _plan_reactions(self, thermocycler_well_counter) -> List[Dict]:
+        """Plan domestication reactions - each part with backbone separately"""
+        reactions = []
         for part in self.parts_list:
-            self._load_reagent(protocol, module_labware=alum_block,
-                               well_position=temp_module_well_counter,
-                               name=f"Part {part}")
-            temp_module_well_counter += 1
-
-        return temp_module_well_counter
-
-    def _process_assembly_combinations(self, protocol, pipette, thermo_plate, alum_block,
-                                       dd_h2o, t4_dna_ligase_buffer, t4_dna_ligase,
-                                       volume_reagents, thermocycler_well_counter) -> int:
-        """Process domestication assemblies - each part with backbone separately"""
-
-        # Get reagent sources
-        restriction_enzyme = alum_block[
-            self.dict_of_parts_in_temp_mod_position[f"Restriction Enzyme {self.restriction_enzyme}"]]
-        backbone_source = alum_block[self.dict_of_parts_in_temp_mod_position[f"Backbone {self.backbone}"]]
-
-        # Process each part
-        for part in self.parts_list:
-            part_source = alum_block[self.dict_of_parts_in_temp_mod_position[f"Part {part}"]]
-
-            # Process replicates for this part
             for r in range(self.replicates):
-                dest_well = thermo_plate.wells()[thermocycler_well_counter]
-                dest_well_name = dest_well.well_name
-
-                # Calculate water volume (total - reagents - 2 parts: backbone + part)
-                volume_dd_h20 = self.volume_total_reaction - (volume_reagents + self.volume_part * 2)
-
-                # Add reagents
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=volume_dd_h20,
-                                     source=dd_h2o, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_t4_dna_ligase_buffer,
-                                     source=t4_dna_ligase_buffer, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_t4_dna_ligase_buffer, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_t4_dna_ligase,
-                                     source=t4_dna_ligase, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_t4_dna_ligase, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_restriction_enzyme,
-                                     source=restriction_enzyme, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_restriction_enzyme, touch_tip=True)
-
-                # Add backbone
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_part,
-                                     source=backbone_source, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_part, touch_tip=True)
-
-                # Add part (don't drop tip yet)
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_part,
-                                     source=part_source, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_part, touch_tip=True, drop_tip=False)
-
-                # Remove air bubbles with mixing
-                for _ in range(int(self.volume_total_reaction / 10)):
-                    self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_total_reaction,
-                                         source=dest_well.bottom(), dest=dest_well.bottom(8),
-                                         asp_rate=1.0, disp_rate=1.0, new_tip=False, drop_tip=False,
-                                         touch_tip=True)
-                pipette.drop_tip()
+                reactions.append({
+                    'well': thermocycler_well_counter,
+                    'enzyme': f"Restriction Enzyme {self.restriction_enzyme}",
+                    'parts': [f"Backbone {self.backbone}", f"Part {part}"]
+                })
 
                 # Track assembly
                 assembly_name = f"Part: {part}, Replicate: {r + 1}"
-                self.dict_of_parts_in_thermocycler[assembly_name] = dest_well_name
+                self.dict_of_parts_in_thermocycler[assembly_name] = well_name_from_index(thermocycler_well_counter)
                 self.dna_list_for_transformation_protocol.append((self.backbone, part, f'replicate_{r + 1}'))
 
                 thermocycler_well_counter += 1
 
-        return thermocycler_well_counter
-
-    def _calculate_total_tips_needed(self, number_of_constant_reagents: int = 6) -> int:
-        """Calculate total tips needed for domestication
-
-        Args:
-            number_of_constant_reagents: water + ligase buffer + ligase + enzyme + backbone + part = 6
-        """
-        total_assemblies = len(self.parts_list) * self.replicates
-        return number_of_constant_reagents * total_assemblies
+        return reactions
 
     def _validate_assembly_requirements(self):
         """Validate domestication assembly requirements"""
@@ -520,7 +1025,7 @@ class Domestication(BaseAssembly):
 
         # Calculate reagent positions: water(1) + ligase buffer(1) + ligase(1) + enzyme(1) + backbone(1) = 5
         reagent_positions = 5
-        max_parts = 24 - reagent_positions
+        max_parts = 24 - reagent_positions + self._get_overflow_capacity()
 
         if len(self.parts_list) > max_parts:
             raise ValueError(
@@ -533,8 +1038,9 @@ class Domestication(BaseAssembly):
         # Validate thermocycler capacity
         available_wells = 96 - self.thermocycler_starting_well
         wells_needed = len(self.parts_list) * self.replicates
+        self._check_plate_count(wells_needed)
 
-        if wells_needed > available_wells:
+        if wells_needed > available_wells and not self.multi_plate:
             raise ValueError(
                 f'This protocol only supports assemblies with up to {available_wells} '
                 f'wells. Number of assemblies needed is {wells_needed} '
@@ -562,26 +1068,33 @@ class ManualLoopAssembly(BaseAssembly):
         self.parts_set = set()
         self.has_odd = False
         self.has_even = False
-        self.odd_combinations = []
-        self.even_combinations = []
+        self.odd_roles = []
+        self.even_roles = []
 
     def process_assemblies(self):
-        """Process manual format assemblies and generate combinations"""
+        """
+        Process manual format assemblies and validate them.
+        Combinations are counted from the role sizes, so the part and plate capacity checks run
+        before any combination is generated.
+        """
         self._reset_assembly_state()
 
         for assembly in self.assemblies:
             assembly_type = self._get_assembly_type(assembly['receiver'])
             if assembly_type == 'odd':
                 self.has_odd = True
-                combos = self._generate_combinations_for_assembly(assembly)
-                self.odd_combinations.extend(combos)
+                self.odd_roles.append(self._get_parts_per_role(assembly))
             if assembly_type == 'even':
                 self.has_even = True
-                combos = self._generate_combinations_for_assembly(assembly)
-                self.even_combinations.extend(combos)
+                self.even_roles.append(self._get_parts_per_role(assembly))
 
         self._validate_assembly_requirements()
 
+    @property
+    def total_combinations(self) -> int:
+        """Number of combinations across all assemblies, without generating them"""
+        return sum(math.prod(len(parts) for parts in roles) for roles in self.odd_roles + self.even_roles)
+
     def _load_parts_and_enzymes(self, protocol, alum_block) -> int:
         """Load enzymes and parts for manual format"""
         temp_module_well_counter = 3  # Starting after common reagents
@@ -600,56 +1113,20 @@ class ManualLoopAssembly(BaseAssembly):
             temp_module_well_counter += 1
 
         # Load parts
-        for part in sorted(self.parts_set):
-            self._load_reagent(protocol, module_labware=alum_block,
-                               well_position=temp_module_well_counter,
-                               name=f"{part}")
-            temp_module_well_counter += 1
-
-        return temp_module_well_counter
-
-    def _process_assembly_combinations(self, protocol, pipette, thermo_plate, alum_block,
-                                       dd_h2o, t4_dna_ligase_buffer, t4_dna_ligase,
-                                       volume_reagents, thermocycler_well_counter) -> int:
-        """Process manual format combinations with automatic enzyme selection"""
+        return self._load_parts(protocol, alum_block, temp_module_well_counter, sorted(self.parts_set))
 
+    def _plan_reactions(self, thermocycler_well_counter) -> List[Dict]:
+        """Plan manual format combinations with automatic enzyme selection"""
+        reactions = []
         if self.has_odd:
-            restriction_enzyme_bsai = alum_block[self.dict_of_parts_in_temp_mod_position["Restriction Enzyme BSAI"]]
-            thermocycler_well_counter = self._process_combinations(
-                protocol=protocol, pipette=pipette,
-                combinations=self.odd_combinations,
-                restriction_enzyme=restriction_enzyme_bsai,
-                thermo_plate=thermo_plate, alum_block=alum_block,
-                dd_h2o=dd_h2o, t4_dna_ligase_buffer=t4_dna_ligase_buffer,
-                t4_dna_ligase=t4_dna_ligase, volume_reagents=volume_reagents,
-                thermocycler_well_counter=thermocycler_well_counter
-            )
+            reactions.extend(self._plan_combinations(self._iter_combinations(self.odd_roles), "Restriction Enzyme BSAI",
+                                                     thermocycler_well_counter + len(reactions)))
 
         if self.has_even:
-            restriction_enzyme_sapi = alum_block[self.dict_of_parts_in_temp_mod_position["Restriction Enzyme SAPI"]]
-            thermocycler_well_counter = self._process_combinations(
-                protocol=protocol, pipette=pipette,
-                combinations=self.even_combinations,
-                restriction_enzyme=restriction_enzyme_sapi,
-                thermo_plate=thermo_plate, alum_block=alum_block,
-                dd_h2o=dd_h2o, t4_dna_ligase_buffer=t4_dna_ligase_buffer,
-                t4_dna_ligase=t4_dna_ligase, volume_reagents=volume_reagents,
-                thermocycler_well_counter=thermocycler_well_counter
-            )
-
-        return thermocycler_well_counter
-
-    def _calculate_total_tips_needed(self, number_of_constant_reagents: int = 4) -> int:
-        """Calculate total tips for manual format"""
-        total_combinations = len(self.odd_combinations) + len(self.even_combinations)
-        reagent_tips = number_of_constant_reagents
-        total_reagent_tips = reagent_tips * total_combinations * self.replicates
-
-        total_part_tips = 0
-        for combination in self.odd_combinations + self.even_combinations:
-            total_part_tips += len(combination) * self.replicates
+            reactions.extend(self._plan_combinations(self._iter_combinations(self.even_roles), "Restriction Enzyme SAPI",
+                                                     thermocycler_well_counter + len(reactions)))
 
-        return total_reagent_tips + total_part_tips
+        return reactions
 
     # Manual format helper methods
     def _reset_assembly_state(self):
@@ -657,8 +1134,8 @@ class ManualLoopAssembly(BaseAssembly):
         self.parts_set = set()
         self.has_odd = False
         self.has_even = False
-        self.odd_combinations = []
-        self.even_combinations = []
+        self.odd_roles = []
+        self.even_roles = []
 
     def _get_assembly_type(self, receiver_name):
         """Determine if assembly is odd, even, or neither"""
@@ -672,8 +1149,8 @@ class ManualLoopAssembly(BaseAssembly):
             f"Check receiver naming."
         )
 
-    def _generate_combinations_for_assembly(self, assembly):
-        """Generate all possible part combinations for a single assembly"""
+    def _get_parts_per_role(self, assembly):
+        """Collect the candidate parts of every role of a single assembly"""
         parts_per_role = []
         for role, parts in assembly.items():
             if isinstance(parts, str):
@@ -684,7 +1161,11 @@ class ManualLoopAssembly(BaseAssembly):
             self.parts_set.update(parts_list)
             parts_per_role.append(parts_list)
 
-        return list(product(*parts_per_role))
+        return parts_per_role
+
+    def _iter_combinations(self, roles_per_assembly):
+        """Yield every part combination of the given assemblies"""
+        return chain.from_iterable(product(*parts_per_role) for parts_per_role in roles_per_assembly)
 
     def _validate_assembly_requirements(self):
         """Validate manual assembly requirements"""
@@ -695,7 +1176,7 @@ class ManualLoopAssembly(BaseAssembly):
             )
 
         reagent_positions = 3 + int(self.has_odd) + int(self.has_even)
-        max_parts = 24 - reagent_positions
+        max_parts = 24 - reagent_positions + self._get_overflow_capacity()
 
         if len(self.parts_set) > max_parts:
             raise ValueError(
@@ -706,74 +1187,33 @@ class ManualLoopAssembly(BaseAssembly):
             )
 
         available_wells = 96 - self.thermocycler_starting_well
-        total_combinations = len(self.odd_combinations) + len(self.even_combinations)
-        wells_needed = total_combinations * self.replicates
+        wells_needed = self.total_combinations * self.replicates
+        self._check_plate_count(wells_needed)
 
-        if wells_needed > available_wells:
+        if wells_needed > available_wells and not self.multi_plate:
             raise ValueError(
                 f'This protocol only supports assemblies with up to {available_wells} '
                 f'combinations. Number of combinations in the protocol are {wells_needed}.'
             )
 
-    def _process_combinations(self, protocol, pipette, combinations, restriction_enzyme,
-                              thermo_plate, alum_block, dd_h2o, t4_dna_ligase_buffer,
-                              t4_dna_ligase, volume_reagents, thermocycler_well_counter):
-        """Process combinations with specified restriction enzyme"""
-
+    def _plan_combinations(self, combinations, restriction_enzyme, thermocycler_well_counter) -> List[Dict]:
+        """Plan combinations with specified restriction enzyme"""
+        reactions = []
         for combination in combinations:
             for r in range(self.replicates):
-                dest_well = thermo_plate.wells()[thermocycler_well_counter]
-                dest_well_name = dest_well.well_name
-
-                volume_dd_h20 = self.volume_total_reaction - (volume_reagents + self.volume_part * len(combination))
-
-                # Add reagents
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=volume_dd_h20,
-                                     source=dd_h2o, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_t4_dna_ligase_buffer,
-                                     source=t4_dna_ligase_buffer, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_t4_dna_ligase_buffer, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_t4_dna_ligase,
-                                     source=t4_dna_ligase, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_t4_dna_ligase, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_restriction_enzyme,
-                                     source=restriction_enzyme, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_restriction_enzyme, touch_tip=True)
-
-                # Add parts
-                for i, part in enumerate(combination):
-                    part_source = alum_block[self.dict_of_parts_in_temp_mod_position[part]]
-                    if i == len(combination) - 1:  # Don't drop tip on last part
-                        self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_part,
-                                             source=part_source, dest=dest_well,
-                                             asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                             mix_before=self.volume_part, touch_tip=True, drop_tip=False)
-                    else:
-                        self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_part,
-                                             source=part_source, dest=dest_well,
-                                             asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                             mix_before=self.volume_part, touch_tip=True)
-
-                # Remove air bubbles
-                for _ in range(int(self.volume_total_reaction / 10)):
-                    self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_total_reaction,
-                                         source=dest_well.bottom(), dest=dest_well.bottom(8),
-                                         asp_rate=1.0, disp_rate=1.0, new_tip=False, drop_tip=False, touch_tip=True)
-                pipette.drop_tip()
+                reactions.append({
+                    'well': thermocycler_well_counter,
+                    'enzyme': restriction_enzyme,
+                    'parts': list(combination)
+                })
 
                 # Track combination
+                dest_well_name = well_name_from_index(thermocycler_well_counter)
                 self.dict_of_parts_in_thermocycler[f"Replicate: {r + 1}, Combination: {combination}"] = dest_well_name
                 self.dna_list_for_transformation_protocol.append(combination + (f'replicate_{r + 1}',))
                 thermocycler_well_counter += 1
 
-        return thermocycler_well_counter
+        return reactions
 
 
 class SBOLLoopAssembly(BaseAssembly):
@@ -835,92 +1275,28 @@ class SBOLLoopAssembly(BaseAssembly):
             temp_module_well_counter += 1
 
         # Load all unique parts (including backbones)
-        for part in sorted(self.combined_set):
-            self._load_reagent(protocol, module_labware=alum_block,
-                               well_position=temp_module_well_counter,
-                               name=f"{part}")
-            temp_module_well_counter += 1
-
-        return temp_module_well_counter
-
-    def _process_assembly_combinations(self, protocol, pipette, thermo_plate, alum_block,
-                                       dd_h2o, t4_dna_ligase_buffer, t4_dna_ligase,
-                                       volume_reagents, thermocycler_well_counter) -> int:
-        """Process SBOL assembly combinations with explicit enzyme selection"""
+        return self._load_parts(protocol, alum_block, temp_module_well_counter, sorted(self.combined_set))
 
+    def _plan_reactions(self, thermocycler_well_counter) -> List[Dict]:
+        """Plan SBOL assembly combinations with explicit enzyme selection"""
+        reactions = []
         for assembly_combo in self.assembly_combinations:
             for r in range(self.replicates):
-                dest_well = thermo_plate.wells()[thermocycler_well_counter]
-                dest_well_name = dest_well.well_name
-
                 parts = assembly_combo['parts']
-                enzyme_name = assembly_combo['enzyme']
                 product_name = assembly_combo['product']
-
-                volume_dd_h20 = self.volume_total_reaction - (volume_reagents + self.volume_part * len(parts))
-
-                # Add reagents
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=volume_dd_h20,
-                                     source=dd_h2o, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_t4_dna_ligase_buffer,
-                                     source=t4_dna_ligase_buffer, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_t4_dna_ligase_buffer, touch_tip=True)
-
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_t4_dna_ligase,
-                                     source=t4_dna_ligase, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_t4_dna_ligase, touch_tip=True)
-
-                # Add restriction enzyme (explicit from SBOL)
-                restriction_enzyme = alum_block[
-                    self.dict_of_parts_in_temp_mod_position[f"Restriction Enzyme {enzyme_name}"]]
-                self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_restriction_enzyme,
-                                     source=restriction_enzyme, dest=dest_well,
-                                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                     mix_before=self.volume_restriction_enzyme, touch_tip=True)
-
-                # Add parts (including backbone)
-                for i, part in enumerate(parts):
-                    part_source = alum_block[self.dict_of_parts_in_temp_mod_position[part]]
-                    if i == len(parts) - 1:  # Don't drop tip on last part
-                        self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_part,
-                                             source=part_source, dest=dest_well,
-                                             asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                             mix_before=self.volume_part, touch_tip=True, drop_tip=False)
-                    else:
-                        self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_part,
-                                             source=part_source, dest=dest_well,
-                                             asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                                             mix_before=self.volume_part, touch_tip=True)
-
-                # Remove air bubbles
-                for _ in range(int(self.volume_total_reaction / 10)):
-                    self.liquid_transfer(protocol=protocol, pipette=pipette, volume=self.volume_total_reaction,
-                                         source=dest_well.bottom(), dest=dest_well.bottom(8),
-                                         asp_rate=1.0, disp_rate=1.0, new_tip=False, drop_tip=False, touch_tip=True)
-                pipette.drop_tip()
+                reactions.append({
+                    'well': thermocycler_well_counter,
+                    'enzyme': f"Restriction Enzyme {assembly_combo['enzyme']}",
+                    'parts': list(parts)
+                })
 
                 # Track assembly
+                dest_well_name = well_name_from_index(thermocycler_well_counter)
                 self.dict_of_parts_in_thermocycler[f"Replicate: {r + 1}, Product: {product_name}"] = dest_well_name
                 self.dna_list_for_transformation_protocol.append(tuple(parts + [f'replicate_{r + 1}']))
                 thermocycler_well_counter += 1
 
-        return thermocycler_well_counter
-
-    def _calculate_total_tips_needed(self, number_of_constant_reagents: int = 4) -> int:
-        """Calculate total tips for SBOL format"""
-        total_assemblies = len(self.assembly_combinations)
-        reagent_tips = number_of_constant_reagents
-        total_reagent_tips = reagent_tips * total_assemblies * self.replicates
-
-        total_part_tips = 0
-        for assembly_combo in self.assembly_combinations:
-            total_part_tips += len(assembly_combo['parts']) * self.replicates
-
-        return total_reagent_tips + total_part_tips
+        return reactions
 
     # SBOL format helper methods
     def _reset_assembly_state(self):
@@ -949,7 +1325,7 @@ class SBOLLoopAssembly(BaseAssembly):
 
         # Calculate reagent positions: water(1) + ligase(1) + buffer(1) + unique enzymes
         reagent_positions = 3 + len(self.restriction_enzyme_set)
-        max_parts = 24 - reagent_positions
+        max_parts = 24 - reagent_positions + self._get_overflow_capacity()
 
         if len(self.combined_set) > max_parts:
             raise ValueError(
@@ -962,8 +1338,9 @@ class SBOLLoopAssembly(BaseAssembly):
         # Validate thermocycler capacity
         available_wells = 96 - self.thermocycler_starting_well
         wells_needed = len(self.assembly_combinations) * self.replicates
+        self._check_plate_count(wells_needed)
 
-        if wells_needed > available_wells:
+        if wells_needed > available_wells and not self.multi_plate:
             raise ValueError(
                 f'This protocol only supports assemblies with up to {available_wells} '
                 f'combinations. Number of assemblies in the protocol are {wells_needed}.'
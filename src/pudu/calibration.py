@@ -8,9 +8,14 @@ class BaseCalibration(ABC):
     """
     Abstract base class for calibration protocols.
     Contains shared hardware setup, liquid handling, and serial dilution functionality.
+    Layout well indexes count row by row (0 = A1, 1 = A2, ..., 12 = B1).
+    With a multichannel pipette, buffers and dilutions run column by column on all rows at once.
     Refer to: https://old.igem.org/wiki/images/a/a4/InterLab_2022_-_Calibration_Protocol_v2.pdf
     """
 
+    # Columns of the buffer plate used by the multichannel path, one per buffer fill
+    buffer_fills = 1
+
     def __init__(self,
                  aspiration_rate: float = 0.5,
                  dispense_rate: float = 1.0,
@@ -27,7 +32,13 @@ class BaseCalibration(ABC):
                  falcon_tube_rack_position: str = '2',
                  take_picture: bool = False,
                  take_video: bool = False,
-                 water_testing: bool = False):
+                 water_testing: bool = False,
+                 multi_dispense: bool = True,
+                 multichannel_pipette: Optional[str] = None,
+                 multichannel_pipette_position: str = 'right',
+                 multichannel_tiprack_position: str = '6',
+                 buffer_plate_labware: str = 'nest_96_wellplate_2ml_deep',
+                 buffer_plate_position: str = '4'):
 
         self.aspiration_rate = aspiration_rate
         self.dispense_rate = dispense_rate
@@ -45,12 +56,20 @@ class BaseCalibration(ABC):
         self.take_picture = take_picture
         self.take_video = take_video
         self.water_testing = water_testing
+        self.multi_dispense = multi_dispense
+        self.multichannel_pipette = multichannel_pipette
+        self.multichannel_pipette_position = multichannel_pipette_position
+        self.multichannel_tiprack_position = multichannel_tiprack_position
+        self.buffer_plate_labware = buffer_plate_labware
+        self.buffer_plate_position = buffer_plate_position
 
         # Shared tracking
         self.calibrant_positions = {}
         self.buffer_positions = {}
         self.camera = Camera()
         self.smart_pipette = None
+        self.smart_multichannel = None
+        self.buffer_plate = None
 
     @abstractmethod
     def _get_calibrant_layout(self) -> Dict:
@@ -86,6 +105,7 @@ class BaseCalibration(ABC):
             display_color=colors[color_index]
         )
         well.load_liquid(liquid, volume=volume)
+        self.smart_pipette.ledger.set_volume(well, volume)
         protocol.comment(f"Loaded {name} at position {well.well_name}")
         return well
 
@@ -104,8 +124,59 @@ class BaseCalibration(ABC):
                 self.falcon_tube_rack_position
             )
 
+        if self.multichannel_pipette:
+            multichannel_tiprack = protocol.load_labware(self.tiprack_labware, self.multichannel_tiprack_position)
+            multichannel = protocol.load_instrument(self.multichannel_pipette, self.multichannel_pipette_position,
+                                                    tip_racks=[multichannel_tiprack])
+            self.smart_multichannel = SmartPipette(multichannel, protocol, ledger=self.smart_pipette.ledger)
+            self.buffer_plate = protocol.load_labware(self.buffer_plate_labware, self.buffer_plate_position)
+
         return pipette, plate, tube_rack, falcon_tube_rack
 
+    @staticmethod
+    def _get_layout_wells(plate, start: int, end: int) -> List:
+        """Wells of a layout index range, counting row by row"""
+        return [well for row in plate.rows() for well in row][start:end]
+
+    @staticmethod
+    def _get_layout_columns(ranges: List) -> List[int]:
+        """Column indexes covered by layout ranges, which must span the same columns in every row"""
+        spans = {(start % 12, (end - 1) % 12 + 1) for start, end in ranges}
+        if len(spans) != 1:
+            raise ValueError(f"Multichannel mode needs every row to span the same columns, got {sorted(spans)}")
+        start, end = spans.pop()
+        return list(range(start, end))
+
+    def _load_buffer_plate(self, protocol, layout: Dict) -> Dict:
+        """
+        Load one buffer plate column per buffer fill for the multichannel pipette.
+        Each row holds the buffer of the matching calibration plate row, with 100 µL of dead volume.
+        The layout must use every row, as each channel aspirates and dilutes its own row.
+        """
+        channels = self.smart_multichannel.pipette.channels
+        rows = sorted({start // 12 for start, _ in layout['dilution_series']})
+        if rows != list(range(channels)):
+            raise ValueError(f"Multichannel mode needs a layout on all {channels} rows, this calibration uses "
+                             f"rows {''.join('ABCDEFGH'[row] for row in rows)}, run it with the single-channel pipette")
+
+        buffer_names = {'pbs': ("PBS Buffer", 0), 'water': ("Deionized Water", 1)}
+        columns = self._get_layout_columns([wells_range for buffer in buffer_names for wells_range, _ in layout[buffer]])
+        volume = 100 * len(columns) + 100
+        if volume > self.buffer_plate.wells()[0].max_volume:
+            raise ValueError(f"Buffer plate wells hold {self.buffer_plate.wells()[0].max_volume} µL, "
+                             f"{volume} µL are needed")
+
+        for fill in range(self.buffer_fills):
+            buffer_column = self.buffer_plate.columns()[fill]
+            for buffer, (name, color_index) in buffer_names.items():
+                for (start, _), _ in layout[buffer]:
+                    self._define_and_load_liquid(protocol, buffer_column[start // 12], f"{name} {fill + 1}",
+                                                 volume=volume, color_index=color_index)
+
+        buffers = {'buffer_columns': [column[0] for column in self.buffer_plate.columns()[:self.buffer_fills]]}
+        self.buffer_positions = buffers
+        return buffers
+
     def _load_dilution_buffers(self, protocol, tube_rack, falcon_tube_rack) -> Dict:
         """Load PBS and water buffers with falcon tube remapping if needed"""
         buffers = {}
@@ -125,16 +196,16 @@ class BaseCalibration(ABC):
         else:
             # Use individual tubes with liquid definition
             pbs_1 = self._define_and_load_liquid(
-                protocol, tube_rack['A3'], "PBS Buffer 1", volume=1000, color_index=0
+                protocol, tube_rack['A3'], "PBS Buffer 1", volume=1500, color_index=0
             )
             pbs_2 = self._define_and_load_liquid(
-                protocol, tube_rack['A4'], "PBS Buffer 2", volume=1000, color_index=0
+                protocol, tube_rack['A4'], "PBS Buffer 2", volume=1500, color_index=0
             )
             water_1 = self._define_and_load_liquid(
-                protocol, tube_rack['A5'], "Deionized Water 1", volume=1000, color_index=1
+                protocol, tube_rack['A5'], "Deionized Water 1", volume=1500, color_index=1
             )
             water_2 = self._define_and_load_liquid(
-                protocol, tube_rack['A6'], "Deionized Water 2", volume=1000, color_index=1
+                protocol, tube_rack['A6'], "Deionized Water 2", volume=1500, color_index=1
             )
             buffers['pbs_sources'] = [pbs_1, pbs_2]
             buffers['water_sources'] = [water_1, water_2]
@@ -142,36 +213,82 @@ class BaseCalibration(ABC):
         self.buffer_positions = buffers
         return buffers
 
+    def _fill_wells(self, wells, source, volume: float = 100, use_conical: bool = False,
+                    smart_pipette: SmartPipette = None) -> None:
+        """Fill wells from one buffer source with the tip already on the pipette"""
+        if smart_pipette is None:
+            smart_pipette = self.smart_pipette
+
+        if self.multi_dispense:
+            smart_pipette.multi_dispense(
+                volume=volume, source=source, destinations=wells,
+                asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
+                new_tip=False, drop_tip=False, use=use_conical
+            )
+            return
+
+        for well in wells:
+            smart_pipette.liquid_transfer(
+                volume=volume, source=source, destination=well,
+                asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
+                new_tip=False, drop_tip=False, use=use_conical
+            )
+
+    def _fill_columns(self, plate, layout: Dict, fill: int = 0) -> None:
+        """Fill the buffer columns of every row at once from one buffer plate column"""
+        multichannel = self.smart_multichannel.pipette
+        columns = self._get_layout_columns([wells_range for wells_range, _ in layout['pbs'] + layout['water']])
+
+        multichannel.pick_up_tip()
+        self._fill_wells([plate.rows()[0][column] for column in columns],
+                         self.buffer_positions['buffer_columns'][fill], smart_pipette=self.smart_multichannel)
+        multichannel.drop_tip()
+
+    def _perform_column_dilutions(self, plate, layout: Dict, mix_volume: float, mix_reps: int,
+                                  discard_final: bool = False) -> None:
+        """Perform the serial dilutions of every row at once, column by column"""
+        multichannel = self.smart_multichannel.pipette
+        columns = self._get_layout_columns([(start, end + 1) for start, end in layout['dilution_series']])
+        first_row = plate.rows()[0]
+
+        multichannel.pick_up_tip()
+        for column in columns[:-1]:
+            self.smart_multichannel.liquid_transfer(
+                volume=100, source=first_row[column], destination=first_row[column + 1],
+                asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
+                mix_before=mix_volume, mix_reps=mix_reps, new_tip=False, drop_tip=False
+            )
+
+        if discard_final:
+            # The waste tube cannot take eight tips, so the final dilution goes to the trash
+            final_well = first_row[columns[-1]]
+            multichannel.mix(mix_reps, mix_volume, final_well)
+            multichannel.aspirate(100, final_well, rate=self.aspiration_rate)
+            self.smart_multichannel.ledger.add(self.smart_multichannel.channel_wells(final_well), -100)
+            trash = multichannel.trash_container
+            multichannel.blow_out(trash['A1'] if hasattr(trash, 'wells') else trash)
+        multichannel.drop_tip()
+
     def _dispense_dilution_buffers(self, protocol, pipette, plate, buffers, wells_layout):
         """Dispense PBS and water to designated wells"""
+        if self.multichannel_pipette:
+            self._fill_columns(plate, wells_layout)
+            return
+
+        use_conical = self.use_falcon_tubes  # Enable conical tube handling for falcon tubes
+
         # Dispense PBS
         pipette.pick_up_tip()
         for wells_range, source_idx in wells_layout['pbs']:
-            target_wells = plate.wells()[wells_range[0]:wells_range[1]]
-            source = buffers['pbs_sources'][source_idx]
-            use_conical = self.use_falcon_tubes  # Enable conical tube handling for falcon tubes
-
-            for well in target_wells:
-                self.smart_pipette.liquid_transfer(
-                    volume=100, source=source, destination=well,
-                    asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                    new_tip=False, drop_tip=False, use=use_conical
-                )
+            target_wells = self._get_layout_wells(plate, *wells_range)
+            self._fill_wells(target_wells, buffers['pbs_sources'][source_idx], use_conical=use_conical)
         pipette.drop_tip()
 
         # Dispense water
         pipette.pick_up_tip()
         for wells_range, source_idx in wells_layout['water']:
-            target_wells = plate.wells()[wells_range[0]:wells_range[1]]
-            source = buffers['water_sources'][source_idx]
-            use_conical = self.use_falcon_tubes  # Enable conical tube handling for falcon tubes
-
-            for well in target_wells:
-                self.smart_pipette.liquid_transfer(
-                    volume=100, source=source, destination=well,
-                    asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
-                    new_tip=False, drop_tip=False, use=use_conical
-                )
+            target_wells = self._get_layout_wells(plate, *wells_range)
+            self._fill_wells(target_wells, buffers['water_sources'][source_idx], use_conical=use_conical)
         pipette.drop_tip()
 
     def run(self, protocol: protocol_api.ProtocolContext):
@@ -182,12 +299,15 @@ class BaseCalibration(ABC):
         # Load calibrants (protocol-specific)
         self._load_calibrants(protocol, tube_rack)
 
-        # Load dilution buffers
-        buffers = self._load_dilution_buffers(protocol, tube_rack, falcon_tube_rack)
-
         # Get layout for this specific protocol
         layout = self._get_calibrant_layout()
 
+        # Load dilution buffers
+        if self.multichannel_pipette:
+            buffers = self._load_buffer_plate(protocol, layout)
+        else:
+            buffers = self._load_dilution_buffers(protocol, tube_rack, falcon_tube_rack)
+
         # Media capture start
         if self.take_picture:
             self.camera.capture_picture(protocol, when="start")
@@ -267,12 +387,14 @@ class GFPODCalibration(BaseCalibration):
     def _perform_serial_dilutions(self, protocol, pipette, plate) -> None:
         """Perform 1:2 serial dilutions for fluorescein and microspheres"""
         layout = self._get_calibrant_layout()
+        if self.multichannel_pipette:
+            self._perform_column_dilutions(plate, layout, mix_volume=200, mix_reps=4)
+            return
 
         for start_idx, end_idx in layout['dilution_series']:
+            series_wells = self._get_layout_wells(plate, start_idx, end_idx + 1)
             pipette.pick_up_tip()
-            for i in range(start_idx, end_idx):
-                source_well = plate.wells()[i]
-                dest_well = plate.wells()[i + 1]
+            for source_well, dest_well in zip(series_wells, series_wells[1:]):
                 self.smart_pipette.liquid_transfer(
                     volume=100, source=source_well, destination=dest_well,
                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
@@ -287,6 +409,8 @@ class RGBODCalibration(BaseCalibration):
     Extended iGEM calibration protocol.
     """
 
+    buffer_fills = 2
+
     def _get_calibrant_layout(self) -> Dict:
         """Layout for RGB/OD600 calibration (4 calibrants, 2 replicates each)"""
         return {
@@ -347,19 +471,29 @@ class RGBODCalibration(BaseCalibration):
 
         if self.use_falcon_tubes and falcon_tube_rack:
             # Use falcon tubes for all buffers
-            pbs_falcon = falcon_tube_rack['A1']
-            water_falcon = falcon_tube_rack['A2']
+            pbs_falcon = self._define_and_load_liquid(
+                protocol, falcon_tube_rack['A1'], "PBS Buffer",
+                "Phosphate Buffered Saline for dilutions", volume=15000, color_index=0
+            )
+            water_falcon = self._define_and_load_liquid(
+                protocol, falcon_tube_rack['A2'], "Deionized Water",
+                "Deionized Water for dilutions", volume=15000, color_index=1
+            )
             buffers['pbs_sources'] = [pbs_falcon] * 8
             buffers['water_sources'] = [water_falcon] * 8
         else:
             # Use individual tubes
+            pbs_wells = ['A2', 'B2', 'C2', 'D2', 'A3', 'B3', 'C3', 'D3']
+            water_wells = ['A4', 'B4', 'C4', 'D4', 'A5', 'B5', 'C5', 'D5']
             buffers['pbs_sources'] = [
-                tube_rack['A2'], tube_rack['B2'], tube_rack['C2'], tube_rack['D2'],
-                tube_rack['A3'], tube_rack['B3'], tube_rack['C3'], tube_rack['D3']
+                self._define_and_load_liquid(protocol, tube_rack[well_name], f"PBS Buffer {i + 1}",
+                                             volume=1500, color_index=0)
+                for i, well_name in enumerate(pbs_wells)
             ]
             buffers['water_sources'] = [
-                tube_rack['A4'], tube_rack['B4'], tube_rack['C4'], tube_rack['D4'],
-                tube_rack['A5'], tube_rack['B5'], tube_rack['C5'], tube_rack['D5']
+                self._define_and_load_liquid(protocol, tube_rack[well_name], f"Deionized Water {i + 1}",
+                                             volume=1500, color_index=1)
+                for i, well_name in enumerate(water_wells)
             ]
 
         self.buffer_positions = buffers
@@ -392,13 +526,17 @@ class RGBODCalibration(BaseCalibration):
         mix_reps = 3
         binit = self.calibrant_positions['binit']
 
+        if self.multichannel_pipette:
+            self._perform_column_dilutions(plate, layout, mix_volume=mix_vol, mix_reps=mix_reps, discard_final=True)
+            self._fill_wells_to_200ul(protocol, pipette, plate)
+            return
+
         for start_idx, end_idx in layout['dilution_series']:
+            series_wells = self._get_layout_wells(plate, start_idx, end_idx + 1)
             pipette.pick_up_tip()
 
             # Serial dilutions
-            for i in range(start_idx, end_idx):
-                source_well = plate.wells()[i]
-                dest_well = plate.wells()[i + 1]
+            for source_well, dest_well in zip(series_wells, series_wells[1:]):
                 self.smart_pipette.liquid_transfer(
                     volume=100, source=source_well, destination=dest_well,
                     asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
@@ -406,7 +544,7 @@ class RGBODCalibration(BaseCalibration):
                 )
 
             # Discard final dilution to binit
-            final_well = plate.wells()[end_idx]
+            final_well = series_wells[-1]
             self.smart_pipette.liquid_transfer(
                 volume=100, source=final_well, destination=binit,
                 asp_rate=self.aspiration_rate, disp_rate=self.dispense_rate,
@@ -423,26 +561,21 @@ class RGBODCalibration(BaseCalibration):
         buffers = self.buffer_positions
         use_conical = self.use_falcon_tubes  # Enable conical tube handling for falcon tubes
 
+        if self.multichannel_pipette:
+            self._fill_columns(plate, layout, fill=1)
+            return
+
         # Add PBS to calibrant wells
         pipette.pick_up_tip()
         for wells_range, source_idx in layout['pbs']:
-            target_wells = plate.wells()[wells_range[0]:wells_range[1]]
-            source = buffers['pbs_sources'][source_idx]
-            for well in target_wells:
-                self.smart_pipette.liquid_transfer(
-                    protocol, pipette, 100, source, well,
-                    new_tip=False, drop_tip=False, use=use_conical
-                )
+            target_wells = self._get_layout_wells(plate, *wells_range)
+            # The second set of four tubes is reserved for the top-up
+            self._fill_wells(target_wells, buffers['pbs_sources'][source_idx + 4], use_conical=use_conical)
         pipette.drop_tip()
 
         # Add water to blank wells
         pipette.pick_up_tip()
         for wells_range, source_idx in layout['water']:
-            target_wells = plate.wells()[wells_range[0]:wells_range[1]]
-            source = buffers['water_sources'][source_idx]
-            for well in target_wells:
-                self.smart_pipette.liquid_transfer(
-                    protocol, pipette, 100, source, well,
-                    new_tip=False, drop_tip=False, use=use_conical
-                )
-        pipette.drop_tip()
\ No newline at end of file
+            target_wells = self._get_layout_wells(plate, *wells_range)
+            self._fill_wells(target_wells, buffers['water_sources'][source_idx + 4], use_conical=use_conical)
+        pipette.drop_tip()
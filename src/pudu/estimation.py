@@ -0,0 +1,408 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from opentrons import protocol_api
+from opentrons.protocols.labware import get_labware_definition
+from opentrons.types import Point
+
+AMBIENT_TEMPERATURE = 25.0
+
+PHASES = ['pipetting', 'mixing', 'air_bubble_removal', 'tip_swaps', 'labware_moves',
+          'temperature_ramps', 'profile_holds', 'delays']
+
+# Seconds per action, measured on an OT-2 with default speeds
+DEFAULT_TIMINGS = {
+    'move': 2.0,                  # gantry travel to a new well
+    'pick_up_tip': 4.0,
+    'drop_tip': 3.0,
+    'blow_out': 1.0,
+    'touch_tip': 2.0,
+    'air_gap': 1.0,
+    'manual_move_labware': 60.0,  # user moves labware on or off the deck
+    'gripper_move_labware': 20.0,
+    'lid': 20.0                   # thermocycler lid open or close
+}
+
+# Default aspirate/dispense flow rates in µL/s at rate=1.0, by pipette volume
+DEFAULT_FLOW_RATES = {
+    20: 7.56,
+    50: 57.0,
+    300: 92.86,
+    1000: 274.7
+}
+
+# Temperature ramp rates in °C/s
+DEFAULT_RAMP_RATES = {
+    'temperature_module': 0.06,
+    'thermocycler_block_heating': 4.4,
+    'thermocycler_block_cooling': 2.2,
+    'thermocycler_lid': 0.3
+}
+
+
+# OT-2 slot pitch in mm, slot 1 is the origin
+SLOT_PITCH = (132.5, 90.5)
+
+
+@lru_cache(maxsize=None)
+def _labware_definition(load_name: str) -> Dict:
+    return get_labware_definition(load_name)
+
+
+def _slot_origin(location) -> Point:
+    """Front left corner of a deck slot, modules are placed at the origin of their slot"""
+    if isinstance(location, _RecordedModule):
+        location = location.location or ('7' if location.is_thermocycler else None)
+    if location is None or location == protocol_api.OFF_DECK:
+        return Point(0, 0, 0)
+    column, row = divmod(int(location) - 1, 3)[::-1]
+    return Point(column * SLOT_PITCH[0], row * SLOT_PITCH[1], 0)
+
+
+class DeckTimeRecorder:
+    """
+    Minimal stand-in for a ProtocolContext that records the commands a PUDU protocol issues
+    and costs them, without the hardware simulator.
+
+    Only the parts of the Protocol API used by PUDU are implemented. is_simulating() returns
+    False so the timed path is the one a real run takes; disable take_picture and take_video
+    before estimating. dry_run keeps the tip state file and the run journal untouched.
+    """
+    dry_run = True
+
+    def __init__(self, timings: Dict = None, flow_rates: Dict = None, ramp_rates: Dict = None):
+        self.timings = {**DEFAULT_TIMINGS, **(timings or {})}
+        self.flow_rates = {**DEFAULT_FLOW_RATES, **(flow_rates or {})}
+        self.ramp_rates = {**DEFAULT_RAMP_RATES, **(ramp_rates or {})}
+        self.commands = []
+
+    def record(self, command: str, phase: str, seconds: float, **details) -> Dict:
+        entry = {'command': command, 'phase': phase, 'seconds': seconds, **details}
+        self.commands.append(entry)
+        return entry
+
+    # Protocol API
+    def is_simulating(self) -> bool:
+        return False
+
+    def comment(self, msg: str) -> None:
+        pass
+
+    def pause(self, msg: str = None) -> None:
+        pass
+
+    def delay(self, seconds: float = 0, minutes: float = 0, msg: str = None) -> None:
+        self.record('delay', 'delays', seconds + minutes * 60)
+
+    def define_liquid(self, name: str, description: str = None, display_color: str = None) -> Dict:
+        return {'name': name, 'description': description, 'display_color': display_color}
+
+    def load_labware(self, load_name: str, location=None, label: str = None, **kwargs) -> '_RecordedLabware':
+        return _RecordedLabware(load_name, location)
+
+    def load_module(self, module_name: str, location=None, configuration: str = None) -> '_RecordedModule':
+        return _RecordedModule(self, module_name, location)
+
+    def load_instrument(self, instrument_name: str, mount: str, tip_racks: List = None) -> '_RecordedPipette':
+        return _RecordedPipette(self, instrument_name, mount, tip_racks or [])
+
+    def move_labware(self, labware, new_location, use_gripper: bool = False) -> None:
+        phase = 'tip_swaps' if labware.is_tiprack else 'labware_moves'
+        timing = 'gripper_move_labware' if use_gripper else 'manual_move_labware'
+        self.record('move_labware', phase, self.timings[timing], labware=labware.load_name,
+                    off_deck=new_location == protocol_api.OFF_DECK)
+        labware.location = new_location
+
+
+class _RecordedLocation:
+    def __init__(self, well: '_RecordedWell'):
+        self.well = well
+        self.point = _slot_origin(well.parent.location) + well.offset
+
+
+class _RecordedWell:
+    def __init__(self, parent: '_RecordedLabware', well_name: str, definition: Dict):
+        self.parent = parent
+        self.well_name = well_name
+        self.max_volume = definition.get('totalLiquidVolume', 0)
+        self.depth = definition.get('depth', 0)
+        self.diameter = definition.get('diameter')
+        self.offset = Point(definition.get('x', 0), definition.get('y', 0), definition.get('z', 0))
+        self.volume = 0.0
+
+    def load_liquid(self, liquid, volume: float) -> None:
+        self.volume = volume
+
+    def current_liquid_volume(self) -> float:
+        return self.volume
+
+    def top(self, z: float = 0.0) -> _RecordedLocation:
+        return _RecordedLocation(self)
+
+    def bottom(self, z: float = 0.0) -> _RecordedLocation:
+        return _RecordedLocation(self)
+
+    def center(self) -> _RecordedLocation:
+        return _RecordedLocation(self)
+
+
+class _RecordedLabware:
+    def __init__(self, load_name: str, location):
+        definition = _labware_definition(load_name)
+        self.load_name = load_name
+        self.location = location
+        self.is_tiprack = definition['parameters'].get('isTiprack', False)
+        self._columns = [[_RecordedWell(self, name, definition['wells'][name]) for name in column]
+                         for column in definition['ordering']]
+        self._wells = [well for column in self._columns for well in column]
+        self._wells_by_name = {well.well_name: well for well in self._wells}
+
+    def __getitem__(self, well_name: str) -> _RecordedWell:
+        return self._wells_by_name[well_name]
+
+    def wells(self) -> List[_RecordedWell]:
+        return list(self._wells)
+
+    def wells_by_name(self) -> Dict[str, _RecordedWell]:
+        return dict(self._wells_by_name)
+
+    def columns(self) -> List[List[_RecordedWell]]:
+        return [list(column) for column in self._columns]
+
+    def rows(self) -> List[List[_RecordedWell]]:
+        return [list(row) for row in zip(*self._columns)]
+
+
+class _RecordedModule:
+    def __init__(self, recorder: DeckTimeRecorder, module_name: str, location):
+        self.recorder = recorder
+        self.module_name = module_name
+        self.location = location
+        self.is_thermocycler = 'thermocycler' in module_name.lower()
+        self.temperature = AMBIENT_TEMPERATURE
+        self.lid_temperature = AMBIENT_TEMPERATURE
+
+    def load_labware(self, name: str, label: str = None, **kwargs) -> _RecordedLabware:
+        return _RecordedLabware(name, self)
+
+    def _ramp(self, command: str, temperature: float) -> None:
+        if self.is_thermocycler:
+            heating = temperature > self.temperature
+            rate = self.recorder.ramp_rates['thermocycler_block_heating' if heating
+                                            else 'thermocycler_block_cooling']
+        else:
+            rate = self.recorder.ramp_rates['temperature_module']
+        self.recorder.record(command, 'temperature_ramps', abs(temperature - self.temperature) / rate,
+                             temperature=temperature)
+        self.temperature = temperature
+
+    # Temperature module
+    def set_temperature(self, celsius: float) -> None:
+        self._ramp('set_temperature', celsius)
+
+    def deactivate(self) -> None:
+        self.temperature = AMBIENT_TEMPERATURE
+
+    # Thermocycler
+    def set_block_temperature(self, temperature: float, hold_time_seconds: float = None,
+                              hold_time_minutes: float = None, ramp_rate: float = None,
+                              block_max_volume: float = None) -> None:
+        self._ramp('set_block_temperature', temperature)
+        hold = (hold_time_seconds or 0) + (hold_time_minutes or 0) * 60
+        if hold:
+            self.recorder.record('hold', 'profile_holds', hold, temperature=temperature)
+
+    def set_lid_temperature(self, temperature: float) -> None:
+        seconds = abs(temperature - self.lid_temperature) / self.recorder.ramp_rates['thermocycler_lid']
+        self.recorder.record('set_lid_temperature', 'temperature_ramps', seconds, temperature=temperature)
+        self.lid_temperature = temperature
+
+    def execute_profile(self, steps: List[Dict], repetitions: int, block_max_volume: float = None) -> None:
+        for _ in range(repetitions):
+            for step in steps:
+                self.set_block_temperature(step['temperature'],
+                                           hold_time_seconds=step.get('hold_time_seconds'),
+                                           hold_time_minutes=step.get('hold_time_minutes'))
+
+    def open_lid(self) -> None:
+        self.recorder.record('open_lid', 'labware_moves', self.recorder.timings['lid'])
+
+    def close_lid(self) -> None:
+        self.recorder.record('close_lid', 'labware_moves', self.recorder.timings['lid'])
+
+    def deactivate_lid(self) -> None:
+        self.lid_temperature = AMBIENT_TEMPERATURE
+
+    def deactivate_block(self) -> None:
+        self.temperature = AMBIENT_TEMPERATURE
+
+
+class _RecordedPipette:
+    def __init__(self, recorder: DeckTimeRecorder, name: str, mount: str, tip_racks: List):
+        self.recorder = recorder
+        self.name = name
+        self.mount = mount
+        self.tip_racks = tip_racks
+        self.starting_tip = None
+        self.trash_container = _RecordedLabware('opentrons_1_trash_1100ml_fixed', '12')
+        match = re.search(r'p(\d+)_', name)
+        self.max_volume = float(match.group(1)) if match else 20.0
+        self.flow_rate = recorder.flow_rates.get(int(self.max_volume), self.max_volume / 3)
+        self.has_tip = False
+        self._well = None
+        self._last_aspirate = None
+        self._last_aspirate_well = None
+        self._phase = None
+
+    def _well_of(self, location) -> Optional[_RecordedWell]:
+        if location is None:
+            return self._well
+        return getattr(location, 'well', location)
+
+    def _move(self, well) -> float:
+        if well is None or well is self._well:
+            return 0.0
+        self._well = well
+        return self.recorder.timings['move']
+
+    def pick_up_tip(self, location=None) -> None:
+        self._well = None
+        self.recorder.record('pick_up_tip', 'tip_swaps', self.recorder.timings['pick_up_tip'], pipette=self.name)
+        self.has_tip = True
+
+    def drop_tip(self, location=None) -> None:
+        self._well = None
+        self.recorder.record('drop_tip', 'tip_swaps', self.recorder.timings['drop_tip'], pipette=self.name)
+        self.has_tip = False
+
+    def aspirate(self, volume: float = None, location=None, rate: float = 1.0) -> None:
+        well = self._well_of(location)
+        volume = self.max_volume if volume is None else volume
+        seconds = self._move(well) + volume / (self.flow_rate * rate)
+        if well is not None:
+            well.volume = max(0.0, well.volume - volume)
+        self._last_aspirate = self.recorder.record('aspirate', self._phase or 'pipetting', seconds,
+                                                   pipette=self.name, volume=volume,
+                                                   well=getattr(well, 'well_name', None))
+        self._last_aspirate_well = well
+
+    def dispense(self, volume: float = None, location=None, rate: float = 1.0) -> None:
+        well = self._well_of(location)
+        volume = self.max_volume if volume is None else volume
+        seconds = self._move(well) + volume / (self.flow_rate * rate)
+        if well is not None:
+            well.volume += volume
+        phase = self._phase or 'pipetting'
+        # Aspirating and dispensing in the same well outside of a mix is an air bubble removal
+        if self._phase is None and self._last_aspirate and self._last_aspirate_well is well:
+            phase = 'air_bubble_removal'
+            self._last_aspirate['phase'] = phase
+        self._last_aspirate = None
+        self.recorder.record('dispense', phase, seconds, pipette=self.name, volume=volume,
+                             well=getattr(well, 'well_name', None))
+
+    def mix(self, repetitions: int = 1, volume: float = None, location=None, rate: float = 1.0) -> None:
+        self._phase = 'mixing'
+        for _ in range(repetitions):
+            self.aspirate(volume, location, rate=rate)
+            self.dispense(volume, location, rate=rate)
+        self._phase = None
+
+    def blow_out(self, location=None) -> None:
+        self._move(self._well_of(location))
+        self.recorder.record('blow_out', self._phase or 'pipetting', self.recorder.timings['blow_out'],
+                             pipette=self.name)
+
+    def touch_tip(self, location=None, radius: float = 1.0, v_offset: float = -1.0, speed: float = 60.0) -> None:
+        seconds = self._move(self._well_of(location)) + self.recorder.timings['touch_tip']
+        self.recorder.record('touch_tip', 'pipetting', seconds, pipette=self.name)
+
+    def air_gap(self, volume: float = None, height: float = None) -> None:
+        self.recorder.record('air_gap', 'pipetting', self.recorder.timings['air_gap'], pipette=self.name)
+
+    def transfer(self, volume: float, source, dest, new_tip: str = 'once', mix_before=None,
+                 mix_after=None, blow_out: bool = False, touch_tip: bool = False, **kwargs) -> None:
+        """Transfer one volume from a single source to one or several destinations."""
+        dests = dest if isinstance(dest, list) else [dest]
+        if new_tip == 'once':
+            self.pick_up_tip()
+        for target in dests:
+            if new_tip == 'always':
+                self.pick_up_tip()
+            remaining = volume
+            while remaining > 0:
+                step = min(remaining, self.max_volume)
+                if mix_before:
+                    self.mix(*mix_before, location=source)
+                self.aspirate(step, source)
+                self.dispense(step, target)
+                if mix_after:
+                    self.mix(*mix_after, location=target)
+                if blow_out:
+                    self.blow_out()
+                if touch_tip:
+                    self.touch_tip()
+                remaining -= step
+            if new_tip == 'always':
+                self.drop_tip()
+        if new_tip == 'once':
+            self.drop_tip()
+
+    def distribute(self, volume: float, source, dest, new_tip: str = 'once', disposal_volume: float = None,
+                   mix_before=None, air_gap: float = 0, **kwargs) -> None:
+        """Distribute one volume to several destinations, refilling the tip when it runs out."""
+        dests = dest if isinstance(dest, list) else [dest]
+        disposal = self.max_volume * 0.1 if disposal_volume is None else disposal_volume
+        per_aspiration = max(1, int((self.max_volume - disposal) // (volume + air_gap)))
+        if new_tip != 'never':
+            self.pick_up_tip()
+        for i in range(0, len(dests), per_aspiration):
+            chunk = dests[i:i + per_aspiration]
+            if mix_before:
+                self.mix(*mix_before, location=source)
+            self.aspirate(volume * len(chunk) + disposal, source)
+            for target in chunk:
+                if air_gap:
+                    self.air_gap(air_gap)
+                self.dispense(volume, target)
+            if disposal:
+                self.blow_out()
+        if new_tip != 'never':
+            self.drop_tip()
+
+
+def estimate_deck_time(protocol_instance, timings: Dict = None, flow_rates: Dict = None,
+                       ramp_rates: Dict = None) -> Dict:
+    """
+    Predict the wall-clock time of a PUDU protocol without running the simulator.
+
+    Args:
+        protocol_instance: Any PUDU protocol object with a run(protocol) method
+        timings, flow_rates, ramp_rates: Overrides for the default cost models
+
+    Returns:
+        dict with the total seconds, the seconds and command count per phase
+    """
+    recorder = DeckTimeRecorder(timings, flow_rates, ramp_rates)
+    protocol_instance.run(recorder)
+
+    estimate = {
+        'total_seconds': 0.0,
+        'phases': {phase: 0.0 for phase in PHASES},
+        'commands': {phase: 0 for phase in PHASES}
+    }
+    for command in recorder.commands:
+        estimate['phases'][command['phase']] += command['seconds']
+        estimate['commands'][command['phase']] += 1
+        estimate['total_seconds'] += command['seconds']
+    return estimate
+
+
+def format_deck_time(estimate: Dict) -> str:
+    """Human readable report of a deck time estimate"""
+    lines = [f"Estimated deck time: {estimate['total_seconds'] / 60:.1f} min"]
+    for phase in PHASES:
+        if estimate['commands'][phase]:
+            lines.append(f"  {phase.replace('_', ' ')}: {estimate['phases'][phase] / 60:.1f} min "
+                         f"({estimate['commands'][phase]} commands)")
+    return "\n".join(lines)
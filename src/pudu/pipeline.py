@@ -0,0 +1,137 @@
+from opentrons import protocol_api
+from opentrons.protocol_api.validation import ensure_module_model
+from typing import Dict
+from pudu.assembly import BaseAssembly
+from pudu.transformation import HeatShockTransformation
+from pudu.plating import Plating
+from pudu.planning import well_index_from_name
+
+
+class Pipeline():
+    """
+    Chains an assembly, a heat shock transformation and a plating protocol, handing the well map of each
+    stage to the next so no well is copied by hand between protocols.
+
+    transformation and plating are the keyword arguments of HeatShockTransformation and Plating, without the
+    DNA list and bacterium locations they receive from the previous stage.
+
+    plan() returns the three stages to run as separate sessions: the assembly plate is moved to the DNA plate
+    position of the transformation, and the transformation plate stays in the thermocycler for plating.
+    run() performs the assembly and the transformation as one robot session: the assembly plate never leaves
+    the thermocycler, the transformations go in the wells after the assemblies, modules and pipettes are kept,
+    and only the labware in a slot the transformation loads into is taken off the deck.
+    Plating needs the slot the temperature module takes, so it always runs as its own session.
+    """
+    def __init__(self,
+                 assembly: BaseAssembly = None,
+                 transformation: Dict = None,
+                 plating: Dict = None):
+        if assembly is None:
+            raise ValueError("Must input an assembly")
+        self.assembly = assembly
+        self.transformation = transformation if transformation is not None else {}
+        self.plating = plating if plating is not None else {}
+        self.stages = {}
+
+    def plan(self, continuous: bool = False) -> Dict:
+        """
+        Plan the assembly and build the transformation and plating stages from its well map.
+
+        Parameters:
+        - continuous: Plan the transformation for the session of the assembly, with the DNA in the thermocycler
+
+        Returns:
+        - Dictionary with the 'assembly', 'transformation' and 'plating' protocol objects
+        """
+        self.assembly.plan()
+        well_map = self.assembly.thermocycler_well_map
+        dna_wells = list(well_map)
+        if any(well.startswith('Plate ') for well in dna_wells):
+            raise ValueError("Only assemblies on a single thermocycler plate can be chained to a transformation")
+
+        transformation = {'thermocycler_labware': self.assembly.thermocycler_labware, **self.transformation,
+                          'list_of_dna': list(well_map.values()), 'dna_wells': dna_wells}
+        if continuous:
+            #The transformations follow the assemblies in the same plate
+            last_well = max(well_index_from_name(well) for well in dna_wells)
+            transformation['thermocycler_starting_well'] = max(last_well + 1,
+                                                               transformation.get('thermocycler_starting_well', 0))
+            transformation.setdefault('temperature_module_position', self.assembly.temperature_module_position)
+            transformation['thermocycler_labware'] = self.assembly.thermocycler_labware
+            transformation['dna_in_thermocycler'] = True
+        else:
+            transformation['use_dna_96plate'] = True
+            transformation['dna_plate'] = self.assembly.thermocycler_labware
+        transformation = HeatShockTransformation(**transformation)
+
+        plating = Plating(**{'thermocycler_labware': transformation.thermocycler_labware, **self.plating,
+                             'bacterium_locations': transformation.plan_wells()})
+        self.stages = {'assembly': self.assembly, 'transformation': transformation, 'plating': plating}
+        return self.stages
+
+    def run(self, protocol: protocol_api.ProtocolContext):
+        """Run the assembly and the transformation in one session, plating is left as the next protocol"""
+        stages = self.plan(continuous=True)
+        stages['assembly'].run(protocol)
+        protocol.comment("Assembly complete, preparing the deck for the transformation")
+        assembly_plate = stages['assembly'].thermocycler_module.labware
+        stages['transformation'].run(_SessionContext(protocol, keep=[assembly_plate]))
+        protocol.comment(f"Transformation complete, plate the wells "
+                         f"{list(stages['plating'].bacterium_locations)} with the plating stage")
+
+
+class _SessionContext():
+    """
+    Protocol context for a stage that follows another one in the same session. Modules and pipettes already
+    loaded are reused, the kept labware stays on its module, and any other labware in a slot or on a module
+    the stage loads into is moved off the deck first.
+    """
+    def __init__(self, protocol, keep=None):
+        self._protocol = protocol
+        self._keep = keep if keep is not None else []
+
+    def __getattr__(self, name):
+        return getattr(self._protocol, name)
+
+    def load_module(self, module_name, location=None, configuration=None):
+        model = ensure_module_model(module_name).value
+        for module in self._protocol.loaded_modules.values():
+            if module.model == model and (location is None or str(location) == module.parent):
+                return _SessionModule(module, self._protocol, self._keep)
+        return self._protocol.load_module(module_name, location, configuration)
+
+    def load_labware(self, load_name, location, *args, **kwargs):
+        if location != protocol_api.OFF_DECK and self._protocol.deck[location] is not None:
+            _clear(self._protocol, self._protocol.deck[location], location)
+        return self._protocol.load_labware(load_name, location, *args, **kwargs)
+
+    def load_instrument(self, instrument_name, mount, *args, **kwargs):
+        pipette = self._protocol.loaded_instruments.get(mount)
+        if pipette is not None and pipette.name == instrument_name:
+            return pipette
+        return self._protocol.load_instrument(instrument_name, mount, *args, **kwargs)
+
+
+class _SessionModule():
+    """Module already on the deck, handing its kept labware to the next stage"""
+    def __init__(self, module, protocol, keep):
+        self._module = module
+        self._protocol = protocol
+        self._keep = keep
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+    def load_labware(self, name, *args, **kwargs):
+        labware = self._module.labware
+        if labware is not None:
+            if labware in self._keep and labware.load_name == name:
+                return labware
+            _clear(self._protocol, labware, f"the {self._module.model} in slot {self._module.parent}")
+        return self._module.load_labware(name, *args, **kwargs)
+
+
+def _clear(protocol, labware, location):
+    """Move the labware of a previous stage off the deck"""
+    protocol.comment(f"Take {labware.load_name} off {location}")
+    protocol.move_labware(labware, protocol_api.OFF_DECK)
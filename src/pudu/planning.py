@@ -0,0 +1,315 @@
+import hashlib
+import json
+import math
+import os
+import re
+from typing import List, Dict, Set, Tuple, Union
+
+ROWS = 'ABCDEFGH'
+WELLS_PER_PLATE = 96
+# Default OT-2 gantry speed in the x/y plane, mm/s
+GANTRY_SPEED = 400.0
+WELL_PLACEMENTS = ('column_major', 'replicate_columns', 'avoid_edges')
+
+
+def well_name_from_index(index: int, rows: int = 8) -> str:
+    """
+    Return the well name for a column-major well index (0 -> 'A1', 8 -> 'A2').
+    Indexes beyond the first plate are prefixed with their plate batch (96 -> 'Plate 2 A1').
+    """
+    plate, well = divmod(index, WELLS_PER_PLATE)
+    name = f"{ROWS[well % rows]}{well // rows + 1}"
+    if plate > 0:
+        return f"Plate {plate + 1} {name}"
+    return name
+
+
+def well_index_from_name(name: str, rows: int = 8) -> int:
+    """Return the column-major index of a well name on the first plate ('A1' -> 0, 'A2' -> 8)."""
+    if not re.fullmatch(rf'[{ROWS[:rows]}]\d+', name):
+        raise ValueError(f"'{name}' is not a well of a single plate")
+    return (int(name[1:]) - 1) * rows + ROWS.index(name[0])
+
+
+def place_wells(count: int, policy: str = 'column_major', starting_well: int = 0, group_size: int = 1,
+                rows: int = 8, columns: int = 12) -> List[int]:
+    """
+    Column-major well indexes for count samples in their planned order, continuing on further plates
+    once a plate is full. Consecutive groups of group_size samples are the replicates of one construct.
+
+    Policies:
+        'column_major': consecutive wells from starting_well
+        'replicate_columns': a group never spans two columns, so a multichannel pipette reaches
+                             all replicates of a construct at once
+        'avoid_edges': skip the outer rows and columns, where evaporation is highest
+    """
+    if policy not in WELL_PLACEMENTS:
+        raise ValueError(f"Unknown well placement '{policy}', choose one of {list(WELL_PLACEMENTS)}")
+    if policy == 'replicate_columns' and group_size > rows:
+        raise ValueError(f"Groups of {group_size} replicates do not fit in a column of {rows} wells")
+    wells = []
+    well = starting_well
+    while len(wells) < count:
+        row, column = well % rows, well % (rows * columns) // rows
+        if policy == 'avoid_edges' and (row in (0, rows - 1) or column in (0, columns - 1)):
+            well += 1
+            continue
+        if policy == 'replicate_columns' and len(wells) % group_size == 0 and row + group_size > rows:
+            well += rows - row
+            continue
+        wells.append(well)
+        well += 1
+    return wells
+
+
+def summarize_plan(plan: List[Dict]) -> Dict:
+    """
+    Summarize a liquid-handling plan without a protocol context.
+
+    Returns:
+        dict with the number of transfers, tips, destination wells and the
+        volume drawn from every source.
+    """
+    summary = {
+        'operations': len(plan),
+        'transfers': 0,
+        'tips': 0,
+        'wells': 0,
+        'plates': 1,
+        'volume_per_source': {}
+    }
+    wells = set()
+    for operation in plan:
+        if operation.get('new_tip'):
+            summary['tips'] += 1
+        if operation['op'] == 'swap_plate':
+            summary['plates'] += 1
+            continue
+        if operation['op'] == 'mix_plate':
+            continue
+        dests = operation['dests'] if operation['op'] == 'distribute' else [operation['dest']]
+        if operation['op'] in ('transfer', 'distribute'):
+            summary['transfers'] += len(dests)
+            source = operation['source']
+            summary['volume_per_source'][source] = (summary['volume_per_source'].get(source, 0)
+                                                    + operation['volume'] * len(dests))
+        wells.update(dests)
+    summary['wells'] = len(wells)
+    return summary
+
+
+def tip_demand(plan: List[Dict], pipette: str, tiprack_labware: str) -> Dict[str, Dict[str, int]]:
+    """
+    Count the tip pickups of a plan per pipette and tip rack type.
+    Operations may name their own 'pipette' and 'tiprack', otherwise the defaults are used.
+
+    Returns:
+        dict of pipette name -> tip rack labware -> tip pickups
+    """
+    demand = {}
+    for operation in plan:
+        if not operation.get('new_tip'):
+            continue
+        racks = demand.setdefault(operation.get('pipette', pipette), {})
+        rack = operation.get('tiprack', tiprack_labware)
+        racks[rack] = racks.get(rack, 0) + 1
+    return demand
+
+
+def _operation_stops(operation: Dict) -> List[Union[str, int]]:
+    """Sources and wells an operation visits, in order."""
+    if operation['op'] == 'transfer':
+        return [operation['source'], operation['dest']]
+    if operation['op'] == 'distribute':
+        return [operation['source']] + operation['dests']
+    if operation['op'] == 'remove_bubbles':
+        return [operation['dest']]
+    return []
+
+
+def route_distance(plan: List[Dict], points: Dict) -> float:
+    """
+    Head travel in mm while a tip is held, from source to wells and back.
+    Trips to the tip racks and the trash are the same for any order of the wells and are left out.
+
+    Args:
+        plan: Planned operations
+        points: (x, y) deck coordinates of every source name and destination well index
+    """
+    distance = 0.0
+    previous = None
+    for operation in plan:
+        stops = _operation_stops(operation)
+        if not stops:
+            previous = None
+            continue
+        if operation.get('new_tip'):
+            previous = None
+        for stop in stops:
+            if previous is not None:
+                distance += math.dist(points[previous], points[stop])
+            previous = stop
+        if operation.get('drop_tip'):
+            previous = None
+    return distance
+
+
+def _sweep_distance(source, chunks: List[List[int]], points: Dict) -> float:
+    """Travel of one multi-dispense sweep, returning to the source before every chunk."""
+    distance = 0.0
+    for chunk in chunks:
+        stops = [source] + chunk
+        distance += sum(math.dist(points[a], points[b]) for a, b in zip(stops, stops[1:]))
+    distance += sum(math.dist(points[chunk[-1]], points[source]) for chunk in chunks[:-1])
+    return distance
+
+
+def _order_sweep(source, chunks: List[List[int]], points: Dict) -> List[List[int]]:
+    """
+    Reorder the wells of a multi-dispense sweep, keeping the chunk sizes.
+    Each chunk takes the wells nearest to the previous stop, then 2-opt untangles the chunk.
+    """
+    remaining = [well for chunk in chunks for well in chunk]
+    ordered = []
+    for chunk in chunks:
+        route = []
+        position = points[source]
+        for _ in chunk:
+            well = min(remaining, key=lambda candidate: math.dist(position, points[candidate]))
+            remaining.remove(well)
+            route.append(well)
+            position = points[well]
+
+        improved = True
+        while improved:
+            improved = False
+            stops = [source] + route
+            for i in range(1, len(stops) - 1):
+                for j in range(i + 1, len(stops)):
+                    after = stops[j + 1] if j + 1 < len(stops) else None
+                    before = math.dist(points[stops[i - 1]], points[stops[i]])
+                    reversed_ = math.dist(points[stops[i - 1]], points[stops[j]])
+                    if after is not None:
+                        before += math.dist(points[stops[j]], points[after])
+                        reversed_ += math.dist(points[stops[i]], points[after])
+                    if reversed_ < before - 1e-9:
+                        stops[i:j + 1] = reversed(stops[i:j + 1])
+                        improved = True
+            route = stops[1:]
+        ordered.append(route)
+    return ordered
+
+
+def optimize_route(plan: List[Dict], points: Dict, gantry_speed: float = GANTRY_SPEED) -> Tuple[List[Dict], Dict]:
+    """
+    Shorten head travel by reordering the wells of every multi-dispense sweep.
+
+    A sweep is one tip's run of distribute operations of a single reagent. Its wells already hold every earlier
+    addition and receive the same volume, so their order does not change what ends up in any well. Transfers
+    and part additions are not moved: each one picks up a fresh tip and drops it in the trash, so their order
+    does not change the distance travelled.
+
+    Args:
+        plan: Planned operations
+        points: (x, y) deck coordinates of every source name and destination well index
+        gantry_speed: Head speed in mm/s used to convert the distance saved into time
+
+    Returns:
+        The reordered plan, and a report with the distance before and after in mm and the seconds saved
+    """
+    optimized = [dict(operation) for operation in plan]
+    sweep = []
+    for operation in optimized:
+        if operation['op'] != 'distribute':
+            continue
+        sweep.append(operation)
+        if not operation['drop_tip']:
+            continue
+        chunks = _order_sweep(sweep[0]['source'], [chunk['dests'] for chunk in sweep], points)
+        if (_sweep_distance(sweep[0]['source'], chunks, points)
+                < _sweep_distance(sweep[0]['source'], [chunk['dests'] for chunk in sweep], points)):
+            for chunk, dests in zip(sweep, chunks):
+                chunk['dests'] = dests
+        sweep = []
+
+    before = route_distance(plan, points)
+    after = route_distance(optimized, points)
+    report = {
+        'distance_before_mm': before,
+        'distance_after_mm': after,
+        'saved_mm': before - after,
+        'saved_seconds': (before - after) / gantry_speed
+    }
+    return optimized, report
+
+
+def save_plan(plan: List[Dict], filename: str) -> None:
+    """Write a plan to a JSON file so it can be cached or diffed."""
+    with open(filename, 'w') as plan_file:
+        json.dump(plan, plan_file, indent=1)
+
+
+def load_plan(filename: str) -> List[Dict]:
+    """Read a plan previously written with save_plan."""
+    with open(filename) as plan_file:
+        return json.load(plan_file)
+
+
+class RunJournal:
+    """
+    Append-only record of the plan operations a run has started and finished.
+    Every entry is flushed to disk before the robot moves on, so an aborted run can be resumed.
+    """
+
+    def __init__(self, filename: str, plan: List[Dict]):
+        self.filename = filename
+        self.plan_digest = hashlib.sha1(json.dumps(plan, sort_keys=True).encode()).hexdigest()
+
+    def exists(self) -> bool:
+        """Whether a previous run left a journal."""
+        return os.path.exists(self.filename)
+
+    def start(self) -> None:
+        """Start a new journal for the plan, discarding any previous one."""
+        with open(self.filename, 'w') as journal_file:
+            self._write(journal_file, {'plan': self.plan_digest})
+
+    def record(self, index: int, status: str, new_tip: bool = False) -> None:
+        """Append that a plan operation was 'started' or is 'done', and whether it picks up a tip."""
+        entry = {'operation': index, 'status': status}
+        if new_tip:
+            entry['new_tip'] = True
+        with open(self.filename, 'a') as journal_file:
+            self._write(journal_file, entry)
+
+    def load(self) -> Tuple[Set[int], Set[int], int]:
+        """
+        Read the journal of a previous run of the same plan.
+
+        Returns:
+            Indexes of the finished operations, indexes of the operations started but not finished,
+            and the tips picked up
+        """
+        with open(self.filename) as journal_file:
+            lines = [line for line in journal_file.read().splitlines() if line.strip()]
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # An entry cut short by a crash, the next run carried on from a new line
+                continue
+        if not entries or entries[0].get('plan') != self.plan_digest:
+            raise ValueError(f"Journal {self.filename} was written for a different plan")
+
+        started = {entry['operation'] for entry in entries[1:] if entry['status'] == 'started'}
+        done = {entry['operation'] for entry in entries[1:] if entry['status'] == 'done'}
+        tips_used = sum(1 for entry in entries[1:] if entry.get('new_tip'))
+        return done, started - done, tips_used
+
+    @staticmethod
+    def _write(journal_file, entry: Dict) -> None:
+        # Entries start on a new line, so an entry cut short by a crash never merges with the next one
+        journal_file.write('\n' + json.dumps(entry))
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
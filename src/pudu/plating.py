@@ -1,5 +1,5 @@
-from typing import Optional, Dict
-from pudu import colors, SmartPipette
+from typing import Optional, Dict, List, Union
+from pudu import colors, SmartPipette, TipManager
 from opentrons import protocol_api
 
 class Plating():
@@ -8,7 +8,16 @@ class Plating():
 
     Attributes:
 
+    small_tiprack_position, large_tiprack_position : str or list
+        Deck position of each tip rack. With a list several racks stay on the deck,
+        further racks are swapped in from off deck in batches.
+    tip_state_file : str
+        JSON file with the next tip of each rack slot. A partly used rack from the previous run is
+        resumed when no initial tip is given, and the file is updated at the end of the run.
     """
+    # LB is distributed in chunks of wells, so the aspiration height is updated between chunks
+    lb_chunk_size = 8
+
     def __init__(self,
                  volume_total_reaction: float = 20,
                  volume_bacteria_transfer: float = 2,
@@ -24,10 +33,10 @@ class Plating():
                  thermocycler_labware: str = 'biorad_96_wellplate_200ul_pcr',
 
                  small_tiprack: str = 'opentrons_96_filtertiprack_20ul',
-                 small_tiprack_position: str = '9',
+                 small_tiprack_position: Union[str, List[str]] = '9',
                  initial_small_tip: str = None,
                  large_tiprack: str = 'opentrons_96_filtertiprack_200ul',
-                 large_tiprack_position: str = '1',
+                 large_tiprack_position: Union[str, List[str]] = '1',
                  initial_large_tip:str = None,
                  small_pipette: str = 'p20_single_gen2',
                  small_pipette_position: str = 'left',
@@ -49,7 +58,8 @@ class Plating():
 
                  aspiration_rate: float = 0.5,
                  dispense_rate: float = 1,
-                 bacterium_locations: Dict = None):
+                 bacterium_locations: Dict = None,
+                 tip_state_file: str = None):
 
         self.volume_total_reaction = volume_total_reaction
         self.volume_bacteria_transfer = volume_bacteria_transfer
@@ -82,9 +92,11 @@ class Plating():
         self.aspiration_rate = aspiration_rate
         self.dispense_rate = dispense_rate
         self.bacterium_locations = bacterium_locations
+        self.tip_state_file = tip_state_file
         self.number_constructs = len(bacterium_locations)
         self.total_colonies = self.number_constructs * self.number_dilutions * self.replicates
         self.max_colonies = max_colonies
+        self.tip_manager = None
         if self.total_colonies > self.max_colonies:
             raise ValueError(f"Protocol only supports a max of {self.max_colonies} colonies")
         if self.replicates > 8:
@@ -125,21 +137,32 @@ class Plating():
             layout['dilution_1']['wells'] = plate1.wells()[:colonies_per_dilution]
         return layout
 
+    def _calculate_tips_needed(self) -> Dict:
+        """
+        Tip pickups of each pipette: one small tip per colony well, one large tip per chunk of LB wells
+        """
+        colonies_per_dilution = self.number_constructs * self.replicates
+        lb_wells = colonies_per_dilution * self.number_dilutions
+        return {
+            'small': colonies_per_dilution,
+            'large': (lb_wells + self.lb_chunk_size - 1) // self.lb_chunk_size
+        }
+
     def run(self, protocol: protocol_api.ProtocolContext):
         #Labware
         #Load the thermocycler module, its default location is on slots 7, 8, 10 and 11
         thermocycler = protocol.load_module('thermocyclerModuleV1')
         thermocycler_plate = thermocycler.load_labware(self.thermocycler_labware)
-        #Load the tipracks
-        small_tiprack = protocol.load_labware(self.small_tiprack, self.small_tiprack_position)
-        large_tiprack = protocol.load_labware(self.large_tiprack, self.large_tiprack_position)
         #Load the pipettes
-        small_pipette = protocol.load_instrument(self.small_pipette, self.small_pipette_position, tip_racks=[small_tiprack])
-        if self.initial_small_tip:
-            small_pipette.starting_tip = small_tiprack[self.initial_small_tip]
-        large_pipette = protocol.load_instrument(self.large_pipette, self.large_pipette_position, tip_racks=[large_tiprack])
-        if self.initial_large_tip:
-            large_pipette.starting_tip = large_tiprack[self.initial_large_tip]
+        small_pipette = protocol.load_instrument(self.small_pipette, self.small_pipette_position)
+        large_pipette = protocol.load_instrument(self.large_pipette, self.large_pipette_position)
+        #Load the tipracks, with batch swaps for runs that need more racks than deck positions
+        tips_needed = self._calculate_tips_needed()
+        self.tip_manager = TipManager(protocol, self.tip_state_file)
+        self.tip_manager.setup_tip_racks(small_pipette, self.small_tiprack, self.small_tiprack_position,
+                                         tips_needed['small'], starting_tip=self.initial_small_tip)
+        self.tip_manager.setup_tip_racks(large_pipette, self.large_tiprack, self.large_tiprack_position,
+                                         tips_needed['large'], starting_tip=self.initial_large_tip)
         #SmartPipette Wrapper to avoid dunking into the LB
         smart_pipette = SmartPipette(large_pipette,protocol)
         #Load the tube rack
@@ -190,19 +213,18 @@ class Plating():
             all_dilution_wells.extend(dilution_layout['dilution_2']['wells'])
         # Distribute LB efficiently using built-in distribute method
         # Process in chunks of 8 wells to update aspiration height
-        chunk_size = 8
+        chunk_size = self.lb_chunk_size
         for i in range(0, len(all_dilution_wells), chunk_size):
             chunk_wells = all_dilution_wells[i:i + chunk_size]
 
-            # Get current aspiration location before each chunk
-            aspiration_location = smart_pipette.get_aspiration_location(lb_tube)
             protocol.comment(f"Distributing to wells {i + 1}-{min(i + chunk_size, len(all_dilution_wells))}")
 
-            # Use built-in distribute method with updated aspiration location
-            large_pipette.distribute(
+            # Distribute from the current aspiration height, tracking volumes in the ledger
+            self.tip_manager.prepare_tip(large_pipette)
+            smart_pipette.distribute(
                 volume=self.volume_lb_transfer,
-                source=aspiration_location,
-                dest=chunk_wells,
+                source=lb_tube,
+                dests=chunk_wells,
                 disposal_volume=4,  # For accuracy
                 new_tip='once'  # Use one tip for the chunk
             )
@@ -225,7 +247,7 @@ class Plating():
                 protocol.comment(f"\nProcessing {construct_names[0]} replicate {replicate + 1}")
 
                 # Pick up tip once for entire workflow per well
-                small_pipette.pick_up_tip()
+                self.tip_manager.pick_up_tip(small_pipette)
 
                 # Transfer bacteria to dilution plate 1
                 small_pipette.aspirate(self.volume_bacteria_transfer, source_well, rate=self.aspiration_rate)
@@ -265,6 +287,7 @@ class Plating():
         # thermocycler.close_lid()
         # thermocycler.deactivate_block()
 
+        self.tip_manager.save_tip_state()
         protocol.comment("\n=== Plating protocol complete ===")
         protocol.comment(f"Plated {self.number_constructs} constructs with {self.replicates} replicates")
         protocol.comment(f"Created a total of {self.total_colonies} colonies")
\ No newline at end of file
@@ -1,13 +1,18 @@
 from opentrons import protocol_api
+from opentrons.protocols.labware import get_labware_definition
 from typing import List, Union, Optional, Tuple
 from abc import ABC, abstractmethod
 import math
-from pudu.utils import colors
+from pudu.utils import TipManager, colors
 
 
 class SamplePreparation(ABC):
     """
     Abstract base class for all Sample Preparation protocols with shared functionality.
+    In multichannel mode an 8-channel pipette works on whole columns, drawing from a
+    96-well source plate (one liquid per well) or a reservoir (one liquid per well, shared by all 8 tips).
+    tiprack_position may be a list of deck positions; racks beyond them are swapped in from off deck in batches.
+    With a tip_state_file, a partly used tip rack left by the previous run is resumed instead of starting_tip.
     """
 
     def __init__(self,
@@ -16,12 +21,16 @@ class SamplePreparation(ABC):
                  aspiration_rate: float = 0.5,
                  dispense_rate: float = 1.0,
                  tiprack_labware: str = 'opentrons_96_filtertiprack_200ul',
-                 tiprack_position: str = '9',
+                 tiprack_position: Union[str, List[str]] = '9',
                  starting_tip: Optional[str] = None,
                  pipette: str = 'p300_single_gen2',
                  pipette_position: str = 'right',
                  use_temperature_module: bool = False,
                  temperature: int = 4,
+                 multichannel: bool = False,
+                 multichannel_pipette: str = 'p300_multi_gen2',
+                 source_plate_labware: str = 'nest_96_wellplate_2ml_deep',
+                 tip_state_file: Optional[str] = None,
                  **kwargs):
         self.test_labware = test_labware
         self.test_position = test_position
@@ -34,27 +43,38 @@ class SamplePreparation(ABC):
         self.pipette_position = pipette_position
         self.use_temperature_module = use_temperature_module
         self.temperature = temperature
+        self.multichannel = multichannel
+        self.multichannel_pipette = multichannel_pipette
+        self.source_plate_labware = source_plate_labware
+        self.tip_state_file = tip_state_file
 
         # Protocol tracking
         self.result_dict = {}
         self.liquid_tracker = {}
+        self.tip_manager = None
 
     @abstractmethod
     def run(self, protocol: protocol_api.ProtocolContext):
         """Abstract method that must be implemented by subclasses."""
         pass
 
+    @abstractmethod
+    def _calculate_tips_needed(self) -> int:
+        """Tip pickups of the protocol, a multichannel pickup counts once."""
+        pass
+
     def _load_standard_labware(self, protocol: protocol_api.ProtocolContext):
         """Load standard labware common to all protocols."""
-        tiprack = protocol.load_labware(self.tiprack_labware, self.tiprack_position)
-        pipette = protocol.load_instrument(self.pipette, self.pipette_position, tip_racks=[tiprack])
+        pipette_name = self.multichannel_pipette if self.multichannel else self.pipette
+        pipette = protocol.load_instrument(pipette_name, self.pipette_position)
 
-        if self.starting_tip:
-            pipette.starting_tip = tiprack[self.starting_tip]
+        self.tip_manager = TipManager(protocol, self.tip_state_file)
+        tipracks = self.tip_manager.setup_tip_racks(pipette, self.tiprack_labware, self.tiprack_position,
+                                                    self._calculate_tips_needed(), starting_tip=self.starting_tip)
 
         plate = protocol.load_labware(self.test_labware, self.test_position)
 
-        return tiprack, pipette, plate
+        return tipracks[0], pipette, plate
 
     def _load_source_labware(self, protocol: protocol_api.ProtocolContext,
                              temp_module_position: str = '1',
@@ -62,6 +82,10 @@ class SamplePreparation(ABC):
                              tube_rack_position: str = '3',
                              tube_rack_labware: str = 'opentrons_24_tuberack_nest_1.5ml_snapcap'):
         """Load source tube labware with optional temperature control."""
+        if self.multichannel:
+            # Tubes are out of reach of the 8 channels, the source plate takes their place
+            temp_module_labware = self.source_plate_labware
+            tube_rack_labware = self.source_plate_labware
 
         if self.use_temperature_module:
             temperature_module = protocol.load_module('Temperature Module', temp_module_position)
@@ -93,6 +117,23 @@ class SamplePreparation(ABC):
 
         return slots
 
+    def _create_column_slots(self, plate):
+        """
+        Create whole-column groupings for multichannel distribution.
+        Follows the same order as _create_slots: middle columns first, edge columns last.
+        """
+        columns = plate.columns()
+        return columns[1:-1] + [columns[0], columns[-1]]
+
+    @staticmethod
+    def _is_reservoir(labware) -> bool:
+        """A reservoir has a single well per column, reached by all 8 channels at once"""
+        return len(labware.columns()[0]) == 1
+
+    def _source_is_reservoir(self) -> bool:
+        """Whether the multichannel source labware is a reservoir, before it is loaded"""
+        return len(get_labware_definition(self.source_plate_labware)['ordering'][0]) == 1
+
     def _validate_plate_capacity(self, required_wells: int, plate):
         """Validate that plate has sufficient wells for the protocol."""
         available_wells = len(plate.wells())
@@ -112,6 +153,9 @@ class PlateSamples(SamplePreparation):
     """
     Distributes multiple samples across a plate with replicates.
     Each sample gets distributed to a specified number of wells.
+    In multichannel mode each source column is distributed to as many whole columns as replicates,
+    so a sample in a source plate fills one well per replicate column and a sample in a reservoir
+    fills every well of its replicate columns. Samples in a source plate must fill whole columns.
     """
 
     def __init__(self, samples: List[str],
@@ -146,6 +190,24 @@ class PlateSamples(SamplePreparation):
             self.tube_rack_position, self.tube_rack_labware
         )
 
+        if self.multichannel:
+            self._distribute_columns(protocol, pipette, plate, source_rack)
+        else:
+            self._distribute_samples(protocol, pipette, plate, source_rack)
+
+        # Store results
+        self.result_dict = {
+            'source_positions': self.source_positions,
+            'plate_layout': self.plate_layout
+        }
+        self.tip_manager.save_tip_state()
+
+        print('Sample Distribution Protocol Complete')
+        print(f'Source positions: {self.source_positions}')
+        print(f'Plate layout: {self.plate_layout}')
+
+    def _distribute_samples(self, protocol: protocol_api.ProtocolContext, pipette, plate, source_rack):
+        """Distribute every sample to its half-column slot with a single-channel pipette."""
         # Create slots and validate
         slots = self._create_slots(plate, self.replicates)
         required_wells = len(self.samples) * self.replicates
@@ -165,6 +227,7 @@ class PlateSamples(SamplePreparation):
         slot_counter = self.starting_slot - 1
         for source_well, sample in sample_wells:
             dest_wells = slots[slot_counter][:self.replicates]
+            self.tip_manager.prepare_tip(pipette)
             pipette.distribute(
                 volume=self.sample_volume,
                 source=source_well,
@@ -174,15 +237,60 @@ class PlateSamples(SamplePreparation):
             self.plate_layout[sample] = [well.well_name for well in dest_wells]
             slot_counter += 1
 
-        # Store results
-        self.result_dict = {
-            'source_positions': self.source_positions,
-            'plate_layout': self.plate_layout
-        }
+    def _distribute_columns(self, protocol: protocol_api.ProtocolContext, pipette, plate, source_rack):
+        """Distribute whole source columns to replicate columns with an 8-channel pipette."""
+        slots = self._create_column_slots(plate)[self.starting_slot - 1:]
+        reservoir = self._is_reservoir(source_rack)
 
-        print('Sample Distribution Protocol Complete')
-        print(f'Source positions: {self.source_positions}')
-        print(f'Plate layout: {self.plate_layout}')
+        if len(self.samples) > len(source_rack.wells()):
+            raise ValueError(
+                f'Too many samples ({len(self.samples)}) for source labware ({len(source_rack.wells())} wells)')
+        self._validate_multichannel_layout(plate, source_rack)
+
+        sample_wells = self._load_samples(protocol, source_rack)
+        source_columns = [column for column in source_rack.columns()
+                          if any(well in column for well, _ in sample_wells)]
+
+        if len(source_columns) * self.replicates > len(slots):
+            raise ValueError(f'{len(source_columns)} source columns with {self.replicates} replicates need '
+                             f'{len(source_columns) * self.replicates} columns, only {len(slots)} are available')
+
+        for i, source_column in enumerate(source_columns):
+            dest_columns = slots[i * self.replicates:(i + 1) * self.replicates]
+            self.tip_manager.prepare_tip(pipette)
+            pipette.distribute(
+                volume=self.sample_volume,
+                source=source_column[0],
+                dest=[column[0] for column in dest_columns],
+                disposal_volume=0
+            )
+
+            for source_well, sample in sample_wells:
+                if source_well not in source_column:
+                    continue
+                if reservoir:
+                    self.plate_layout[sample] = [well.well_name for column in dest_columns for well in column]
+                else:
+                    row_idx = source_column.index(source_well)
+                    self.plate_layout[sample] = [column[row_idx].well_name for column in dest_columns]
+
+    def _validate_multichannel_layout(self, plate, source_rack):
+        """Check that every channel draws from a sample, so no source or destination row is left partly used."""
+        if self._is_reservoir(source_rack):
+            return
+        rows = len(plate.columns()[0])
+        if len(source_rack.columns()[0]) != rows:
+            raise ValueError(f'Multichannel plating needs a source labware with {rows} rows, '
+                             f'{source_rack.load_name} has {len(source_rack.columns()[0])}')
+        if len(self.samples) % rows:
+            raise ValueError(f'Multichannel plating fills whole source columns of {rows} samples, '
+                             f'got {len(self.samples)} samples')
+
+    def _calculate_tips_needed(self) -> int:
+        """One tip per sample, or per source column in multichannel mode."""
+        if self.multichannel and not self._source_is_reservoir():
+            return math.ceil(len(self.samples) / 8)
+        return len(self.samples)
 
     def _load_samples(self, protocol: protocol_api.ProtocolContext, source_rack):
         """Load samples into source rack with liquid tracking."""
@@ -200,6 +308,8 @@ class PlateWithGradient(SamplePreparation):
     """
     Creates serial dilution gradients of an inducer with a sample.
     Implements proper well-to-well serial dilution.
+    In multichannel mode all 8 replicate rows are diluted at once, one column step per dilution,
+    with the sample in the first and the inducer in the second source column.
     """
 
     def __init__(self,
@@ -278,6 +388,11 @@ class PlateWithGradient(SamplePreparation):
             'inducer': math.ceil(total_inducer * safety_factor)
         }
 
+    def _calculate_tips_needed(self) -> int:
+        """Per pipetted row: one tip to pre-fill, one for the sample, one for the inducer and one per dilution."""
+        rows = 1 if self.multichannel else self.replicates
+        return rows * (3 + self.dilution_steps)
+
     def _row_letter_to_index(self, letter: str) -> int:
         """Convert row letter to 0-based index."""
         return ord(letter.upper()) - ord('A')
@@ -294,15 +409,20 @@ class PlateWithGradient(SamplePreparation):
         required_wells = self.replicates * (self.dilution_steps + 1)
         self._validate_plate_capacity(required_wells, plate)
 
+        # Calculate layout
+        start_row_idx = self._row_letter_to_index(self.starting_row)
+        if self.multichannel:
+            self._validate_multichannel_layout(plate, source_rack, start_row_idx)
+
         # Load stocks
         self._load_stocks(protocol, source_rack)
 
-        # Get source wells
-        sample_well = source_rack.wells()[0]
-        inducer_well = source_rack.wells()[1]
-
-        # Calculate layout
-        start_row_idx = self._row_letter_to_index(self.starting_row)
+        # Get source wells, the first nozzle reaches the whole source column
+        if self.multichannel:
+            sample_well, inducer_well = source_rack.columns()[0][0], source_rack.columns()[1][0]
+        else:
+            sample_well = source_rack.wells()[0]
+            inducer_well = source_rack.wells()[1]
 
         # Pre-fill wells with sample (diluent)
         self._prefill_wells(pipette, plate, sample_well, start_row_idx)
@@ -318,6 +438,7 @@ class PlateWithGradient(SamplePreparation):
             'concentration_series': self.concentration_series,
             'required_volumes': self.required_volumes
         }
+        self.tip_manager.save_tip_state()
 
         print('Serial Dilution Protocol Complete')
         print(f'Concentration series: {self.concentration_series}')
@@ -325,33 +446,63 @@ class PlateWithGradient(SamplePreparation):
         print(f'Source positions: {self.source_positions}')
         print(f'Concentration map: {self.concentration_map}')
 
+    def _validate_multichannel_layout(self, plate, source_rack, start_row_idx: int):
+        """Check that the replicate rows fill every row under the 8 channels, in the source and the plate."""
+        if start_row_idx != 0:
+            raise ValueError(f'Multichannel gradients start at row A, got starting_row {self.starting_row}')
+        rows = len(plate.columns()[0])
+        if self.replicates != rows:
+            raise ValueError(f'Multichannel gradients fill all {rows} rows of a column, '
+                             f'set replicates to {rows}, got {self.replicates}')
+        if not self._is_reservoir(source_rack) and len(source_rack.columns()[0]) != rows:
+            raise ValueError(f'Multichannel gradients need a source labware with {rows} rows, '
+                             f'{source_rack.load_name} has {len(source_rack.columns()[0])}')
+        if self.dilution_steps + 1 > len(plate.rows()[0]):
+            raise ValueError(f'{self.dilution_steps} dilution steps need {self.dilution_steps + 1} columns, '
+                             f'plate only has {len(plate.rows()[0])}')
+
+    def _get_stock_wells(self, source_rack, column_idx: int) -> List:
+        """Source wells of one stock: a single tube, or one well per replicate row of a source column."""
+        if not self.multichannel:
+            return [source_rack.wells()[column_idx]]
+        column = source_rack.columns()[column_idx]
+        return column[:1] if self._is_reservoir(source_rack) else column[:self.replicates]
+
     def _load_stocks(self, protocol: protocol_api.ProtocolContext, source_rack):
-        """Load sample and inducer stocks."""
+        """Load sample and inducer stocks. In multichannel mode the stock volumes are per source well."""
         # Sample stock
         sample_liquid = self._define_liquid(protocol, self.sample_name,
                                             f"Sample: {self.sample_name}", 0)
-        sample_well = source_rack.wells()[0]
-        sample_well.load_liquid(liquid=sample_liquid, volume=self.sample_stock_volume)
-        self.source_positions[self.sample_name] = sample_well.well_name
+        sample_wells = self._get_stock_wells(source_rack, 0)
+        for sample_well in sample_wells:
+            sample_well.load_liquid(liquid=sample_liquid, volume=self.sample_stock_volume)
+        self.source_positions[self.sample_name] = sample_wells[0].well_name
 
         # Inducer stock
         inducer_liquid = self._define_liquid(protocol, self.inducer_name,
                                              f"Inducer: {self.inducer_name}", 1)
-        inducer_well = source_rack.wells()[1]
-        inducer_well.load_liquid(liquid=inducer_liquid, volume=self.inducer_stock_volume)
-        self.source_positions[self.inducer_name] = inducer_well.well_name
+        inducer_wells = self._get_stock_wells(source_rack, 1)
+        for inducer_well in inducer_wells:
+            inducer_well.load_liquid(liquid=inducer_liquid, volume=self.inducer_stock_volume)
+        self.source_positions[self.inducer_name] = inducer_wells[0].well_name
+
+    def _get_pipetting_rows(self, start_row_idx: int) -> List[int]:
+        """Rows the pipette is sent to: every replicate row, or only row A for the 8 channels."""
+        if self.multichannel:
+            return [start_row_idx]
+        return [start_row_idx + rep for rep in range(self.replicates)]
 
     def _prefill_wells(self, pipette, plate, sample_well, start_row_idx):
         """Pre-fill wells with sample to serve as diluent."""
         diluent_volume = self.final_well_volume - self.transfer_volume
 
-        for rep in range(self.replicates):
-            row_idx = start_row_idx + rep
+        for row_idx in self._get_pipetting_rows(start_row_idx):
             row = plate.rows()[row_idx]
 
             # Pre-fill wells 2 through dilution_steps+1 (skip first well for initial mix)
             dest_wells = row[1:self.dilution_steps + 1]
 
+            self.tip_manager.prepare_tip(pipette)
             pipette.distribute(
                 volume=diluent_volume,
                 source=sample_well,
@@ -366,14 +517,14 @@ class PlateWithGradient(SamplePreparation):
         initial_sample_vol = self.final_well_volume * (1 - self.initial_mix_ratio)
         initial_inducer_vol = self.final_well_volume * self.initial_mix_ratio
 
-        for rep in range(self.replicates):
-            row_idx = start_row_idx + rep
+        for row_idx in self._get_pipetting_rows(start_row_idx):
             row = plate.rows()[row_idx]
 
             # Create initial mix in first well
             first_well = row[0]
 
             # Add sample to first well
+            self.tip_manager.prepare_tip(pipette)
             pipette.transfer(
                 volume=initial_sample_vol,
                 source=sample_well,
@@ -382,6 +533,7 @@ class PlateWithGradient(SamplePreparation):
             )
 
             # Add inducer to first well and mix
+            self.tip_manager.prepare_tip(pipette)
             pipette.transfer(
                 volume=initial_inducer_vol,
                 source=inducer_well,
@@ -395,6 +547,7 @@ class PlateWithGradient(SamplePreparation):
                 source_well = row[step]
                 dest_well = row[step + 1]
 
+                self.tip_manager.prepare_tip(pipette)
                 pipette.transfer(
                     volume=self.transfer_volume,
                     source=source_well,
@@ -403,7 +556,9 @@ class PlateWithGradient(SamplePreparation):
                     new_tip='always'
                 )
 
-            # Record layout and concentrations for this replicate
+        # Record layout and concentrations for every replicate
+        for rep in range(self.replicates):
+            row = plate.rows()[start_row_idx + rep]
             for step in range(self.dilution_steps + 1):
                 well_name = row[step].well_name
                 concentration = self.concentration_series[step]
@@ -0,0 +1,137 @@
+import contextlib
+import io
+from typing import Dict, List
+import opentrons.simulate
+
+ASPIRATE_COMMANDS = ('aspirate', 'aspirateInPlace')
+AIR_GAP_COMMANDS = ('airGapInPlace',)
+DISPENSE_COMMANDS = ('dispense', 'dispenseInPlace')
+
+
+def simulate(protocol_instance, api_level: str = '2.22') -> Dict:
+    """
+    Simulate a PUDU protocol in-process against a simulated ProtocolContext.
+
+    Args:
+        protocol_instance: Any PUDU protocol object with a run(protocol) method
+        api_level: Protocol API version of the simulated context, 2.14 or newer
+
+    Returns:
+        dict with the executed commands, the tips used per pipette, the volume in every
+        well that was loaded or pipetted into, the protocol comments and the printed output
+    """
+    protocol = opentrons.simulate.get_protocol_api(api_level)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        protocol_instance.run(protocol)
+
+    try:
+        engine_commands = protocol._core._engine_client.state.commands.get_all()
+    except AttributeError:
+        raise ValueError(f"Structured simulation needs API level 2.14 or newer, got {api_level}")
+
+    log = summarize_commands(engine_commands)
+    log['output'] = output.getvalue()
+    return log
+
+
+def summarize_commands(engine_commands: List) -> Dict:
+    """Turn Protocol Engine commands into a structured log of commands, tips and well volumes."""
+    modules = {}
+    labware = {}
+    columns = {}
+    pipettes = {}
+    channels = {}
+    air_gaps = {}
+    pipette_wells = {}
+    log = {
+        'commands': [],
+        'tips': {},
+        'volumes': {},
+        'comments': []
+    }
+
+    for command in engine_commands:
+        params = command.params
+        command_type = command.commandType
+
+        if command_type == 'loadModule':
+            modules[command.result.moduleId] = f"{params.model.value} in slot {params.location.slotName.id}"
+        elif command_type == 'loadLabware':
+            name = f"{params.loadName} {_describe_location(params.location, modules)}"
+            # Several labware can be loaded off deck under the same name
+            duplicates = sum(1 for other in labware.values() if other == name or other.startswith(f"{name} #"))
+            labware[command.result.labwareId] = f"{name} #{duplicates + 1}" if duplicates else name
+            columns[labware[command.result.labwareId]] = command.result.definition.ordering
+        elif command_type == 'loadPipette':
+            name = f"{params.pipetteName.value} ({params.mount.value})"
+            pipettes[command.result.pipetteId] = name
+            channels[name] = 8 if 'multi' in params.pipetteName.value else 1
+            log['tips'][name] = 0
+        elif command_type == 'comment':
+            log['comments'].append(params.message)
+            continue
+
+        pipette = pipettes.get(getattr(params, 'pipetteId', None))
+        labware_name = labware.get(getattr(params, 'labwareId', None))
+        well = getattr(params, 'wellName', None)
+        if pipette and labware_name and well:
+            pipette_wells[pipette] = (labware_name, well)
+        elif pipette and command_type in ASPIRATE_COMMANDS + DISPENSE_COMMANDS:
+            labware_name, well = pipette_wells.get(pipette, (None, None))
+
+        entry = {'command': command_type}
+        if pipette:
+            entry['pipette'] = pipette
+        if labware_name:
+            entry['labware'] = labware_name
+        if well:
+            entry['well'] = well
+        if getattr(params, 'volume', None) is not None:
+            entry['volume'] = params.volume
+        log['commands'].append(entry)
+
+        if command_type == 'pickUpTip':
+            log['tips'][pipette] += 1
+        elif command_type == 'loadLiquid':
+            for well_name, volume in params.volumeByWell.items():
+                log['volumes'].setdefault(labware_name, {})[well_name] = volume
+        elif command_type in AIR_GAP_COMMANDS:
+            air_gaps[pipette] = air_gaps.get(pipette, 0.0) + params.volume
+        elif command_type in ASPIRATE_COMMANDS + DISPENSE_COMMANDS and labware_name:
+            volume = params.volume
+            if command_type in DISPENSE_COMMANDS:
+                # The air gap sits at the end of the tip and leaves first
+                air = min(air_gaps.get(pipette, 0.0), volume)
+                air_gaps[pipette] = air_gaps.get(pipette, 0.0) - air
+                volume -= air
+            sign = -1 if command_type in ASPIRATE_COMMANDS else 1
+            wells = log['volumes'].setdefault(labware_name, {})
+            for channel_well in _channel_wells(well, columns.get(labware_name, []), channels[pipette]):
+                wells[channel_well] = wells.get(channel_well, 0.0) + sign * volume
+        elif command_type in ('blowout', 'blowOutInPlace', 'dropTip', 'dropTipInPlace'):
+            air_gaps[pipette] = 0.0
+
+    return log
+
+
+def _channel_wells(well: str, ordering: List[List[str]], channels: int) -> List[str]:
+    """Wells reached by every nozzle of a pipette whose first nozzle is at the given well"""
+    if channels == 1:
+        return [well]
+    column = next((column for column in ordering if well in column), [well])
+    if len(column) == 1:
+        return [well] * channels  # Every nozzle draws from the same reservoir well
+    start = column.index(well)
+    return column[start:start + channels]
+
+
+def _describe_location(location, modules: Dict) -> str:
+    """Readable deck location of a labware load command."""
+    if hasattr(location, 'slotName'):
+        return f"in slot {location.slotName.id}"
+    if hasattr(location, 'moduleId'):
+        return f"on {modules.get(location.moduleId, location.moduleId)}"
+    if location == 'offDeck':
+        return "off deck"
+    return str(location)
@@ -1,6 +1,10 @@
+import copy
+from itertools import groupby
 from opentrons import protocol_api
-from typing import List, Dict
-from pudu.utils import colors
+from typing import List, Dict, Union
+from pudu.utils import TipManager, colors, get_liquid_height
+from pudu.estimation import DeckTimeRecorder
+from pudu.planning import place_wells, well_name_from_index, well_index_from_name, WELLS_PER_PLATE
 
 
 class Transformation():
@@ -30,7 +34,8 @@ class Transformation():
     tiprack_labware : str
         The labware type of the tiprack. By default, 'opentrons_96_tiprack_20ul'.
     tiprack_position : int
-        The deck position of the tiprack. By default, 9.
+        The deck position of the tiprack. By default, 9. A list of positions keeps several racks on the deck,
+        further racks are swapped in from off deck in batches.
     pipette_type : str
         The type of pipette. By default, 'p20_single_gen2'.
     pipette_mount : str
@@ -39,6 +44,19 @@ class Transformation():
         The rate of aspiration in microliters per second. By default, 0.5 microliters per second.
     dispense_rate : float
         The rate of dispense in microliters per second. By default, 1 microliter per second.
+    tip_state_file : str
+        JSON file with the next tip of each rack slot, read at the start and written at the end of a run,
+        so partly used racks are resumed. By default, None.
+    well_placement : str
+        How transformations are placed on the thermocycler plate from thermocycler_starting_well, see
+        planning.place_wells. By default, 'column_major'. dict_of_parts_in_thermocycler lists the wells in
+        placement order and can be given to Plating as its bacterium_locations.
+    dna_wells : list
+        Wells of the DNA plate holding list_of_dna, instead of consecutive wells from initial_dna_well,
+        e.g. the keys of an assembly's thermocycler_well_map. By default, None.
+    dna_in_thermocycler : bool
+        The DNA is already in the thermocycler plate at dna_wells, as an assembly run earlier in the same
+        session left it, and is transferred from there. By default, False.
     '''
     def __init__(self,
                  list_of_dna:List = None,
@@ -53,9 +71,9 @@ class Transformation():
                  dna_plate_position:str = '2',
                  use_dna_96plate:bool = False,
                  tiprack_p20_labware:str = "opentrons_96_tiprack_20ul",
-                 tiprack_p20_position:str = "9",
+                 tiprack_p20_position:Union[str, List[str]] = "9",
                  tiprack_p200_labware:str = "opentrons_96_filtertiprack_200ul",
-                 tiprack_p200_position:str = "6",
+                 tiprack_p200_position:Union[str, List[str]] = "6",
                  pipette_p20:str = "p20_single_gen2",
                  pipette_p20_position:str = "left",
                  pipette_p300:str = "p300_single_gen2",
@@ -63,7 +81,11 @@ class Transformation():
                  aspiration_rate:float = 0.5,
                  dispense_rate:float = 1,
                  initial_dna_well:int = 0,
-                 water_testing:bool = False
+                 water_testing:bool = False,
+                 tip_state_file:str = None,
+                 well_placement:str = 'column_major',
+                 dna_wells:List[str] = None,
+                 dna_in_thermocycler:bool = False
                  ):
 
         if list_of_dna is None:
@@ -95,10 +117,27 @@ class Transformation():
         self.dispense_rate = dispense_rate
         self.initial_dna_well = initial_dna_well
         self.water_testing = water_testing
+        self.tip_state_file = tip_state_file
+        self.well_placement = well_placement
+        self.dna_wells = dna_wells
+        self.dna_in_thermocycler = dna_in_thermocycler
+        if dna_wells is not None and len(dna_wells) != len(list_of_dna):
+            raise ValueError(f"Got {len(dna_wells)} DNA wells for {len(list_of_dna)} DNA constructs")
+        if dna_in_thermocycler and dna_wells is None:
+            raise ValueError("DNA in the thermocycler plate requires its dna_wells")
+        if dna_wells is not None and not (use_dna_96plate or dna_in_thermocycler):
+            raise ValueError("dna_wells locate the DNA in a 96-well plate, set use_dna_96plate or dna_in_thermocycler")
 
 class HeatShockTransformation(Transformation):
     '''
        Creates a protocol for automated transformation.
+
+       With interleave_pipettes, DNA is added by the small pipette right after each competent cell tube is
+       distributed, while the p300 keeps its tip for all cell tubes. compare_schedules() reports the deck time
+       of both schedules.
+
+       With dna_tip_per_construct, each construct is aspirated once for all of its replicates and dispensed above
+       the competent cells, so the tip never touches them and can be reused across the replicates.
     '''
     def __init__(self,
                 transfer_volume_dna:float = 2,
@@ -110,6 +149,10 @@ class HeatShockTransformation(Transformation):
                 heat_shock:Dict = None,
                 cold_incubation2:Dict = None,
                 recovery_incubation:Dict = None,
+                interleave_pipettes:bool = False,
+                dna_tip_per_construct:bool = False,
+                dna_air_gap:float = 2,
+                dna_dispense_clearance:float = 2,
                 *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -134,9 +177,13 @@ class HeatShockTransformation(Transformation):
             self.recovery_incubation = {'temperature': 37, 'hold_time_minutes': 60}
         else:
             self.recovery_incubation = recovery_incubation
-        self.recovery_incubation = recovery_incubation
+        self.interleave_pipettes = interleave_pipettes
+        self.dna_tip_per_construct = dna_tip_per_construct
+        self.dna_air_gap = dna_air_gap
+        self.dna_dispense_clearance = dna_dispense_clearance
         self.dict_of_parts_in_temp_mod_position = {}
         self.dict_of_parts_in_thermocycler = {}
+        self.tip_manager = None
 
     def liquid_transfer(self, protocol, pipette, volume, source, dest,
                         asp_rate: float = 0.5, disp_rate: float = 1.0,
@@ -145,7 +192,7 @@ class HeatShockTransformation(Transformation):
                         mix_reps: int = 3, new_tip: bool = True,
                         remove_air:bool = True, drop_tip: bool = True):
         if new_tip:
-            pipette.pick_up_tip()
+            self.tip_manager.pick_up_tip(pipette)
 
         if mix_before > 0:
             pipette.mix(mix_reps, mix_before, source)
@@ -183,20 +230,26 @@ class HeatShockTransformation(Transformation):
         thermocycler_module = protocol.load_module('thermocycler module')
         pcr_plate = thermocycler_module.load_labware(self.thermocycler_labware)
         #If using the 96-well pcr plate as a dna construct source
-        if self.use_dna_96plate:
+        if self.use_dna_96plate and not self.dna_in_thermocycler:
             dna_plate = protocol.load_labware(self.dna_plate, self.dna_plate_position)
-        # Load the tiprack
-        tiprack_p20 = protocol.load_labware(self.tiprack_p20_labware, self.tiprack_p20_position)
-        tiprack_p200 = protocol.load_labware(self.tiprack_p200_labware, self.tiprack_p200_position)
         # Load the pipette
-        pipette_p20 = protocol.load_instrument(self.pipette_p20, self.pipette_p20_position, tip_racks=[tiprack_p20])
-        pipette_p300 = protocol.load_instrument(self.pipette_p300, self.pipette_p300_position,
-                                                tip_racks=[tiprack_p200])
+        pipette_p20 = protocol.load_instrument(self.pipette_p20, self.pipette_p20_position)
+        pipette_p300 = protocol.load_instrument(self.pipette_p300, self.pipette_p300_position)
         #Validate protocol
         self._validate_protocol(protocol, alumblock)
+        # Load the tipracks, with batch swaps for runs that need more racks than deck positions
+        tips_needed = self._calculate_tips_needed()
+        self.tip_manager = TipManager(protocol, self.tip_state_file)
+        self.tip_manager.setup_tip_racks(pipette_p20, self.tiprack_p20_labware, self.tiprack_p20_position, tips_needed['p20'])
+        self.tip_manager.setup_tip_racks(pipette_p300, self.tiprack_p200_labware, self.tiprack_p200_position, tips_needed['p300'])
 
         #Load Reagents
-        if self.use_dna_96plate:
+        if self.dna_in_thermocycler:
+            DNA_wells = [pcr_plate[well] for well in self.dna_wells]
+            competent_cell_wells = self._load_reagents(protocol, alumblock, self.tube_volume_competent_cell, f"Competent Cell {self.competent_cells}", self.competent_cell_tubes_needed)
+            media_wells = self._load_reagents(protocol, alumblock, self.tube_volume_recovery_media, "Media", self.media_tubes_needed, initial_well=len(competent_cell_wells))
+
+        elif self.use_dna_96plate:
             DNA_wells = self._load_dna_list(protocol, dna_plate, self.volume_dna, self.list_of_dna, initial_well=self.initial_dna_well)
             competent_cell_wells = self._load_reagents(protocol, alumblock, self.tube_volume_competent_cell, f"Competent Cell {self.competent_cells}", self.competent_cell_tubes_needed)
             media_wells = self._load_reagents(protocol, alumblock, self.tube_volume_recovery_media, "Media", self.media_tubes_needed, initial_well=len(competent_cell_wells))
@@ -212,16 +265,20 @@ class HeatShockTransformation(Transformation):
             temperature_module.set_temperature(4)
             thermocycler_module.set_block_temperature(4)
 
-        #Load competent cells into the thermocycler
-        pipette = pipette_p300
-        self._transfer_competent_cells(protocol, pipette, pcr_plate, competent_cell_wells, self.transfer_volume_competent_cell, self.thermocycler_starting_well)
-
-        #Load DNA into the thermocycler
+        #Pipette for the DNA
         if self.transfer_volume_dna > 20:
-            pipette = pipette_p300
+            dna_pipette = pipette_p300
         else:
-            pipette = pipette_p20
-        self._transfer_DNA(protocol, pipette, pcr_plate, DNA_wells, self.transfer_volume_dna, self.thermocycler_starting_well)
+            dna_pipette = pipette_p20
+
+        if self.interleave_pipettes:
+            #Load competent cells tube by tube, each followed by the DNA of the wells it filled
+            self._transfer_competent_cells_and_DNA(protocol, pipette_p300, dna_pipette, pcr_plate, competent_cell_wells, DNA_wells)
+        else:
+            #Load competent cells into the thermocycler
+            self._transfer_competent_cells(protocol, pipette_p300, pcr_plate, competent_cell_wells, self.transfer_volume_competent_cell, self.thermocycler_starting_well)
+            #Load DNA into the thermocycler
+            self._transfer_DNA(protocol, dna_pipette, pcr_plate, DNA_wells, self.transfer_volume_dna, self.thermocycler_starting_well)
 
         # Cold Incubation
         thermocycler_module.close_lid()
@@ -245,6 +302,7 @@ class HeatShockTransformation(Transformation):
         ]
         if not self.water_testing:
             thermocycler_module.execute_profile(steps=recovery, repetitions=1, block_max_volume=30)
+        self.tip_manager.save_tip_state()
 
         # output
         print('Strain and media tube in temp_mod')
@@ -264,7 +322,20 @@ class HeatShockTransformation(Transformation):
         #Number of tubes with media to be used
         self.transformations_per_media_tube = self.tube_volume_recovery_media//self.transfer_volume_recovery_media
         self.media_tubes_needed = (self.total_transformations + self.transformations_per_media_tube - 1) // self.transformations_per_media_tube
-        if self.use_dna_96plate:
+        #Thermocycler wells of the transformations, replicates of a construct are placed as one group
+        self.transformation_wells = place_wells(self.total_transformations, self.well_placement,
+                                                self.thermocycler_starting_well, self.replicates)
+        if self.transformation_wells and self.transformation_wells[-1] >= WELLS_PER_PLATE:
+            raise ValueError(f'The {self.well_placement} well placement needs {self.transformation_wells[-1] + 1} '
+                             f'thermocycler wells for {self.total_transformations} transformations. '
+                             f'Please modify the protocol and try again.')
+        if self.dna_in_thermocycler:
+            shared_wells = {well_index_from_name(well) for well in self.dna_wells} & set(self.transformation_wells)
+            if shared_wells:
+                raise ValueError(f'The transformations would be placed in the DNA wells '
+                                 f'{[well_name_from_index(well) for well in sorted(shared_wells)]}. '
+                                 f'Please raise the thermocycler_starting_well and try again.')
+        if self.use_dna_96plate or self.dna_in_thermocycler:
             if self.competent_cell_tubes_needed + self.media_tubes_needed > module_wells:
                 raise ValueError(f'The number of reagents is more that {module_wells}.'
                                  f'There are {self.competent_cell_tubes_needed} tubes with competent cells.'
@@ -279,6 +350,42 @@ class HeatShockTransformation(Transformation):
                                  f'Please modify the protocol and try again.')
 
 
+    def plan_wells(self) -> Dict:
+        """
+        Thermocycler well of every transformation, planned without a protocol context.
+
+        Returns:
+        - Dictionary of well name -> [DNA construct], in placement order, as Plating takes its bacterium_locations
+        """
+        wells = place_wells(len(self.list_of_dna)*self.replicates, self.well_placement,
+                            self.thermocycler_starting_well, self.replicates)
+        return {well_name_from_index(well): [self.list_of_dna[i // self.replicates]] for i, well in enumerate(wells)}
+
+    def _calculate_tips_needed(self) -> Dict:
+        """
+        Tip pickups of each pipette for the chosen DNA transfer mode and schedule.
+
+        Returns:
+        - Dictionary with the tips needed by the 'p20' and the 'p300'
+        """
+        dna_on_p300 = self.transfer_volume_dna > 20
+        if not self.dna_tip_per_construct:
+            dna_tips = self.total_transformations
+        elif self.interleave_pipettes:
+            #A construct split across two cell tubes takes one tip per tube
+            per_tube = int(self.transformations_per_cell_tube)
+            dna_tips = sum(len({i // self.replicates for i in range(start, min(start + per_tube, self.total_transformations))})
+                           for start in range(0, self.total_transformations, per_tube))
+        else:
+            dna_tips = len(self.list_of_dna)
+
+        cell_tips = 1 if self.interleave_pipettes and not dna_on_p300 else self.competent_cell_tubes_needed
+        p300_tips = int(cell_tips + self.media_tubes_needed)
+        return {
+            'p20': 0 if dna_on_p300 else dna_tips,
+            'p300': p300_tips + dna_tips if dna_on_p300 else p300_tips
+        }
+
     def _load_dna_list(self, protocol, labware, volume, dna_list, initial_well=0, description=None, color_index = None):
         """
         Load individual DNA constructs into wells, one construct per well.
@@ -298,7 +405,10 @@ class HeatShockTransformation(Transformation):
         current_color = color_index if color_index is not None else 0
         for i, construct in enumerate(dna_list):
             #Get the well
-            well = labware.wells()[initial_well+i]
+            if self.dna_wells is not None:
+                well = labware[self.dna_wells[i]]
+            else:
+                well = labware.wells()[initial_well+i]
             wells.append(well)
 
             #Covert tuple to string if needed
@@ -369,31 +479,52 @@ class HeatShockTransformation(Transformation):
         well_index = thermocycler_starting_well
 
         for tube_index, source_well in enumerate(competent_cell_wells):
-            #Calculate how many wells this cell tube will fill
-            remaining_transformations = self.total_transformations - (tube_index * self.transformations_per_cell_tube)
-            wells_to_fill = min(self.transformations_per_cell_tube, remaining_transformations)
-
-            #Destination wells
-            dest_wells = pcr_plate.wells()[well_index:well_index+wells_to_fill]
-
-            #Distribute
-            pipette.distribute(
-                volume=transfer_volume_competent_cell,
-                source=source_well,
-                dest=dest_wells,
-                mix_before=(3,50),
-                disposal_volume=0,
-                new_tip='once'
-            )
+            dest_wells = self._distribute_competent_cell_tube(pipette, pcr_plate, tube_index, source_well, transfer_volume_competent_cell, well_index)
+            well_index += len(dest_wells)
 
-            #Thermocycler Dictionary
-            name = f"Competent_Cell_{self.competent_cells}_{tube_index+1}"
-            for well in dest_wells:
-                if well.well_name not in self.dict_of_parts_in_thermocycler:
-                    self.dict_of_parts_in_thermocycler[well.well_name] = []
-                self.dict_of_parts_in_thermocycler[well.well_name].append(name)
+    def _distribute_competent_cell_tube(self, pipette, pcr_plate, tube_index, source_well, transfer_volume_competent_cell,
+                                        well_index, new_tip='once'):
+        """
+        Distribute one tube of competent cells to the next thermocycler wells.
 
-            well_index += wells_to_fill
+        Returns:
+        - List of the wells filled
+        """
+        #Calculate how many wells this cell tube will fill
+        remaining_transformations = self.total_transformations - (tube_index * self.transformations_per_cell_tube)
+        wells_to_fill = min(self.transformations_per_cell_tube, remaining_transformations)
+
+        #Destination wells
+        dest_wells = self._thermocycler_wells(pcr_plate, well_index, wells_to_fill)
+
+        #Distribute
+        if new_tip != 'never':
+            self.tip_manager.prepare_tip(pipette)
+        pipette.distribute(
+            volume=transfer_volume_competent_cell,
+            source=source_well,
+            dest=dest_wells,
+            mix_before=(3,50),
+            disposal_volume=0,
+            new_tip=new_tip
+        )
+
+        #Thermocycler Dictionary
+        name = f"Competent_Cell_{self.competent_cells}_{tube_index+1}"
+        for well in dest_wells:
+            if well.well_name not in self.dict_of_parts_in_thermocycler:
+                self.dict_of_parts_in_thermocycler[well.well_name] = []
+            self.dict_of_parts_in_thermocycler[well.well_name].append(name)
+
+        return dest_wells
+
+    def _thermocycler_wells(self, pcr_plate, well_index, count):
+        """
+        Thermocycler wells of the transformations from well_index on, counted from thermocycler_starting_well
+        as if they were consecutive, at their placed positions.
+        """
+        first = int(well_index) - self.thermocycler_starting_well
+        return [pcr_plate.wells()[well] for well in self.transformation_wells[first:first+int(count)]]
 
     def _transfer_DNA(self, protocol, pipette, pcr_plate, DNA_wells, transfer_volume_dna, thermocycler_starting_well):
         """
@@ -409,26 +540,138 @@ class HeatShockTransformation(Transformation):
         """
         for construct_index, (construct_name, source_well) in enumerate(zip(self.list_of_dna, DNA_wells)):
             construct_well = construct_index * self.replicates + thermocycler_starting_well
+            dest_wells = self._thermocycler_wells(pcr_plate, construct_well, self.replicates)
+            self._transfer_DNA_to_wells(protocol, pipette, construct_name, source_well, dest_wells, transfer_volume_dna)
 
-            for replicate in range(self.replicates):
-                dest_well = pcr_plate.wells()[construct_well+replicate]
-                #Transfer liquid
-                self.liquid_transfer(
-                    protocol=protocol,
-                    pipette=pipette,
-                    volume=transfer_volume_dna,
-                    source=source_well,
-                    dest=dest_well,
-                    asp_rate=self.aspiration_rate,
-                    disp_rate=self.dispense_rate,
-                    mix_before=transfer_volume_dna,
-                    touch_tip=True
-                )
+    def _transfer_DNA_to_wells(self, protocol, pipette, construct_name, source_well, dest_wells, transfer_volume_dna):
+        """
+        Transfer a DNA construct to its replicate wells, with one tip per construct in dna_tip_per_construct mode.
+        """
+        if not self.dna_tip_per_construct:
+            for dest_well in dest_wells:
+                self._transfer_DNA_to_well(protocol, pipette, construct_name, source_well, dest_well, transfer_volume_dna)
+            return
+
+        #Aspirate as many replicates as fit next to the air gap
+        replicates_per_aspiration = max(1, int((pipette.max_volume - self.dna_air_gap) // transfer_volume_dna))
+        self.tip_manager.pick_up_tip(pipette)
+        pipette.mix(3, transfer_volume_dna, source_well)
+        for i in range(0, len(dest_wells), replicates_per_aspiration):
+            batch = dest_wells[i:i+replicates_per_aspiration]
+            pipette.aspirate(transfer_volume_dna*len(batch), source_well, rate=self.aspiration_rate)
+            pipette.air_gap(self.dna_air_gap)
+            for j, dest_well in enumerate(batch):
+                #The air gap leaves with the first dispense, which stays above the cells
+                volume = transfer_volume_dna + (self.dna_air_gap if j == 0 else 0)
+                pipette.dispense(volume, dest_well.bottom(self._get_DNA_dispense_height(dest_well)),
+                                 rate=self.dispense_rate)
 
                 #Track in dictionary
                 if dest_well.well_name not in self.dict_of_parts_in_thermocycler:
                     self.dict_of_parts_in_thermocycler[dest_well.well_name] = []
                 self.dict_of_parts_in_thermocycler[dest_well.well_name].append(construct_name)
+            pipette.blow_out(batch[-1].top())
+        pipette.drop_tip()
+
+    def _get_DNA_dispense_height(self, dest_well):
+        """
+        Height above the well bottom that clears the competent cells, from the labware geometry when available.
+        """
+        liquid_height = get_liquid_height(dest_well, self.transfer_volume_competent_cell)
+        if liquid_height is None:
+            liquid_height = dest_well.depth / 3
+        return liquid_height + self.dna_dispense_clearance
+
+    def _transfer_DNA_to_well(self, protocol, pipette, construct_name, source_well, dest_well, transfer_volume_dna):
+        """
+        Transfer one replicate of a DNA construct to its thermocycler well.
+        """
+        #Transfer liquid
+        self.liquid_transfer(
+            protocol=protocol,
+            pipette=pipette,
+            volume=transfer_volume_dna,
+            source=source_well,
+            dest=dest_well,
+            asp_rate=self.aspiration_rate,
+            disp_rate=self.dispense_rate,
+            mix_before=transfer_volume_dna,
+            touch_tip=True
+        )
+
+        #Track in dictionary
+        if dest_well.well_name not in self.dict_of_parts_in_thermocycler:
+            self.dict_of_parts_in_thermocycler[dest_well.well_name] = []
+        self.dict_of_parts_in_thermocycler[dest_well.well_name].append(construct_name)
+
+    def _transfer_competent_cells_and_DNA(self, protocol, cell_pipette, dna_pipette, pcr_plate, competent_cell_wells, DNA_wells):
+        """
+        Interleave both mounts: after each competent cell tube is distributed, the DNA pipette fills the wells it
+        just reached, so cells wait the least for their DNA. The cell pipette keeps one tip for every tube
+        while the other mount works, unless both transfers use the same pipette.
+
+        Parameters:
+        - protocol: Protocol context
+        - cell_pipette: Pipette instrument for the competent cells
+        - dna_pipette: Pipette instrument for the DNA
+        - pcr_plate: Thermocycler plate
+        - competent_cell_wells: List of wells containing competent cells
+        - DNA_wells: List of wells containing DNA constructs
+        """
+        hold_tip = cell_pipette is not dna_pipette
+        if hold_tip:
+            self.tip_manager.pick_up_tip(cell_pipette)
+
+        well_index = self.thermocycler_starting_well
+        for tube_index, source_well in enumerate(competent_cell_wells):
+            dest_wells = self._distribute_competent_cell_tube(cell_pipette, pcr_plate, tube_index, source_well,
+                                                              self.transfer_volume_competent_cell, well_index,
+                                                              new_tip='never' if hold_tip else 'once')
+            #A construct split across two cell tubes takes one tip per tube
+            first_construct_well = well_index - self.thermocycler_starting_well
+            for construct_index, group in groupby(range(len(dest_wells)),
+                                                  key=lambda i: (first_construct_well + i) // self.replicates):
+                self._transfer_DNA_to_wells(protocol, dna_pipette, self.list_of_dna[construct_index],
+                                            DNA_wells[construct_index], [dest_wells[i] for i in group],
+                                            self.transfer_volume_dna)
+            well_index += len(dest_wells)
+
+        if hold_tip:
+            cell_pipette.drop_tip()
+
+    def compare_schedules(self, timings: Dict = None) -> Dict:
+        """
+        Estimate the deck time of the sequential and the interleaved schedules of this protocol.
+
+        Returns:
+        - Dictionary with, for each schedule, the total seconds, the tip pickups and the mean seconds between the
+          competent cells and the DNA reaching a well, plus the seconds saved by interleaving
+        """
+        report = {}
+        for schedule, interleave in (('sequential', False), ('interleaved', True)):
+            transformation = copy.deepcopy(self)
+            transformation.interleave_pipettes = interleave
+            transformation.tip_state_file = None
+            recorder = DeckTimeRecorder(timings)
+            transformation.run(recorder)
+
+            #Times of the dispenses into each transformation well, the competent cells arrive first and the DNA second
+            wells = {well_name_from_index(well) for well in transformation.transformation_wells}
+            elapsed = 0.0
+            dispensed = {}
+            for command in recorder.commands:
+                elapsed += command['seconds']
+                if command['command'] == 'dispense' and command['phase'] == 'pipetting' and command['well'] in wells:
+                    dispensed.setdefault(command['well'], []).append(elapsed)
+            waits = [times[1] - times[0] for times in dispensed.values() if len(times) > 1]
+
+            report[schedule] = {
+                'total_seconds': sum(command['seconds'] for command in recorder.commands),
+                'tip_pickups': sum(1 for command in recorder.commands if command['command'] == 'pick_up_tip'),
+                'mean_cell_wait_seconds': sum(waits) / len(waits) if waits else 0.0
+            }
+        report['saved_seconds'] = report['sequential']['total_seconds'] - report['interleaved']['total_seconds']
+        return report
 
     def _transfer_liquid_broth(self, protocol, pipette, pcr_plate, media_wells, transfer_volume_recovery_media,
                                thermocycler_starting_well):
@@ -451,9 +694,10 @@ class HeatShockTransformation(Transformation):
             wells_to_fill = min(self.transformations_per_media_tube, remaining_transformations)
 
             # Get destination wells for this tube using .top() to avoid contamination
-            dest_wells = [pcr_plate.wells()[well_index+i].top(2) for i in range(int(wells_to_fill))]
+            dest_wells = [well.top(2) for well in self._thermocycler_wells(pcr_plate, well_index, wells_to_fill)]
 
             #Distribute recovery media
+            self.tip_manager.prepare_tip(pipette)
             pipette.distribute(
                 volume=transfer_volume_recovery_media,
                 source=source_well,
@@ -465,8 +709,8 @@ class HeatShockTransformation(Transformation):
 
             #Track in dictionary
             media_name = f"Media_{tube_index+1}"
-            for i in range(int(wells_to_fill)):
-                well_name = pcr_plate.wells()[well_index + i].well_name
+            for well in self._thermocycler_wells(pcr_plate, well_index, wells_to_fill):
+                well_name = well.well_name
                 if well_name not in self.dict_of_parts_in_thermocycler:
                     self.dict_of_parts_in_thermocycler[well_name] = []
                 self.dict_of_parts_in_thermocycler[well_name].append(media_name)
@@ -1,6 +1,13 @@
 import subprocess
+import json
+import math
+import os
 import time
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, List, Union, Tuple, Dict
+import numpy as np
+from opentrons import protocol_api
+from opentrons.protocols.labware import get_labware_definition
 
 colors = [
     "#4040BF",   # Blue
@@ -164,14 +171,156 @@ class Camera:
         # Clear active process if it was the one we stopped
         self._active_video_process = None
 
+
+def is_dry_run(protocol) -> bool:
+    """
+    True for protocol contexts that do not drive the robot, the simulator and the deck time recorder.
+    State files of the robot, such as the tip state and the run journal, are only written by real runs.
+    """
+    return protocol.is_simulating() or getattr(protocol, 'dry_run', False)
+
+
+@lru_cache(maxsize=None)
+def _get_inner_geometry(load_name: str) -> Tuple[Dict, Dict]:
+    """
+    Inner well geometries of a labware and the geometry id of each well, from the newest
+    definition version that describes them. Both are empty if no version does.
+    """
+    for version in (4, 3, 2):
+        try:
+            definition = get_labware_definition(load_name, version=version)
+        except Exception:
+            continue
+        if 'innerLabwareGeometry' in definition:
+            well_geometries = {name: well.get('geometryDefinitionId') for name, well in definition['wells'].items()}
+            return definition['innerLabwareGeometry'], well_geometries
+    return {}, {}
+
+
+def _section_volumes(section: Dict, heights: np.ndarray) -> np.ndarray:
+    """Liquid volume held by one geometry section for every liquid height"""
+    section_height = section['topHeight'] - section['bottomHeight']
+    h = np.clip(heights - section['bottomHeight'], 0, section_height)
+    fraction = h / section_height if section_height > 0 else np.zeros_like(h)
+
+    if section['shape'] == 'spherical':
+        radius = section['radiusOfCurvature']
+        return np.pi * h ** 2 * (3 * radius - h) / 3
+    if section['shape'] == 'conical':
+        r_bottom = section['bottomDiameter'] / 2
+        r_top = r_bottom + (section['topDiameter'] / 2 - r_bottom) * fraction
+        return np.pi * h / 3 * (r_bottom ** 2 + r_bottom * r_top + r_top ** 2)
+    if section['shape'] == 'cuboidal':
+        def area(f):
+            x = section['bottomXDimension'] + (section['topXDimension'] - section['bottomXDimension']) * f
+            y = section['bottomYDimension'] + (section['topYDimension'] - section['bottomYDimension']) * f
+            return x * y
+        return h / 6 * (area(0) + 4 * area(fraction / 2) + area(fraction))
+    raise ValueError(f"Unknown well section shape '{section['shape']}'")
+
+
+@lru_cache(maxsize=None)
+def get_height_lookup_table(load_name: str, geometry_id: str,
+                            resolution: float = 0.1) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Precompute liquid height (mm) against volume (µL) for a well geometry of a labware.
+    Each section (cone frustum, cuboid frustum or spherical cap) contributes its volume below the height.
+
+    Returns:
+        (volumes, heights) arrays sorted by height, or None if the labware has no inner geometry
+    """
+    geometries, _ = _get_inner_geometry(load_name)
+    if geometry_id not in geometries:
+        return None
+    sections = geometries[geometry_id]['sections']
+    heights = np.arange(0, max(section['topHeight'] for section in sections) + resolution, resolution)
+    volumes = sum(_section_volumes(section, heights) for section in sections)
+    return volumes, heights
+
+
+def get_liquid_height(well, volume: float) -> Optional[float]:
+    """Liquid height in a well for a volume, from the labware geometry lookup table if there is one"""
+    load_name = well.parent.load_name
+    geometry_id = _get_inner_geometry(load_name)[1].get(well.well_name)
+    table = get_height_lookup_table(load_name, geometry_id)
+    if table is None:
+        return None
+    volumes, heights = table
+    return float(np.interp(volume, volumes, heights))
+
+
+class VolumeLedger:
+    """
+    PUDU-side liquid volumes for whole labware, kept in one NumPy array per labware.
+
+    Each well is read once from the API liquid tracking the first time it is seen;
+    afterwards volumes are only updated from the operations reported to the ledger.
+    """
+
+    def __init__(self):
+        self._volumes = {}
+        self._indexes = {}
+
+    def _locate(self, well):
+        """Return the volume array of the well's labware and the well's index in it"""
+        labware = well.parent
+        if labware not in self._volumes:
+            wells = labware.wells()
+            self._volumes[labware] = np.full(len(wells), np.nan)
+            self._indexes[labware] = {labware_well.well_name: i for i, labware_well in enumerate(wells)}
+        return self._volumes[labware], self._indexes[labware][well.well_name]
+
+    def _seed(self, well, volumes, index) -> None:
+        """Read the starting volume of a well from the API, once"""
+        if np.isnan(volumes[index]):
+            volume = well.current_liquid_volume()
+            if volume is None:
+                raise ValueError("API returned None for liquid volume")
+            volumes[index] = volume
+
+    def get_volume(self, well) -> Optional[float]:
+        """Current volume of a well, None if it is unknown"""
+        volumes, index = self._locate(well)
+        try:
+            self._seed(well, volumes, index)
+        except Exception:
+            return None
+        return float(volumes[index])
+
+    def set_volume(self, well, volume: float) -> None:
+        volumes, index = self._locate(well)
+        volumes[index] = volume
+
+    def add(self, wells: List, volumes: Union[float, List[float]]) -> None:
+        """Add liquid to several wells in one batch per labware. Negative volumes remove liquid."""
+        volumes = np.broadcast_to(np.asarray(volumes, dtype=float), (len(wells),))
+        batches = {}
+        for well, volume in zip(wells, volumes):
+            labware_volumes, index = self._locate(well)
+            try:
+                self._seed(well, labware_volumes, index)
+            except Exception:
+                labware_volumes[index] = 0.0  # Wells without loaded liquid start empty
+            batches.setdefault(well.parent, ([], []))
+            batches[well.parent][0].append(index)
+            batches[well.parent][1].append(volume)
+        for labware, (indexes, batch_volumes) in batches.items():
+            labware_volumes = self._volumes[labware]
+            np.add.at(labware_volumes, indexes, batch_volumes)
+            np.maximum(labware_volumes, 0.0, out=labware_volumes)
+
+    def remove(self, well, volume: float) -> None:
+        self.add([well], -volume)
+
 class SmartPipette:
     """
     Wrapper for automatic volume tracking
     """
 
-    def __init__(self, pipette, protocol):
+    def __init__(self, pipette, protocol, ledger: VolumeLedger = None):
         self.pipette = pipette
         self.protocol = protocol
+        self.ledger = ledger if ledger is not None else VolumeLedger()
         if not hasattr(protocol, 'define_liquid'):
             raise RuntimeError("This class requires API with liquid tracking support")
 
@@ -179,13 +328,22 @@ class SmartPipette:
         """Check if the well is from a conical tube labware or manually set as true"""
         return 'conical' in well.parent.load_name.lower() or use
 
+    def channel_wells(self, well) -> List:
+        """Wells reached by the pipette's nozzles when its first nozzle is at the given well"""
+        if 'multi' not in self.pipette.name:
+            return [well]
+        column = next(column for column in well.parent.columns() if well in column)
+        if len(column) == 1:
+            return [well] * 8  # Every nozzle draws from the same reservoir well
+        start = column.index(well)
+        return column[start:start + 8]
+
     def get_well_volume(self, well) -> Optional[float]:
-        """Get current volume in well using pure API method"""
-        try:
-            return well.current_liquid_volume()
-        except Exception as e:
-            self.protocol.comment(f"ERROR reading volume from {well.well_name}: {e}")
-            return None
+        """Get current volume in well from the volume ledger, seeded from API liquid tracking"""
+        volume = self.ledger.get_volume(well)
+        if volume is None:
+            self.protocol.comment(f"ERROR reading volume from {well.well_name}")
+        return volume
 
     def get_well_height(self, well) -> Optional[float]:
         """Get current liquid height using pure API method (if available)"""
@@ -199,28 +357,29 @@ class SmartPipette:
             self.protocol.comment(f"ERROR reading height from {well.well_name}: {e}")
             return None
 
-    def get_conical_tube_aspiration_height(self, well) -> float:
+    def get_conical_tube_aspiration_height(self, well, immersion_depth: float = 2.0) -> float:
         """
-        Calculate safe aspiration height for conical tubes using proven method
-        Uses API liquid tracking to get current volume
+        Calculate safe aspiration height for conical tubes, just below the meniscus.
+        Uses the labware's inner well geometry when its definition has one,
+        otherwise the proven linear volume model
         """
-        # Get current volume from API
-        try:
-            current_volume = well.current_liquid_volume()
-            if current_volume is None:
-                raise ValueError("API returned None for liquid volume")
-        except Exception as e:
-            self.protocol.comment(f"ERROR: Could not get liquid volume from API: {e}")
+        current_volume = self.get_well_volume(well)
+        if current_volume is None:
             return 10.0  # Safe fallback height
 
-        max_volume = well.max_volume
-        tube_depth = well.depth - 10  # Account for threads
-        min_safe_height = 3  # mm minimum to prevent tip damage
-        meniscus_offset = 10  # mm below liquid surface
+        liquid_height = get_liquid_height(well, current_volume)
+        if liquid_height is not None:
+            min_safe_height = 1  # mm, default bottom clearance
+            aspiration_height = max(liquid_height - immersion_depth, min_safe_height)
+        else:
+            max_volume = well.max_volume
+            tube_depth = well.depth - 10  # Account for threads
+            min_safe_height = 3  # mm minimum to prevent tip damage
+            meniscus_offset = 10  # mm below liquid surface
 
-        # Calculate liquid height based on current volume
-        liquid_height = (current_volume / max_volume) * tube_depth
-        aspiration_height = max(liquid_height - meniscus_offset, min_safe_height)
+            # Calculate liquid height based on current volume
+            liquid_height = (current_volume / max_volume) * tube_depth
+            aspiration_height = max(liquid_height - meniscus_offset, min_safe_height)
 
         self.protocol.comment(
             f"Conical calculation: {current_volume:.0f}µL remaining = {aspiration_height:.1f}mm height")
@@ -228,25 +387,22 @@ class SmartPipette:
 
     def get_aspiration_location(self, well, use: bool = False) -> float:
         """
-        Get intelligent aspiration location using API volume data and proven height calculation
+        Get intelligent aspiration location using ledger volume data and proven height calculation.
+        With a geometry model the meniscus is followed down to the bottom of the tube
         """
         if not self.is_conical_tube(well, use=use):
             return well
 
-        try:
-            current_volume = well.current_liquid_volume()
-            if current_volume is None or current_volume < well.max_volume * 0.2:
-                # Less than 20% remaining - use standard aspiration
-                self.protocol.comment("Low volume detected - using standard aspiration")
-                return well
-
-            # Use conical tube calculation
-            safe_height = self.get_conical_tube_aspiration_height(well)
-            return well.bottom(safe_height)
+        current_volume = self.get_well_volume(well)
+        has_geometry = current_volume is not None and get_liquid_height(well, current_volume) is not None
+        if current_volume is None or (not has_geometry and current_volume < well.max_volume * 0.2):
+            # Less than 20% remaining - use standard aspiration
+            self.protocol.comment("Low volume detected - using standard aspiration")
+            return well
 
-        except Exception as e:
-            self.protocol.comment(f"ERROR getting volume from API: {e}")
-            return well  # Fallback to standard aspiration
+        # Use conical tube calculation
+        safe_height = self.get_conical_tube_aspiration_height(well)
+        return well.bottom(safe_height)
 
     def liquid_transfer(self, volume: float, source, destination,
                  asp_rate: float = 0.5, disp_rate: float = 1.0,
@@ -254,25 +410,20 @@ class SmartPipette:
                  mix_before: float = 0.0, mix_after: float = 0.0,
                  mix_reps: int = 3, new_tip: bool = True, drop_tip: bool = True, use:bool = False) -> bool:
         """
-        Transfer liquid using pure API liquid tracking for volume management
+        Transfer liquid using the volume ledger for volume management
 
         Returns:
             bool: True if transfer was successful, False if insufficient volume
         """
-        # Check volume using API methods only
-        try:
-            current_volume = source.current_liquid_volume()
-            if current_volume is None:
-                self.protocol.comment("WARNING: API returned None for source volume")
-                return False
-
-            if current_volume < volume:
-                self.protocol.comment(f"WARNING: Insufficient volume. "
-                                      f"Requested: {volume}µL, Available: {current_volume:.0f}µL")
-                return False
+        # Check volume using the ledger
+        current_volume = self.get_well_volume(source)
+        if current_volume is None:
+            self.protocol.comment("WARNING: Could not check source volume")
+            return False
 
-        except Exception as e:
-            self.protocol.comment(f"ERROR: Could not check source volume: {e}")
+        if current_volume < volume:
+            self.protocol.comment(f"WARNING: Insufficient volume. "
+                                  f"Requested: {volume}µL, Available: {current_volume:.0f}µL")
             return False
 
         if new_tip:
@@ -292,9 +443,11 @@ class SmartPipette:
 
         # Aspirate
         self.pipette.aspirate(volume, aspiration_location, rate=asp_rate)
+        self.ledger.add(self.channel_wells(source), -volume)
 
         # Dispense
         self.pipette.dispense(volume, destination.center(), rate=disp_rate)
+        self.ledger.add(self.channel_wells(destination), volume)
 
         # Mix after if requested
         if mix_after > 0:
@@ -309,3 +462,238 @@ class SmartPipette:
         if drop_tip:
             self.pipette.drop_tip()
         return True
+
+    def multi_dispense(self, volume: float, source, destinations: List,
+                       asp_rate: float = 0.5, disp_rate: float = 1.0,
+                       new_tip: bool = True, drop_tip: bool = True, use: bool = False,
+                       disposal_volume: float = 0) -> bool:
+        """
+        Fill consecutive wells with the same volume, aspirating as much as the pipette and its tips can hold
+        and splitting it across the wells. The aspiration height is updated before every aspiration.
+        The disposal volume is aspirated on top of every batch and blown out back into the source.
+
+        Returns:
+            bool: True if every well was filled, False if the source ran out
+        """
+        wells_per_aspiration = max(1, int((self.working_volume() - disposal_volume) // volume))
+
+        if new_tip:
+            self.pipette.pick_up_tip()
+
+        filled = True
+        for i in range(0, len(destinations), wells_per_aspiration):
+            batch = destinations[i:i + wells_per_aspiration]
+            batch_volume = volume * len(batch)
+
+            current_volume = self.get_well_volume(source)
+            if current_volume is None or current_volume < batch_volume + disposal_volume:
+                self.protocol.comment(f"WARNING: Insufficient volume. Requested: {batch_volume + disposal_volume}µL, "
+                                      f"Available: {current_volume or 0:.0f}µL")
+                filled = False
+                break
+
+            self.pipette.aspirate(batch_volume + disposal_volume, self.get_aspiration_location(source, use),
+                                  rate=asp_rate)
+            self.ledger.add(self.channel_wells(source), -batch_volume)
+            for destination in batch:
+                self.pipette.dispense(volume, destination.center(), rate=disp_rate)
+            self.ledger.add([well for destination in batch for well in self.channel_wells(destination)], volume)
+            self.pipette.blow_out(source.top())
+
+        if drop_tip:
+            self.pipette.drop_tip()
+        return filled
+
+    def working_volume(self) -> float:
+        """Most the pipette can aspirate, the smaller of the pipette and the tip capacity"""
+        if self.pipette.tip_racks:
+            return min(self.pipette.max_volume, self.pipette.tip_racks[0].wells()[0].max_volume)
+        return self.pipette.max_volume
+
+    def distribute(self, volume: float, source, dests: List, disposal_volume: float = 0,
+                   use: bool = False, **kwargs) -> None:
+        """
+        Distribute from a source at its current aspiration height and update the ledger in one batch.
+        Extra keyword arguments are passed to the pipette's distribute.
+        """
+        aspiration_location = self.get_aspiration_location(source, use)
+        self.pipette.distribute(volume=volume, source=aspiration_location, dest=dests,
+                                disposal_volume=disposal_volume, **kwargs)
+
+        # The disposal volume is taken once per aspiration and blown out to the trash
+        aspirations = np.ceil(volume * len(dests) / max(self.working_volume() - disposal_volume, volume))
+        self.ledger.remove(source, volume * len(dests) + disposal_volume * aspirations)
+        self.ledger.add(dests, volume)
+
+
+class TipManager:
+    """
+    Batch tip rack management shared by every pipette of a protocol.
+
+    Each pipette gets its own tip rack type and deck slots. Racks that do not fit on the deck are
+    loaded OFF_DECK; when the racks on the deck are used up they are moved off deck and the next
+    batch takes their slots.
+
+    With a tip_state_file, the next tip of every rack left on the deck is saved per slot at the end of
+    a run, and the following run resumes from a partly used rack instead of a fresh one.
+    """
+
+    def __init__(self, protocol, tip_state_file: str = None):
+        self.protocol = protocol
+        self.tip_management = {}
+        self.tip_state_file = tip_state_file
+        self.tip_state = {}
+        if tip_state_file and os.path.exists(tip_state_file):
+            with open(tip_state_file) as state_file:
+                self.tip_state = json.load(state_file)
+
+    def setup_tip_racks(self, pipette, tiprack_labware: str, positions: Union[str, List[str]],
+                        tips_needed: int, starting_tip: str = None, tips_used: int = 0) -> List:
+        """
+        Load enough tip racks for a pipette and assign them to it.
+
+        Args:
+            pipette: Pipette the racks are used by
+            tiprack_labware: Tip rack load name
+            positions: Deck slot, or list of deck slots, for the racks on the deck
+            tips_needed: Tip pickups the pipette will make, a multichannel pickup counts once
+            starting_tip: Well of the first rack to start from, the tips before it count as used
+            tips_used: Pickups an interrupted run already made from these racks. Earlier rack batches
+                were swapped out, so only the pickups from the racks on the deck are skipped
+
+        Returns:
+            All the racks of the pipette, on and off deck
+        """
+        positions = [positions] if isinstance(positions, str) else list(positions)
+        pickups_per_rack = 96 // (8 if 'multi' in pipette.name else 1)
+        if starting_tip is None and not tips_used:
+            positions, starting_tip = self._resume_from_tip_state(tiprack_labware, positions)
+        if tips_used:
+            tips_used = (tips_used - 1) % (len(positions) * pickups_per_rack) + 1
+
+        first_rack = self.protocol.load_labware(tiprack_labware, positions[0])
+        if starting_tip:
+            pipette.starting_tip = first_rack[starting_tip]
+            tips_used = first_rack.wells().index(first_rack[starting_tip]) * pickups_per_rack // 96
+        tip_racks_needed = max(1, math.ceil((tips_needed + tips_used) / pickups_per_rack))
+
+        self.protocol.comment(f"{pipette.name} requires {tips_needed} tips ({tip_racks_needed} racks)")
+
+        on_deck_racks = [first_rack]
+        for position in positions[1:min(tip_racks_needed, len(positions))]:
+            on_deck_racks.append(self.protocol.load_labware(tiprack_labware, position))
+
+        off_deck_racks = [self.protocol.load_labware(tiprack_labware, protocol_api.OFF_DECK)
+                          for _ in range(len(positions), tip_racks_needed)]
+
+        all_tip_racks = on_deck_racks + off_deck_racks
+        pipette.tip_racks = all_tip_racks
+        if tips_used and not starting_tip and tips_used // pickups_per_rack < len(all_tip_racks):
+            rack = all_tip_racks[tips_used // pickups_per_rack]
+            pipette.starting_tip = rack.wells()[tips_used % pickups_per_rack * 96 // pickups_per_rack]
+        self.tip_management[pipette.mount] = {
+            'all_racks': all_tip_racks,
+            'on_deck_racks': on_deck_racks,
+            'off_deck_racks': off_deck_racks,
+            'available_slots': positions,
+            'tips_used': tips_used,
+            'tips_per_batch': len(positions) * pickups_per_rack,
+            'current_batch': 1,
+            'total_batches': math.ceil(tip_racks_needed / len(positions))
+        }
+
+        if off_deck_racks:
+            self.protocol.comment(f"Will perform {self.tip_management[pipette.mount]['total_batches'] - 1} "
+                                  f"tip rack batch swaps for {pipette.name}")
+        return all_tip_racks
+
+    def _resume_from_tip_state(self, tiprack_labware: str, positions: List[str]) -> Tuple[List[str], Optional[str]]:
+        """
+        Order the slots so a partly used rack from the previous run comes first.
+
+        Returns:
+            The reordered slots and the tip to start from, None for a full rack
+        """
+        partial_slots = []
+        for position in positions:
+            state = self.tip_state.get(str(position))
+            if not state or state['labware'] != tiprack_labware or state['next_tip'] == 'A1':
+                continue
+            if state['next_tip'] is None:
+                self.protocol.pause(f"Replace the empty tip rack in slot {position} with a full one")
+            else:
+                partial_slots.append(position)
+
+        if not partial_slots:
+            return positions, None
+        for position in partial_slots[1:]:
+            self.protocol.pause(f"Replace the partly used tip rack in slot {position} with a full one")
+        resume_slot = partial_slots[0]
+        starting_tip = self.tip_state[str(resume_slot)]['next_tip']
+        self.protocol.comment(f"Resuming tip rack in slot {resume_slot} from {starting_tip}")
+        return [resume_slot] + [position for position in positions if position != resume_slot], starting_tip
+
+    def get_tip_state(self) -> Dict:
+        """
+        Next tip of every rack on the deck, keyed by slot. Slots not used in this run keep their saved state.
+
+        Returns:
+            dict of slot -> {'labware': load name, 'next_tip': well name, or None for an empty rack}
+        """
+        tip_state = dict(self.tip_state)
+        for management in self.tip_management.values():
+            pickups_per_rack = management['tips_per_batch'] // len(management['available_slots'])
+            batch_tips_used = management['tips_used'] - (management['current_batch'] - 1) * management['tips_per_batch']
+            for i, rack in enumerate(management['on_deck_racks']):
+                rack_tips_used = min(max(batch_tips_used - i * pickups_per_rack, 0), pickups_per_rack)
+                next_tip = None
+                if rack_tips_used < pickups_per_rack:
+                    next_tip = rack.wells()[rack_tips_used * 96 // pickups_per_rack].well_name
+                tip_state[str(management['available_slots'][i])] = {'labware': rack.load_name, 'next_tip': next_tip}
+        return tip_state
+
+    def save_tip_state(self) -> None:
+        """Write the tip state file at the end of a run. Dry runs leave the file untouched."""
+        if not self.tip_state_file or is_dry_run(self.protocol):
+            return
+        with open(self.tip_state_file, 'w') as state_file:
+            json.dump(self.get_tip_state(), state_file, indent=1)
+
+    def prepare_tip(self, pipette) -> None:
+        """
+        Account for one tip pickup, swapping in the next rack batch first if the racks on the deck are used up.
+        Call before transfers that pick up their own tip.
+        """
+        management = self.tip_management[pipette.mount]
+        if (management['tips_used'] > 0 and management['tips_used'] % management['tips_per_batch'] == 0
+                and management['off_deck_racks']):
+            self._perform_tip_rack_batch_swap(management)
+        management['tips_used'] += 1
+
+    def pick_up_tip(self, pipette) -> None:
+        """Pick up a tip, swapping in the next tip rack batch first if needed"""
+        self.prepare_tip(pipette)
+        try:
+            pipette.pick_up_tip()
+        except Exception as e:
+            self.protocol.comment(f"Tip pickup failed with error: {e}")
+            raise
+
+    def _perform_tip_rack_batch_swap(self, management: Dict) -> None:
+        """Perform tip rack batch swap when current batch is exhausted"""
+        available_slots = management['available_slots']
+
+        for rack in management['on_deck_racks']:
+            self.protocol.move_labware(labware=rack, new_location=protocol_api.OFF_DECK)
+
+        racks_to_move = min(len(available_slots), len(management['off_deck_racks']))
+        new_on_deck_racks = []
+        for i in range(racks_to_move):
+            rack = management['off_deck_racks'].pop(0)
+            self.protocol.move_labware(labware=rack, new_location=available_slots[i])
+            new_on_deck_racks.append(rack)
+
+        management['on_deck_racks'] = new_on_deck_racks
+        management['current_batch'] += 1
+
+        self.protocol.comment(f"Tip rack batch {management['current_batch']} ready!")
@@ -1,28 +1,51 @@
-import unittest
-import subprocess
+import os
 import pathlib
+import subprocess
+import sys
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 SCRIPTS_DIR = pathlib.Path("scripts")
 
+
+def simulate_script(script_path: str):
+    """
+    Simulate one protocol script in a fresh interpreter, so no module state is shared between scripts.
+
+    Returns:
+        tuple of the script name, whether it succeeded, the error (if any) and the seconds taken
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-m', 'opentrons.simulate', script_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    error = result.stderr if result.returncode != 0 else None
+    return pathlib.Path(script_path).name, error is None, error, time.perf_counter() - start
+
+
+def simulate_scripts(script_paths, max_workers: int = None):
+    """Simulate several protocol scripts in parallel, each in its own process."""
+    if max_workers is None:
+        max_workers = min(len(script_paths), max(2, os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(simulate_script, [str(path) for path in script_paths]))
+
+
 class TestAllScripts(unittest.TestCase):
     def test_all_scripts_with_simulator(self):
         # Make sure we found the folder
         self.assertTrue(SCRIPTS_DIR.exists(), f"Scripts dir not found: {SCRIPTS_DIR}")
         script_files = sorted(SCRIPTS_DIR.glob("*.py"), key=lambda p: p.name.lower())
 
-        for script_path in script_files:
-            with self.subTest(script=script_path.name):
-                print(f"\n=== Simulating: {script_path.name} ===")
-                result = subprocess.run(
-                    ["opentrons_simulate", str(script_path)],
-                    capture_output=True,
-                    text=True
-                )
-                # Ensure simulator exits successfully
-                self.assertEqual(
-                    result.returncode, 0,
-                    msg=f"Simulation failed for {script_path}:\n{result.stderr}"
-                )
+        start = time.perf_counter()
+        results = simulate_scripts(script_files)
+        print(f"\n=== Simulated {len(results)} scripts in {time.perf_counter() - start:.1f}s ===")
+
+        for name, success, error, seconds in results:
+            print(f"{name}: {seconds:.1f}s {'ok' if success else 'FAILED'}")
+            with self.subTest(script=name):
+                # Ensure simulator runs successfully
+                self.assertTrue(success, msg=f"Simulation failed for {name}:\n{error}")
     #TODO: Create edge case tests that fail appropriately
     #Some example edge cases:
     #Too many reagents for the labware
@@ -0,0 +1,237 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pudu.assembly import (LoopAssembly, Domestication, DEFAULT_MANUAL_ASSEMBLIES,
+                           DEFAULT_SBOL_ASSEMBLIES, DEFAULT_DOMESTICATION_ASSEMBLY)
+from pudu.pipeline import Pipeline
+from pudu.planning import summarize_plan, tip_demand, optimize_route, place_wells, RunJournal
+
+
+class TestAssemblyPlanning(unittest.TestCase):
+    def test_manual_plan_without_protocol(self):
+        assembly = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=2)
+        plan = assembly.plan()
+        summary = summarize_plan(plan)
+
+        # water + buffer + ligase + enzyme + 5 parts (receiver included) per well
+        self.assertEqual(summary['wells'], 2)
+        self.assertEqual(summary['transfers'], 2 * 9)
+        self.assertEqual(summary['tips'], 2 * 9)
+        self.assertEqual(assembly.dict_of_parts_in_thermocycler,
+                         {"Replicate: 1, Combination: ('GVP0008', 'B0034', 'sfGFP', 'B0015', 'Odd_1')": 'A1',
+                          "Replicate: 2, Combination: ('GVP0008', 'B0034', 'sfGFP', 'B0015', 'Odd_1')": 'B1'})
+
+    def test_reagent_major_plan_reuses_tips(self):
+        assemblies = [{"promoter": ["p1", "p2", "p3", "p4"], "rbs": ["r1", "r2"], "cds": "GFP",
+                       "terminator": "B0015", "receiver": "Odd_1"}]
+        well_major = summarize_plan(LoopAssembly(assemblies).plan())
+        reagent_major = summarize_plan(LoopAssembly(assemblies, reagent_major=True).plan())
+
+        self.assertEqual(reagent_major['transfers'], well_major['transfers'])
+        self.assertEqual(reagent_major['volume_per_source'], well_major['volume_per_source'])
+        # 8 wells: one tip per reagent instead of one per reagent and well
+        self.assertEqual(well_major['tips'] - reagent_major['tips'], 8 * 4 - 4)
+
+    def test_reagent_major_plan_shares_reagents_across_odd_and_even(self):
+        assemblies = [{"promoter": ["p1", "p2"], "cds": "GFP", "terminator": "B0015", "receiver": "Odd_1"},
+                      {"promoter": ["p3", "p4"], "cds": "RFP", "terminator": "B0015", "receiver": "Even_1"}]
+        plan = LoopAssembly(assemblies, reagent_major=True).plan()
+
+        shared = [operation for operation in plan if operation.get('source') in
+                  ('Deionized Water', 'T4 DNA Ligase Buffer', 'T4 DNA Ligase')]
+        enzymes = [operation for operation in plan if operation.get('source', '').startswith('Restriction Enzyme')]
+        # one sweep per shared reagent over all 4 wells, one per enzyme over its 2 wells
+        self.assertEqual(sum(operation['new_tip'] for operation in shared), 3)
+        self.assertEqual([(operation['source'], operation['dests']) for operation in enzymes],
+                         [('Restriction Enzyme BSAI', [0, 1]), ('Restriction Enzyme SAPI', [2, 3])])
+
+    def test_distribute_keeps_a_disposal_volume_in_the_tip(self):
+        assemblies = [{"promoter": ["p1", "p2", "p3", "p4"], "rbs": ["r1", "r2"], "cds": "GFP",
+                       "terminator": "B0015", "receiver": "Odd_1"}]
+        plan = LoopAssembly(assemblies, reagent_major=True).plan()
+
+        ligase = [operation for operation in plan if operation.get('source') == 'T4 DNA Ligase']
+        # 4 µL into 8 wells: the 20 µL tip takes 4 wells and 1 µL of disposal volume per aspiration
+        self.assertEqual([len(operation['dests']) for operation in ligase], [4, 4])
+        self.assertEqual([operation['disposal_volume'] for operation in ligase], [1, 1])
+        for operation in plan:
+            if operation['op'] == 'distribute':
+                self.assertLessEqual(operation['volume'] * len(operation['dests']) + operation['disposal_volume'], 20)
+
+    def test_tip_demand_follows_the_plan(self):
+        assemblies = [{"promoter": ["p1", "p2", "p3", "p4"], "rbs": ["r1", "r2"], "cds": "GFP",
+                       "terminator": "B0015", "receiver": "Odd_1"}]
+        assembly = LoopAssembly(assemblies, reagent_major=True)
+        plan = assembly.plan()
+
+        # 4 shared reagent sweeps + 5 parts per well, the bubble removal keeps the last part tip
+        self.assertEqual(tip_demand(plan, assembly.pipette, assembly.tiprack_labware),
+                         {'p20_single_gen2': {'opentrons_96_tiprack_20ul': 4 + 8 * 5}})
+        self.assertEqual(assembly._calculate_total_tips_needed(), 4 + 8 * 5)
+
+    def test_mixing_strategies_shape_the_plan(self):
+        bubble_removal = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES).plan()
+        self.assertEqual(bubble_removal[-1]['op'], 'remove_bubbles')
+        self.assertEqual(bubble_removal[-1]['repetitions'], 2)
+
+        mix_after = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, mixing_strategy='mix_after_last_part').plan()
+        self.assertEqual((mix_after[-1]['op'], mix_after[-1]['mix_after'], mix_after[-1]['drop_tip']),
+                         ('transfer', 10.0, True))
+
+        plate = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, mixing_strategy='plate').plan()
+        self.assertEqual(plate[-1], {'op': 'mix_plate', 'plate': 1})
+        self.assertEqual(summarize_plan(plate)['tips'], summarize_plan(bubble_removal)['tips'])
+
+        unmixed = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, mixing_strategy='none').plan()
+        # water, buffer, ligase and enzyme, then the 5 parts without mixing
+        self.assertEqual([operation['mix_before'] for operation in unmixed[4:]], [0.0] * 5)
+        with self.assertRaises(ValueError):
+            LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, mixing_strategy='vortex')
+
+    def test_route_optimization_keeps_well_contents(self):
+        assemblies = [{"promoter": ["p1", "p2", "p3", "p4"], "rbs": ["r1", "r2"], "cds": ["c1", "c2"],
+                       "terminator": "B0015", "receiver": "Odd_1"}]
+        plan = LoopAssembly(assemblies, reagent_major=True).plan()
+        # Plate wells on a 9 mm grid, sources to the front left of the plate
+        points = {well: (9 * (well // 8), -9 * (well % 8)) for well in range(16)}
+        points.update({source: (-40, -20 - 10 * i) for i, source in
+                       enumerate(summarize_plan(plan)['volume_per_source'])})
+        optimized, report = optimize_route(plan, points)
+
+        self.assertEqual(summarize_plan(optimized), summarize_plan(plan))
+        self.assertEqual([len(operation.get('dests', [])) for operation in optimized],
+                         [len(operation.get('dests', [])) for operation in plan])
+        self.assertGreater(report['saved_mm'], 0)
+        self.assertAlmostEqual(report['saved_seconds'], report['saved_mm'] / 400)
+
+    def test_combinations_counted_before_expansion(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(5)], "rbs": [f"r{i}" for i in range(5)],
+                       "cds": [f"c{i}" for i in range(4)], "terminator": "B0015", "receiver": "Odd_1"}]
+        assembly = LoopAssembly(assemblies)
+        with self.assertRaises(ValueError):
+            assembly.process_assemblies()
+        self.assertEqual(assembly.total_combinations, 100)
+
+    def test_multi_plate_combinations_capped_before_expansion(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(5)], "rbs": [f"r{i}" for i in range(5)],
+                       "cds": [f"c{i}" for i in range(4)], "terminator": "B0015", "receiver": "Odd_1"}]
+        # 100 combinations in 10 replicates need more wells than 10 plates hold
+        assembly = LoopAssembly(assemblies, replicates=10, multi_plate=True)
+        with mock.patch.object(assembly, '_plan_combinations') as plan_combinations:
+            with self.assertRaises(ValueError):
+                assembly.plan()
+        plan_combinations.assert_not_called()
+
+    def test_multi_plate_plan_splits_into_plate_batches(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(5)], "rbs": [f"r{i}" for i in range(5)],
+                       "cds": [f"c{i}" for i in range(4)], "terminator": "B0015", "receiver": "Odd_1"}]
+        assembly = LoopAssembly(assemblies, multi_plate=True, thermocycler_starting_well=90)
+        plan = assembly.plan()
+
+        swaps = [i for i, operation in enumerate(plan) if operation['op'] == 'swap_plate']
+        self.assertEqual(len(swaps), 1)
+        self.assertTrue(all(operation['dest'] < 96 for operation in plan[:swaps[0]]))
+        self.assertEqual(summarize_plan(plan)['plates'], 2)
+        self.assertEqual(list(assembly.dict_of_parts_in_thermocycler.values())[6], 'Plate 2 A1')
+
+    def test_overflow_labware_raises_part_limit(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(18)], "rbs": "B0034", "cds": "GFP",
+                       "terminator": "B0015", "receiver": "Odd_1"}]
+        with self.assertRaises(ValueError):
+            LoopAssembly(assemblies).process_assemblies()
+
+        assembly = LoopAssembly(assemblies, overflow_labware='opentrons_24_tuberack_nest_1.5ml_snapcap')
+        assembly.process_assemblies()
+        self.assertEqual(assembly._get_overflow_capacity(), 24)
+        self.assertNotIn('3', assembly.tiprack_positions)
+
+    def test_heavily_used_parts_are_split_over_tubes(self):
+        assembly = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=30, part_tube_volume=50)
+        volumes = summarize_plan(assembly.plan())['volume_per_source']
+
+        # 60 µL per part, 45 µL usable per tube, drawn evenly from both tubes
+        self.assertEqual(assembly.part_aliquots['Odd_1'], 2)
+        self.assertEqual((volumes['Odd_1'], volumes['Odd_1 (2)']), (30, 30))
+        with self.assertRaises(ValueError):
+            LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=96, part_tube_volume=20).plan()
+
+    def test_part_tubes_sized_by_the_overflow_wells(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(18)], "rbs": "B0034", "cds": "GFP",
+                       "terminator": "B0015", "receiver": "Odd_1"}]
+        assembly = LoopAssembly(assemblies, replicates=10, volume_part=10, volume_total_reaction=60, multi_plate=True,
+                                overflow_labware='nest_96_wellplate_100ul_pcr_full_skirt')
+        volumes = summarize_plan(assembly.plan())['volume_per_source']
+
+        # 100 µL of promoter per reaction set spills onto 100 µL wells, 95 µL usable each
+        self.assertEqual(assembly.part_tubes['p9'], 95)
+        self.assertEqual(assembly.part_aliquots['p9'], 2)
+        self.assertEqual(assembly.part_aliquots['p0'], 1)
+        for tube, capacity in assembly.part_tubes.items():
+            self.assertLessEqual(volumes.get(tube, 0), capacity)
+
+    def test_plan_is_serializable_and_repeatable(self):
+        assembly = LoopAssembly(DEFAULT_SBOL_ASSEMBLIES)
+        plan = assembly.plan()
+        self.assertEqual(json.loads(json.dumps(plan)), plan)
+        self.assertEqual(assembly.plan(), plan)
+        self.assertEqual(len(assembly.dna_list_for_transformation_protocol), 1)
+
+    def test_domestication_plan_starts_at_starting_well(self):
+        assembly = Domestication(DEFAULT_DOMESTICATION_ASSEMBLY, thermocycler_starting_well=10)
+        plan = assembly.plan()
+        self.assertEqual(sorted({operation['dest'] for operation in plan}), [10, 11])
+        self.assertEqual(plan[-1]['op'], 'remove_bubbles')
+
+    def test_well_placement_policies(self):
+        self.assertEqual(place_wells(4, starting_well=6), [6, 7, 8, 9])
+        # Groups of three never span two columns
+        self.assertEqual(place_wells(9, 'replicate_columns', group_size=3), [0, 1, 2, 3, 4, 5, 8, 9, 10])
+        self.assertEqual(place_wells(3, 'avoid_edges'), [9, 10, 11])
+        self.assertEqual(len(set(place_wells(61, 'avoid_edges'))), 61)
+        self.assertEqual(place_wells(61, 'avoid_edges')[-2:], [86, 105])
+        with self.assertRaises(ValueError):
+            place_wells(2, 'diagonal')
+
+    def test_assembly_well_placement_maps_constructs(self):
+        assembly = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=3, well_placement='avoid_edges')
+        plan = assembly.plan()
+        self.assertEqual(sorted({operation['dest'] for operation in plan}), [9, 10, 11])
+        self.assertEqual(list(assembly.thermocycler_well_map), ['B2', 'C2', 'D2'])
+        self.assertEqual(assembly.thermocycler_well_map['D2'][-1], 'replicate_3')
+        self.assertEqual(set(assembly.dict_of_parts_in_thermocycler.values()), {'B2', 'C2', 'D2'})
+        with self.assertRaises(ValueError):
+            LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, thermocycler_starting_well=95,
+                         well_placement='avoid_edges').plan()
+
+
+    def test_pipeline_hands_well_maps_between_stages(self):
+        assembly = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=2, well_placement='avoid_edges')
+        stages = Pipeline(assembly, transformation={'competent_cells': 'DH5alpha', 'replicates': 1}).plan()
+        transformation = stages['transformation']
+        self.assertEqual(transformation.dna_wells, ['B2', 'C2'])
+        self.assertEqual(transformation.list_of_dna, list(assembly.thermocycler_well_map.values()))
+        self.assertEqual(transformation.dna_plate, assembly.thermocycler_labware)
+        self.assertEqual(stages['plating'].bacterium_locations,
+                         {'A1': [transformation.list_of_dna[0]], 'B1': [transformation.list_of_dna[1]]})
+
+    def test_journal_survives_an_entry_cut_short(self):
+        plan = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES).plan()
+        with tempfile.TemporaryDirectory() as directory:
+            journal = RunJournal(os.path.join(directory, 'journal.jsonl'), plan)
+            journal.start()
+            journal.record(0, 'started', new_tip=True)
+            journal.record(0, 'done')
+            journal.record(1, 'started', new_tip=True)
+            with open(journal.filename, 'a') as journal_file:
+                journal_file.write('\n{"operation": 1, "sta')
+            journal.record(2, 'started', new_tip=True)
+
+            self.assertEqual(journal.load(), ({0}, {1, 2}, 3))
+            with self.assertRaises(ValueError):
+                RunJournal(journal.filename, plan[1:]).load()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from pudu.assembly import LoopAssembly, DEFAULT_MANUAL_ASSEMBLIES
+from pudu.calibration import GFPODCalibration
+from pudu.transformation import HeatShockTransformation
+from pudu.estimation import estimate_deck_time, format_deck_time, PHASES
+
+
+class TestDeckTimeEstimation(unittest.TestCase):
+    def test_full_plate_assembly_estimate_is_fast(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(4)], "rbs": [f"r{i}" for i in range(4)],
+                       "cds": [f"c{i}" for i in range(6)], "terminator": "B0015", "receiver": "Odd_1"}]
+        start = time.perf_counter()
+        estimate = estimate_deck_time(LoopAssembly(assemblies, output_xlsx=False))
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+        self.assertEqual(set(estimate['phases']), set(PHASES))
+        self.assertAlmostEqual(estimate['total_seconds'], sum(estimate['phases'].values()))
+        # 96 wells of 4 reagents and 5 parts, one tip each
+        self.assertEqual(estimate['commands']['tip_swaps'], 2 * 96 * 9 + 9)
+        self.assertEqual(estimate['commands']['air_bubble_removal'], 2 * 2 * 96)
+
+    def test_profile_holds_follow_thermocycler_steps(self):
+        estimate = estimate_deck_time(HeatShockTransformation(list_of_dna=['pro', 'rbs'], competent_cells='DH5alpha'))
+        # 30 + 1 + 2 min heat shock profile and 60 min recovery
+        self.assertAlmostEqual(estimate['phases']['profile_holds'], 93 * 60)
+
+    def test_interleaved_transformation_schedule(self):
+        transformation = HeatShockTransformation(list_of_dna=[f'dna{i}' for i in range(8)], competent_cells='DH5alpha')
+        report = transformation.compare_schedules()
+
+        # One p300 tip for the 4 competent cell tubes instead of one per tube
+        self.assertEqual(report['sequential']['tip_pickups'] - report['interleaved']['tip_pickups'], 3)
+        self.assertGreater(report['saved_seconds'], 0)
+        self.assertLess(report['interleaved']['mean_cell_wait_seconds'],
+                        report['sequential']['mean_cell_wait_seconds'])
+        self.assertFalse(transformation.interleave_pipettes)
+
+    def test_cell_wait_counts_dna_dispensed_with_air_gap(self):
+        transformation = HeatShockTransformation(list_of_dna=[f'dna{i}' for i in range(8)], competent_cells='DH5alpha',
+                                                 replicates=1, dna_tip_per_construct=True)
+        report = transformation.compare_schedules()
+        self.assertGreater(report['interleaved']['mean_cell_wait_seconds'], 0)
+        self.assertLess(report['interleaved']['mean_cell_wait_seconds'],
+                        report['sequential']['mean_cell_wait_seconds'])
+
+    def test_mixing_strategies_trade_mixing_time(self):
+        assembly = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=4, output_xlsx=False)
+        report = assembly.compare_mixing_strategies(['bubble_removal', 'reduced_volume', 'none'])
+
+        self.assertLess(report['none']['mixing_seconds'], report['reduced_volume']['mixing_seconds'])
+        self.assertLess(report['reduced_volume']['mixing_seconds'], report['bubble_removal']['mixing_seconds'])
+        self.assertEqual(report['none']['tip_pickups'], report['bubble_removal']['tip_pickups'])
+        self.assertEqual(assembly.mixing_strategy, 'bubble_removal')
+
+    def test_assembly_thermocycling_dominates_estimate(self):
+        assembly = estimate_deck_time(LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, output_xlsx=False))
+        self.assertGreater(assembly['phases']['profile_holds'], assembly['phases']['pipetting'])
+        self.assertIn('profile holds', format_deck_time(assembly))
+
+    def test_calibration_has_no_module_time(self):
+        estimate = estimate_deck_time(GFPODCalibration())
+        self.assertEqual(estimate['phases']['temperature_ramps'], 0)
+        self.assertGreater(estimate['phases']['mixing'], 0)
+
+    def test_estimate_leaves_tip_state_file_unchanged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tip_state_file = os.path.join(directory, 'tips.json')
+            tip_state = {'9': {'labware': 'opentrons_96_tiprack_20ul', 'next_tip': 'E1'}}
+            with open(tip_state_file, 'w') as state_file:
+                json.dump(tip_state, state_file)
+            transformation = HeatShockTransformation(list_of_dna=['pro', 'rbs'], competent_cells='DH5alpha',
+                                                     tip_state_file=tip_state_file)
+            for _ in range(2):
+                estimate_deck_time(transformation)
+            with open(tip_state_file) as state_file:
+                self.assertEqual(json.load(state_file), tip_state)
+
+    def test_estimate_leaves_run_journal_unchanged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal_file = os.path.join(directory, 'journal.jsonl')
+            with open(journal_file, 'w') as journal:
+                journal.write('crash journal')
+            estimate_deck_time(LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, output_xlsx=False, journal_file=journal_file))
+            with open(journal_file) as journal:
+                self.assertEqual(journal.read(), 'crash journal')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import json
+import os
+import tempfile
+import unittest
+
+from pudu.assembly import LoopAssembly, DEFAULT_MANUAL_ASSEMBLIES
+from pudu.calibration import GFPODCalibration, RGBODCalibration
+from pudu.sample_preparation import PlateSamples, PlateWithGradient
+from pudu.pipeline import Pipeline
+from pudu.planning import RunJournal
+from pudu.simulation import simulate
+from pudu.transformation import HeatShockTransformation
+
+
+class TestSimulation(unittest.TestCase):
+    def test_assembly_log(self):
+        log = simulate(LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, output_xlsx=False))
+
+        # water + buffer + ligase + enzyme + 5 parts, one tip each
+        self.assertEqual(log['tips'], {'p20_single_gen2 (left)': 9})
+        plate = log['volumes']['nest_96_wellplate_100ul_pcr_full_skirt on thermocyclerModuleV1 in slot 7']
+        self.assertEqual(plate, {'A1': 20.0})
+        self.assertIn('Loaded Deionized Water at position A1', log['comments'])
+        self.assertTrue(any(command['command'] == 'aspirate' and command['well'] == 'A1'
+                            for command in log['commands']))
+
+    def test_assembly_tip_racks_match_tips_used(self):
+        log = simulate(LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=11, output_xlsx=False))
+
+        self.assertEqual(log['tips'], {'p20_single_gen2 (left)': 99})
+        self.assertIn('p20_single_gen2 requires 99 tips (2 racks)', log['comments'])
+
+    def test_assembly_resumes_from_journal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            assembly = LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=2, output_xlsx=False,
+                                    journal_file=os.path.join(directory, 'journal.jsonl'), resume=True)
+            plan = assembly.plan()
+            journal = RunJournal(assembly.journal_file, plan)
+            journal.start()
+            # Reagents and the first part of well A1 are done, the second part was cut short
+            for index in range(5):
+                journal.record(index, 'started', new_tip=True)
+                journal.record(index, 'done')
+            journal.record(5, 'started', new_tip=True)
+
+            log = simulate(assembly)
+
+        # Well A1 gets nothing more, well B1 is assembled with tips after the 6 already used
+        self.assertIn('Well A1 was interrupted mid-transfer and gets no further additions, repeat it by hand',
+                      log['comments'])
+        self.assertEqual(log['tips'], {'p20_single_gen2 (left)': 9})
+        self.assertEqual(next(command['well'] for command in log['commands'] if command['command'] == 'pickUpTip'),
+                         'G1')
+        plate = log['volumes']['nest_96_wellplate_100ul_pcr_full_skirt on thermocyclerModuleV1 in slot 7']
+        self.assertEqual(plate, {'B1': 20.0})
+
+    def test_sample_plating_log(self):
+        log = simulate(PlateSamples(samples=['s1', 's2']))
+        plate_volumes = [volumes for labware, volumes in log['volumes'].items() if 'wellplate' in labware]
+        self.assertEqual(len(plate_volumes), 1)
+        self.assertEqual(sum(log['tips'].values()), 2)
+
+    def test_sample_plating_swaps_in_off_deck_tip_rack(self):
+        log = simulate(PlateSamples(samples=['s1', 's2', 's3'], starting_tip='H12'))
+
+        # The starting tip uses up the first rack, the rest come from a rack moved on deck
+        self.assertEqual(sum(log['tips'].values()), 3)
+        self.assertIn('p300_single_gen2 requires 3 tips (2 racks)', log['comments'])
+        self.assertIn('Will perform 1 tip rack batch swaps for p300_single_gen2', log['comments'])
+
+    def test_sample_plating_resumes_partly_used_tip_rack(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tip_state_file = os.path.join(directory, 'tip_state.json')
+            tip_state = {'8': {'labware': 'opentrons_96_filtertiprack_200ul', 'next_tip': 'C1'}}
+            with open(tip_state_file, 'w') as state_file:
+                json.dump(tip_state, state_file)
+
+            plate_samples = PlateSamples(samples=['s1', 's2'], tiprack_position=['9', '8'],
+                                         tip_state_file=tip_state_file)
+            log = simulate(plate_samples)
+
+            # The partly used rack in slot 8 is used first, the simulation leaves the file as it was
+            self.assertIn('Resuming tip rack in slot 8 from C1', log['comments'])
+            self.assertEqual(plate_samples.tip_manager.get_tip_state()['8'],
+                             {'labware': 'opentrons_96_filtertiprack_200ul', 'next_tip': 'E1'})
+            with open(tip_state_file) as state_file:
+                self.assertEqual(json.load(state_file), tip_state)
+
+    def test_multichannel_sample_plating_fills_columns(self):
+        plate_samples = PlateSamples(samples=[f's{i}' for i in range(1, 17)], multichannel=True)
+        log = simulate(plate_samples)
+
+        # One tip column per source column, each distributed to 4 replicate columns
+        self.assertEqual(sum(log['tips'].values()), 2)
+        self.assertEqual(plate_samples.plate_layout['s2'], ['B2', 'B3', 'B4', 'B5'])
+        self.assertEqual(plate_samples.plate_layout['s9'], ['A6', 'A7', 'A8', 'A9'])
+        plate = log['volumes']['corning_96_wellplate_360ul_flat in slot 2']
+        self.assertEqual(plate['H9'], 200)
+
+    def test_multichannel_gradient_runs_across_columns(self):
+        gradient = PlateWithGradient(sample_name='sample', inducer_name='IPTG', replicates=8, multichannel=True)
+        log = simulate(gradient)
+
+        # Prefill, sample, inducer and one tip column per dilution step
+        self.assertEqual(sum(log['tips'].values()), 3 + gradient.dilution_steps)
+        plate = log['volumes']['corning_96_wellplate_360ul_flat in slot 2']
+        self.assertEqual([plate[f'H{column}'] for column in range(1, 10)], [100.0] * 8 + [200.0])
+        self.assertEqual(gradient.concentration_map['H9'], gradient.concentration_series[-1])
+
+    def test_multichannel_sample_preparation_rejects_partial_columns(self):
+        # The channels over the empty source rows would plate nothing into rows meant to stay unused
+        with self.assertRaises(ValueError):
+            simulate(PlateSamples(samples=[f's{i}' for i in range(1, 13)], multichannel=True))
+        with self.assertRaises(ValueError):
+            simulate(PlateWithGradient(sample_name='sample', inducer_name='IPTG', replicates=4, multichannel=True))
+
+    def test_interleaved_transformation_fills_the_same_wells(self):
+        logs = [simulate(HeatShockTransformation(list_of_dna=['pro', 'rbs', 'cds'], competent_cells='DH5alpha',
+                                                 interleave_pipettes=interleave))
+                for interleave in (False, True)]
+        plates = [log['volumes']['nest_96_wellplate_100ul_pcr_full_skirt on thermocyclerModuleV1 in slot 7']
+                  for log in logs]
+        self.assertEqual(plates[0], plates[1])
+        self.assertEqual(logs[1]['tips']['p300_single_gen2 (right)'], 2)
+
+    def test_dna_tip_per_construct(self):
+        logs = [simulate(HeatShockTransformation(list_of_dna=[f'dna{i}' for i in range(7)], competent_cells='DH5alpha',
+                                                 replicates=3, dna_tip_per_construct=per_construct))
+                for per_construct in (False, True)]
+        plates = [log['volumes']['nest_96_wellplate_100ul_pcr_full_skirt on thermocyclerModuleV1 in slot 7']
+                  for log in logs]
+        # The air gaps leave the tip without adding liquid to the wells
+        self.assertEqual(plates[0], plates[1])
+        self.assertEqual([log['tips']['p20_single_gen2 (left)'] for log in logs], [21, 7])
+
+    def test_transformation_replicates_share_a_column(self):
+        transformation = HeatShockTransformation(list_of_dna=['pro', 'rbs', 'cds'], competent_cells='DH5alpha',
+                                                 replicates=3, well_placement='replicate_columns')
+        log = simulate(transformation)
+        plate = log['volumes']['nest_96_wellplate_100ul_pcr_full_skirt on thermocyclerModuleV1 in slot 7']
+        wells = ['A1', 'B1', 'C1', 'D1', 'E1', 'F1', 'A2', 'B2', 'C2']
+        self.assertEqual(sorted(well for well, volume in plate.items() if volume), sorted(wells))
+        self.assertEqual(list(transformation.dict_of_parts_in_thermocycler), wells)
+        self.assertEqual(transformation.dict_of_parts_in_thermocycler['C2'][1], 'cds')
+
+    def test_pipeline_transforms_in_the_assembly_plate(self):
+        pipeline = Pipeline(LoopAssembly(DEFAULT_MANUAL_ASSEMBLIES, replicates=2, output_xlsx=False),
+                            transformation={'competent_cells': 'DH5alpha'})
+        log = simulate(pipeline)
+        plate = log['volumes']['nest_96_wellplate_100ul_pcr_full_skirt on thermocyclerModuleV1 in slot 7']
+        # Each assembly gives DNA to two transformations in the following wells of the same plate
+        self.assertEqual(plate, {'A1': 16.0, 'B1': 16.0, 'C1': 82.0, 'D1': 82.0, 'E1': 82.0, 'F1': 82.0})
+        self.assertIn('Take opentrons_24_aluminumblock_nest_1.5ml_snapcap off the temperatureModuleV1 in slot 1',
+                      log['comments'])
+        plating = pipeline.stages['plating']
+        self.assertEqual(list(plating.bacterium_locations), ['C1', 'D1', 'E1', 'F1'])
+        self.assertEqual(plating.bacterium_locations['F1'][0][-1], 'replicate_2')
+
+    def test_multi_plate_assembly_thermocycles_plates_after_filling(self):
+        assemblies = [{"promoter": [f"p{i}" for i in range(5)], "rbs": [f"r{i}" for i in range(5)],
+                       "cds": [f"c{i}" for i in range(4)], "terminator": "B0015", "receiver": "Odd_1"}]
+        log = simulate(LoopAssembly(assemblies, multi_plate=True, thermocycler_starting_well=90, output_xlsx=False))
+        comments = log['comments']
+
+        # The first plate is held at 4 °C while the second is filled, the reagents are freed before any cycling
+        self.assertLess(comments.index('Thermocycler plate 2 of 2 ready!'),
+                        comments.index('Take out the reagents since the temperature module will be turn off'))
+        self.assertLess(comments.index('Take out the reagents since the temperature module will be turn off'),
+                        comments.index('Thermocycling plate 1 of 2'))
+
+    def test_multichannel_calibration_dilutes_rows(self):
+        single = simulate(RGBODCalibration())
+        multi = simulate(RGBODCalibration(multichannel_pipette='p300_multi_gen2'))
+
+        for log in (single, multi):
+            plate = log['volumes']['corning_96_wellplate_360ul_flat in slot 7']
+            # Every row is diluted and topped up to 200 µL, including rows E to H
+            for row in 'ABCDEFGH':
+                self.assertEqual([plate[f"{row}{column}"] for column in range(2, 13)], [200.0] * 11)
+        self.assertLess(sum(multi['tips'].values()), sum(single['tips'].values()))
+
+    def test_multichannel_calibration_rejects_four_row_layout(self):
+        plate = simulate(GFPODCalibration())['volumes']['corning_96_wellplate_360ul_flat in slot 7']
+        # Each row is diluted from column 1 to column 12, which keeps the last dilution
+        for row in 'ABCD':
+            self.assertEqual([plate[f"{row}{column}"] for column in range(1, 13)], [100.0] * 11 + [200.0])
+
+        # GFP calibration only uses rows A to D, the channels over rows E to H would aspirate empty wells
+        with self.assertRaises(ValueError):
+            simulate(GFPODCalibration(multichannel_pipette='p300_multi_gen2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+
+from opentrons import simulate
+
+from pudu import utils
+from pudu.utils import SmartPipette, VolumeLedger, get_height_lookup_table, get_liquid_height
+
+
+class TestVolumeLedger(unittest.TestCase):
+    def setUp(self):
+        self.protocol = simulate.get_protocol_api('2.22')
+        self.plate = self.protocol.load_labware('nest_96_wellplate_100ul_pcr_full_skirt', '1')
+        self.tubes = self.protocol.load_labware('opentrons_24_tuberack_nest_1.5ml_snapcap', '2')
+        self.ledger = VolumeLedger()
+
+    def test_volumes_are_seeded_from_loaded_liquid(self):
+        liquid = self.protocol.define_liquid(name='water', description='water', display_color='#4040BF')
+        self.tubes['A1'].load_liquid(liquid, volume=1000)
+        self.assertEqual(self.ledger.get_volume(self.tubes['A1']), 1000)
+        # Wells without liquid have no known volume until something is added
+        self.assertIsNone(self.ledger.get_volume(self.plate['A1']))
+
+    def test_batch_add_and_remove(self):
+        self.ledger.set_volume(self.tubes['A1'], 500)
+        self.ledger.add(self.plate.wells()[:8] + [self.tubes['A1']], 20)
+        self.ledger.remove(self.tubes['A1'], 600)
+
+        self.assertEqual([self.ledger.get_volume(well) for well in self.plate.columns()[0]], [20] * 8)
+        self.assertEqual(self.ledger.get_volume(self.tubes['A1']), 0)
+
+    def test_smart_pipette_transfer_updates_ledger(self):
+        tiprack = self.protocol.load_labware('opentrons_96_tiprack_300ul', '3')
+        pipette = self.protocol.load_instrument('p300_single_gen2', 'right', tip_racks=[tiprack])
+        smart_pipette = SmartPipette(pipette, self.protocol, ledger=self.ledger)
+        self.ledger.set_volume(self.tubes['A1'], 1000)
+
+        self.assertTrue(smart_pipette.liquid_transfer(50, self.tubes['A1'], self.plate['A1']))
+        self.assertFalse(smart_pipette.liquid_transfer(2000, self.tubes['A1'], self.plate['A1']))
+        self.assertEqual(self.ledger.get_volume(self.tubes['A1']), 950)
+        self.assertEqual(self.ledger.get_volume(self.plate['A1']), 50)
+
+    def test_multi_dispense_batches_by_pipette_volume(self):
+        tiprack = self.protocol.load_labware('opentrons_96_tiprack_300ul', '3')
+        pipette = self.protocol.load_instrument('p300_single_gen2', 'right', tip_racks=[tiprack])
+        smart_pipette = SmartPipette(pipette, self.protocol, ledger=self.ledger)
+        self.ledger.set_volume(self.tubes['A1'], 1000)
+
+        self.assertTrue(smart_pipette.multi_dispense(50, self.tubes['A1'], self.plate.wells()[:8]))
+        self.assertEqual(self.ledger.get_volume(self.tubes['A1']), 600)
+        self.assertEqual([self.ledger.get_volume(well) for well in self.plate.columns()[0]], [50] * 8)
+        # 300 µL per aspiration, so 8 wells of 50 µL take two aspirations
+        aspirations = [command for command in self.protocol.commands() if command.startswith('Aspirating')]
+        self.assertEqual(len(aspirations), 2)
+
+        self.assertFalse(smart_pipette.multi_dispense(100, self.tubes['A1'], self.plate.wells()[8:16]))
+        self.assertEqual(self.ledger.get_volume(self.tubes['A1']), 0)
+
+    def test_multi_dispense_batches_by_tip_volume(self):
+        tiprack = self.protocol.load_labware('opentrons_96_filtertiprack_200ul', '3')
+        pipette = self.protocol.load_instrument('p300_single_gen2', 'right', tip_racks=[tiprack])
+        smart_pipette = SmartPipette(pipette, self.protocol, ledger=self.ledger)
+        self.ledger.set_volume(self.tubes['A1'], 1000)
+
+        # 200 µL tips less 10 µL of disposal volume hold one 100 µL well per aspiration
+        self.assertTrue(smart_pipette.multi_dispense(100, self.tubes['A1'], self.plate.wells()[:3], disposal_volume=10))
+        aspirations = [command for command in self.protocol.commands() if command.startswith('Aspirating')]
+        self.assertEqual(len(aspirations), 3)
+        self.assertEqual(self.ledger.get_volume(self.tubes['A1']), 700)
+
+
+class TestLiquidHeightModel(unittest.TestCase):
+    def test_lookup_table_follows_cone_geometry(self):
+        volumes, heights = get_height_lookup_table('opentrons_15_tuberack_falcon_15ml_conical', 'conicalWell')
+        self.assertTrue((volumes[1:] >= volumes[:-1]).all())
+        # The conical tip holds about 1.1 mL in its 20.7 mm, so the first mL is far above the linear model
+        linear_height = 1000 / 15000 * (117.5 - 10)
+        self.assertGreater(float(heights[volumes.searchsorted(1000)]), 2 * linear_height)
+
+    def test_aspiration_follows_meniscus_to_the_bottom(self):
+        protocol = simulate.get_protocol_api('2.22')
+        rack = protocol.load_labware('opentrons_15_tuberack_falcon_15ml_conical', '1')
+        tiprack = protocol.load_labware('opentrons_96_tiprack_300ul', '2')
+        pipette = protocol.load_instrument('p300_single_gen2', 'right', tip_racks=[tiprack])
+        smart_pipette = SmartPipette(pipette, protocol)
+        smart_pipette.ledger.set_volume(rack['A1'], 500)
+
+        height = smart_pipette.get_conical_tube_aspiration_height(rack['A1'])
+        self.assertAlmostEqual(height, get_liquid_height(rack['A1'], 500) - 2.0)
+        self.assertGreater(height, 1.0)
+        # Labware without inner geometry keeps the linear model
+        self.assertIsNone(get_liquid_height(tiprack['A1'], 100))
+
+    def test_height_queries_parse_the_definition_once(self):
+        protocol = simulate.get_protocol_api('2.22')
+        rack = protocol.load_labware('opentrons_15_tuberack_falcon_15ml_conical', '1')
+        get_liquid_height(rack['A1'], 500)
+        # Later queries on the same labware reuse the parsed geometry
+        with mock.patch.object(utils, 'get_labware_definition', wraps=utils.get_labware_definition) as definition:
+            for volume in (100, 1000, 5000):
+                get_liquid_height(rack['B1'], volume)
+        self.assertEqual(definition.call_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()